@@ -10,6 +10,7 @@ import os
 import logging
 from logging.handlers import RotatingFileHandler
 from .extensions import make_celery
+from .utils.json_codec import CodecJSONProvider
 
 jwt = JWTManager()
 limiter = Limiter(
@@ -26,6 +27,7 @@ def create_app(config_name=None):
     
     # Configuration
     app.config.from_object(config[config_name])
+    app.json = CodecJSONProvider(app)
     
     # Initialize extensions
     if config_name == 'development':
@@ -62,6 +64,10 @@ def create_app(config_name=None):
     app.register_blueprint(logs_bp, url_prefix='/api/logs')
     app.register_blueprint(health_bp, url_prefix='')
     
+    # CLI komutları
+    from app.commands import dead_letters_cli
+    app.cli.add_command(dead_letters_cli)
+    
     # Configure SSL
     from app.utils.ssl_config import configure_ssl
     configure_ssl()
@@ -1,8 +1,5 @@
 from app import create_app
-from app.extensions import make_celery
-from app.services.facebook_event_sender import send_facebook_event
+from app import tasks  # noqa: F401 - task'ları kaydet
 
 flask_app = create_app()
-celery = make_celery(flask_app)
-
-celery.tasks.register(send_facebook_event) 
\ No newline at end of file
+celery = flask_app.celery
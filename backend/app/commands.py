@@ -0,0 +1,40 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from .models.dead_letter_event import DeadLetterEvent
+from .services.dead_letters import replay_dead_letters, purge_dead_letters
+
+dead_letters_cli = AppGroup('dead-letters', help='Inspect, replay and purge failed Meta deliveries.')
+
+@dead_letters_cli.command('list')
+@click.option('--container', help='Only this GTM container id.')
+@click.option('--status', default='pending', show_default=True)
+@click.option('--limit', default=50, show_default=True)
+def list_dead_letters(container, status, limit):
+    query = DeadLetterEvent.query.filter_by(status=status)
+    if container:
+        query = query.filter_by(gtm_container_id=container)
+    for row in query.order_by(DeadLetterEvent.id).limit(limit):
+        click.echo(f"{row.id}\t{row.gtm_container_id}\t{row.event_name}\tattempts={row.attempts}\t{(row.error or '')[:120]}")
+    click.echo(f"{query.count()} {status} dead letters")
+
+@dead_letters_cli.command('replay')
+@click.option('--container', help='Only this GTM container id.')
+@click.option('--id', 'ids', multiple=True, type=int, help='Replay these rows (repeatable).')
+@click.option('--limit', default=1000, show_default=True)
+@click.option('--rate', type=float, help='Events per second (default: DEAD_LETTER_REPLAY_RATE).')
+def replay(container, ids, limit, rate):
+    query = DeadLetterEvent.query
+    if container:
+        query = query.filter_by(gtm_container_id=container)
+    if ids:
+        query = query.filter(DeadLetterEvent.id.in_(ids))
+    summary = replay_dead_letters(query, limit, rate=rate or current_app.config['DEAD_LETTER_REPLAY_RATE'])
+    click.echo(f"replayed: {summary['replayed']}, still failing: {summary['failed']}")
+
+@dead_letters_cli.command('purge')
+@click.option('--older-than', type=float, help='Days; also delete unreplayed rows older than this (default: DEAD_LETTER_RETENTION_DAYS, 0 keeps them).')
+def purge(older_than):
+    days = current_app.config['DEAD_LETTER_RETENTION_DAYS'] if older_than is None else older_than
+    summary = purge_dead_letters(days)
+    click.echo(f"deleted replayed: {summary['replayed']}, older than {days:g} days: {summary['expired']}")
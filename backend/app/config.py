@@ -32,13 +32,98 @@ class Config:
     FACEBOOK_API_VERSION = os.environ.get('FACEBOOK_API_VERSION', 'v18.0')
     FACEBOOK_GRAPH_URL = os.environ.get('FACEBOOK_GRAPH_URL', 'https://graph.facebook.com')
 
+    # JSON codec: 'auto' (orjson kuruluysa onu kullan), 'orjson' veya 'stdlib'
+    JSON_CODEC = os.environ.get('JSON_CODEC', 'auto')
+
+    # Graph API HTTP bağlantı havuzu (worker başına keep-alive)
+    GRAPH_POOL_CONNECTIONS = int(os.environ.get('GRAPH_POOL_CONNECTIONS', 4))
+    GRAPH_POOL_MAXSIZE = int(os.environ.get('GRAPH_POOL_MAXSIZE', 20))
+    GRAPH_CONNECT_TIMEOUT = float(os.environ.get('GRAPH_CONNECT_TIMEOUT', 5))
+    GRAPH_READ_TIMEOUT = float(os.environ.get('GRAPH_READ_TIMEOUT', 30))
+    GRAPH_BATCH_MAX_EVENTS = int(os.environ.get('GRAPH_BATCH_MAX_EVENTS', 1000))  # Meta limiti: istek başına 1000 event
+
+    # PageView event'lerini havuzda biriktirip toplu gönder
+    PAGE_VIEW_BATCHING = os.environ.get('PAGE_VIEW_BATCHING', 'false').lower() == 'true'
+    PAGE_VIEW_BATCH_SIZE = int(os.environ.get('PAGE_VIEW_BATCH_SIZE', 100))  # Bu kadar event birikince gönder
+    PAGE_VIEW_BATCH_MAX_AGE = float(os.environ.get('PAGE_VIEW_BATCH_MAX_AGE', 60))  # En eski event bu kadar saniye bekleyince gönder
+    PAGE_VIEW_QUEUE_MAX_SIZE = int(os.environ.get('PAGE_VIEW_QUEUE_MAX_SIZE', 10000))  # Worker başına bellek sınırı
+    PAGE_VIEW_ENQUEUE_TIMEOUT = float(os.environ.get('PAGE_VIEW_ENQUEUE_TIMEOUT', 0.05))
+
+    # Event ingest modu: 'sync' (Meta'ya istek içinde gönder), 'async' (Celery kuyruğuna yaz, 202 dön)
+    # veya 'queue' (Redis listesine yaz, 202 dön; python -m app.dispatcher tüketir)
+    EVENT_INGEST_MODE = os.environ.get('EVENT_INGEST_MODE', 'sync').lower()
+    EVENT_BATCH_MAX_EVENTS = int(os.environ.get('EVENT_BATCH_MAX_EVENTS', 1000))  # /events/batch istek başına event sınırı
+    EVENT_BATCH_MAX_BYTES = int(os.environ.get('EVENT_BATCH_MAX_BYTES', 5 * 1024 * 1024))  # gzip açıldıktan sonraki boyut sınırı
+
+    # Asyncio dispatcher (python -m app.dispatcher)
+    EVENT_QUEUE_URL = os.environ.get('EVENT_QUEUE_URL', os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+    EVENT_QUEUE_KEY = os.environ.get('EVENT_QUEUE_KEY', 'capify:events')
+    DISPATCHER_MAX_IN_FLIGHT = int(os.environ.get('DISPATCHER_MAX_IN_FLIGHT', 2000))  # Toplam eşzamanlı Graph isteği
+    DISPATCHER_PER_DATASET_LIMIT = int(os.environ.get('DISPATCHER_PER_DATASET_LIMIT', 100))  # Dataset başına eşzamanlı istek
+    DISPATCHER_SHUTDOWN_TIMEOUT = float(os.environ.get('DISPATCHER_SHUTDOWN_TIMEOUT', 30))
+    DISPATCHER_BLOCKING_THREADS = int(os.environ.get('DISPATCHER_BLOCKING_THREADS', 16))  # DB/Redis/log işleri için thread havuzu
+
+    # Başarısız Meta gönderimleri: geçici hatalarda backoff ile tekrar dene, sonra dead-letter tablosuna yaz
+    DELIVERY_MAX_ATTEMPTS = int(os.environ.get('DELIVERY_MAX_ATTEMPTS', 5))  # İlk deneme dahil
+    DELIVERY_RETRY_BASE_DELAY = float(os.environ.get('DELIVERY_RETRY_BASE_DELAY', 2))
+    DELIVERY_RETRY_MAX_DELAY = float(os.environ.get('DELIVERY_RETRY_MAX_DELAY', 300))
+    DEAD_LETTER_REPLAY_RATE = float(os.environ.get('DEAD_LETTER_REPLAY_RATE', 10))  # Saniyede en fazla bu kadar event
+    DEAD_LETTER_REPLAY_MAX = int(os.environ.get('DEAD_LETTER_REPLAY_MAX', 500))  # API isteği başına
+    DEAD_LETTER_REPLAY_BUDGET = float(os.environ.get('DEAD_LETTER_REPLAY_BUDGET', 15))  # Saniye; istek içi replay süresi (gunicorn timeout'un altında)
+    DEAD_LETTER_RETENTION_DAYS = float(os.environ.get('DEAD_LETTER_RETENTION_DAYS', 30))  # Ham event verisi (e-posta, telefon) bundan eski satırlarla silinir; 0 kapatır
+    DEAD_LETTER_PURGE_INTERVAL = float(os.environ.get('DEAD_LETTER_PURGE_INTERVAL', 3600))  # Saniye; celery beat temizlik aralığı
+
+    # Circuit breaker: art arda bu kadar yetki hatasından sonra gönderimi durdur
+    CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 5))
+    CIRCUIT_RESET_TIMEOUT = float(os.environ.get('CIRCUIT_RESET_TIMEOUT', 300))  # Saniye; sonra tek bir deneme isteği
+
+    # GTM container -> Facebook token önbelleği (worker başına)
+    TOKEN_CACHE_TTL = float(os.environ.get('TOKEN_CACHE_TTL', 300))
+    TOKEN_CACHE_NEGATIVE_TTL = float(os.environ.get('TOKEN_CACHE_NEGATIVE_TTL', 30))  # Bilinmeyen container'lar için
+    TOKEN_CACHE_MAX_SIZE = int(os.environ.get('TOKEN_CACHE_MAX_SIZE', 10000))
+    SOURCE_URL_CACHE_TTL = float(os.environ.get('SOURCE_URL_CACHE_TTL', 600))  # Doğrulanmış domain -> event_source_url
+
+    # event_id tekrarlarını Meta'ya göndermeden düşür: 'memory' (worker başına), 'redis' (paylaşılan) veya 'off'
+    EVENT_DEDUP_BACKEND = os.environ.get('EVENT_DEDUP_BACKEND', 'memory').lower()
+    EVENT_DEDUP_WINDOW = float(os.environ.get('EVENT_DEDUP_WINDOW', 900))  # Saniye
+    EVENT_DEDUP_CLAIM_TTL = float(os.environ.get('EVENT_DEDUP_CLAIM_TTL', 120))  # Saniye; gönderim sürerken tutulan claim
+    EVENT_DEDUP_MAX_SIZE = int(os.environ.get('EVENT_DEDUP_MAX_SIZE', 100000))  # memory backend için anahtar sınırı
+    EVENT_DEDUP_URL = os.environ.get('EVENT_DEDUP_URL', os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+
+    # PII hash memo (normalize edilmiş değer -> SHA-256), worker başına; varsayılan kapalı
+    HASH_MEMO_ENABLED = os.environ.get('HASH_MEMO_ENABLED', 'false').lower() == 'true'
+    HASH_MEMO_MAX_SIZE = int(os.environ.get('HASH_MEMO_MAX_SIZE', 10000))  # Bellekte tutulan en fazla değer
+    HASH_MEMO_TTL = float(os.environ.get('HASH_MEMO_TTL', 300))  # Saniye; bir değer en fazla bu kadar tutulur
+
+    # event_stage_duration_seconds metriğine gtm_container_id etiketi ekle; container sayısı kadar seri üretir
+    STAGE_METRICS_CONTAINER_LABEL = os.environ.get('STAGE_METRICS_CONTAINER_LABEL', 'false').lower() == 'true'
+
+    # GTM event log'u arka plan thread'i yazar; istek thread'i diske beklemez
+    GTM_LOG_FORMAT = os.environ.get('GTM_LOG_FORMAT', 'text').lower()  # 'text' veya 'jsonl' (kayıt başına tek satır JSON)
+    GTM_LOG_ASYNC = os.environ.get('GTM_LOG_ASYNC', 'true').lower() == 'true'
+    GTM_LOG_QUEUE_MAX_SIZE = int(os.environ.get('GTM_LOG_QUEUE_MAX_SIZE', 10000))  # Worker başına bekleyen satır sınırı
+    GTM_LOG_QUEUE_POLICY = os.environ.get('GTM_LOG_QUEUE_POLICY', 'drop').lower()  # Kuyruk doluysa: 'drop' veya 'block'
+    GTM_LOG_BLOCK_TIMEOUT = float(os.environ.get('GTM_LOG_BLOCK_TIMEOUT', 0.05))  # 'block' için en fazla bekleme (saniye)
+    GTM_LOG_BATCH_SIZE = int(os.environ.get('GTM_LOG_BATCH_SIZE', 256))  # write() başına en fazla satır
+    GTM_LOG_FLUSH_INTERVAL = float(os.environ.get('GTM_LOG_FLUSH_INTERVAL', 0.05))  # Saniye; kuyruk bu aralıkla boşaltılır
+    GTM_LOG_INDEX = os.environ.get('GTM_LOG_INDEX', 'true').lower() == 'true'  # gtm_events.log.idx: zaman/container -> bayt aralığı
+    GTM_LOG_INDEX_BUCKET_SECONDS = int(os.environ.get('GTM_LOG_INDEX_BUCKET_SECONDS', 600))  # Index kaydı başına en fazla süre
+    GTM_LOG_INDEX_SEGMENT_BYTES = int(os.environ.get('GTM_LOG_INDEX_SEGMENT_BYTES', 256 * 1024))  # Index kaydı başına en fazla log baytı
+    GTM_LOG_FSYNC_INTERVAL = float(os.environ.get('GTM_LOG_FSYNC_INTERVAL', 1.0))  # Saniye; 0 fsync'i kapatır
+    GTM_STATS_FLUSH_INTERVAL = float(os.environ.get('GTM_STATS_FLUSH_INTERVAL', 5.0))  # Saniye; gtm_events.stats.json'a yazma aralığı
+    METRICS_GAUGE_REFRESH_INTERVAL = float(os.environ.get('METRICS_GAUGE_REFRESH_INTERVAL', 5.0))  # Saniye; multiprocess modda kuyruk/cache gauge'larının yazılma aralığı
+
     CELERY_BROKER_URL = 'redis://localhost:6379/0'
     CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+    CELERYBEAT_SCHEDULE = {
+        'purge-dead-letters': {'task': 'app.tasks.purge_dead_letter_events', 'schedule': DEAD_LETTER_PURGE_INTERVAL},
+    }
     
     # Rate Limiting ayarları
     RATELIMIT_STORAGE_URL = "memory://"  # Memory-based storage (production'da Redis kullanılabilir)
     RATELIMIT_DEFAULT = "100 per minute"  # Varsayılan limit
     RATELIMIT_HEADERS_ENABLED = True  # Rate limit bilgilerini header'larda göster
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'  # Yük testlerinde kapatılabilir
 
     # Logging ayarları
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
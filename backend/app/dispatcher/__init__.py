@@ -0,0 +1,305 @@
+"""
+Asyncio delivery engine for queued events (EVENT_INGEST_MODE=queue).
+
+One process keeps up to DISPATCHER_MAX_IN_FLIGHT Graph API requests open at
+once, at most DISPATCHER_PER_DATASET_LIMIT of them per dataset. Route
+resolution and payload building are shared with send_event_to_meta through
+``prepare_event``. Run with ``python -m app.dispatcher``.
+"""
+import asyncio
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
+from ..services.facebook_event_sender import prepare_event
+from ..services.graph_errors import classify_response, classify_exception
+from ..services.dead_letters import retry_delay, record_dead_letter, record_failures
+from ..services.circuit_breaker import graph_circuit_breaker, held_response
+from ..services.event_dedup import claim_event, confirm_event, refresh_claim, release_event
+from ..utils import json_codec
+from ..utils.logger import GtmEventLogger, get_logger
+from ..utils.monitoring import DISPATCHER_IN_FLIGHT, DISPATCHER_EVENTS, DELIVERY_RETRIES
+from ..utils.ssl_config import get_ssl_verify_setting
+
+logger = get_logger(__name__)
+
+class RedisQueueSource:
+    """Pops JSON events from the Redis list written by ``push_events``"""
+
+    def __init__(self, url, key, block_timeout=1):
+        import redis.asyncio
+
+        self.key = key
+        self.block_timeout = block_timeout
+        self._redis = redis.asyncio.Redis.from_url(url)
+
+    async def get(self):
+        item = await self._redis.blpop([self.key], timeout=self.block_timeout)
+        return json_codec.loads(item[1]) if item else None
+
+    async def requeue(self, event):
+        # Kapanışta bitirilemeyen event kuyruğun başına geri konur
+        await self._redis.lpush(self.key, json_codec.dumps(event))
+
+    async def close(self):
+        await self._redis.close()
+
+def ssl_setting():
+    verify = get_ssl_verify_setting()
+    if verify is False:
+        return False
+    if isinstance(verify, str):
+        return ssl.create_default_context(cafile=verify)
+    return None
+
+class Dispatcher:
+    def __init__(self, app, source, max_in_flight, per_dataset_limit, shutdown_timeout,
+                 graph_url=None, api_version=None, request_timeout=None, blocking_threads=None):
+        self.app = app
+        self.source = source
+        self.max_in_flight = max_in_flight
+        self.per_dataset_limit = per_dataset_limit
+        self.shutdown_timeout = shutdown_timeout
+        graph_url = graph_url or app.config['FACEBOOK_GRAPH_URL']
+        api_version = api_version or app.config['FACEBOOK_API_VERSION']
+        self.base_url = f"{graph_url.rstrip('/')}/{api_version}"
+        self.request_timeout = request_timeout or app.config['GRAPH_READ_TIMEOUT']
+        self.blocking_threads = blocking_threads or app.config['DISPATCHER_BLOCKING_THREADS']
+        self._executor = None
+        self._stopping = None
+        self._slots = None
+        self._dataset_slots = {}
+        self._tasks = set()
+        self._session = None
+
+    def stop(self):
+        """Stop taking new events; in-flight ones finish (or are requeued)"""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run(self):
+        self._stopping = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight, limit_per_host=0, ssl=ssl_setting())
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+        self._executor = ThreadPoolExecutor(max_workers=self.blocking_threads, thread_name_prefix='dispatcher-blocking')
+
+        # Uygulama context'i burada açılır; oluşturulan task'lar context'i devralır
+        with self.app.app_context():
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout, json_serialize=json_codec.dumps) as session:
+                self._session = session
+                logger.info(f"Dispatcher started (max in flight: {self.max_in_flight}, per dataset: {self.per_dataset_limit})")
+                try:
+                    await self._consume()
+                finally:
+                    await self._shutdown()
+                    await self.source.close()
+                    self._executor.shutdown(wait=True)
+                    self._executor = None
+                    logger.info("Dispatcher stopped")
+
+    async def _consume(self):
+        while not self._stopping.is_set():
+            await self._slots.acquire()
+            try:
+                event = await self.source.get()
+            except Exception as e:
+                self._slots.release()
+                logger.error(f"Dispatcher queue read failed: {str(e)}")
+                await asyncio.sleep(1)
+                continue
+            if event is None:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._run_one(event))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _shutdown(self):
+        if not self._tasks:
+            return
+        logger.info(f"Dispatcher draining {len(self._tasks)} in-flight events")
+        _, pending = await asyncio.wait(set(self._tasks), timeout=self.shutdown_timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _run_one(self, event):
+        DISPATCHER_IN_FLIGHT.inc()
+        try:
+            await self.deliver(event)
+        except asyncio.CancelledError:
+            await self.source.requeue(event)
+            DISPATCHER_EVENTS.labels(result='requeued').inc()
+            raise
+        except Exception as e:
+            DISPATCHER_EVENTS.labels(result='error').inc()
+            logger.error(f"Dispatcher delivery crashed: {str(e)}")
+        finally:
+            DISPATCHER_IN_FLIGHT.dec()
+            self._slots.release()
+
+    def _dataset_semaphore(self, dataset_id):
+        semaphore = self._dataset_slots.get(dataset_id)
+        if semaphore is None:
+            semaphore = self._dataset_slots[dataset_id] = asyncio.Semaphore(self.per_dataset_limit)
+        return semaphore
+
+    async def deliver(self, event):
+        """Deliver one queued event; returns ``(body, status_code)`` like send_event_to_meta"""
+        start_time = time.time()
+        prepared = self._submit(self._prepare, event, start_time)
+        try:
+            token, payload, claim, response = await asyncio.shield(prepared)
+        except asyncio.CancelledError:
+            # İptal thread'i durdurmaz; aldığı claim bırakılmazsa kuyruğa dönen event duplicate sayılır
+            await asyncio.wait([prepared])
+            if prepared.exception() is None and prepared.result()[2]:
+                await self._blocking(release_event, prepared.result()[2])
+            raise
+        if response:
+            return response
+
+        request_body = {
+            'data': [payload],
+            'access_token': token.access_token,
+            'test_event_code': payload.get('test_event_code') or ''
+        }
+
+        # Geçici hatalarda backoff ile tekrar dene; beklerken dataset slotu serbest kalır
+        attempts = 0
+        try:
+            while True:
+                if not graph_circuit_breaker.allow(token.dataset_id, token.access_token):
+                    return await self._blocking(self._hold, event, claim, token.dataset_id, start_time, attempts)
+                if attempts:
+                    await self._blocking(refresh_claim, claim)
+                attempts += 1
+                async with self._dataset_semaphore(token.dataset_id):
+                    result = await self._post(token.dataset_id, request_body)
+                await self._blocking(self._record_result, token, claim, result)
+                if result['success'] or not result['retryable'] or attempts >= self.app.config['DELIVERY_MAX_ATTEMPTS']:
+                    break
+                DELIVERY_RETRIES.labels(path='dispatcher').inc()
+                await asyncio.sleep(retry_delay(attempts))
+        except asyncio.CancelledError:
+            # Event kuyruğa geri döner; claim kalırsa tekrar teslimde duplicate sayılır
+            await self._blocking(release_event, claim)
+            raise
+
+        return await self._blocking(self._finish, event, claim, result, attempts, start_time)
+
+    def _submit(self, fn, *args):
+        """
+        Run ``fn`` in the blocking-work pool: SQLAlchemy, sync Redis and file
+        logging would otherwise stall every in-flight delivery on the loop.
+        """
+        return asyncio.get_running_loop().run_in_executor(self._executor, self._in_app_context, fn, *args)
+
+    async def _blocking(self, fn, *args):
+        future = self._submit(fn, *args)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Sıradaki adım (claim bırakma) bu iş bittikten sonra çalışmalı
+            await asyncio.wait([future])
+            raise
+
+    def _in_app_context(self, fn, *args):
+        # Her çağrı kendi app context'ini (ve SQLAlchemy session'ını) açar; çıkışta session kapanır
+        with self.app.app_context():
+            return fn(*args)
+
+    def _prepare(self, event, start_time):
+        """Log receipt, build the payload and claim the event_id; ``response`` is set when there is nothing to send"""
+        event_name = event['event_name']
+        data = event['data']
+        gtm_container_id = data.get('gtm_container_id')
+
+        GtmEventLogger.log_gtm_event_received(
+            event_name=event_name,
+            gtm_container_id=gtm_container_id,
+            event_data=data
+        )
+
+        token, payload, error = prepare_event(event_name, data, event.get('custom_data'))
+        if error:
+            DISPATCHER_EVENTS.labels(result='rejected').inc()
+            self._log_complete(event_name, gtm_container_id, start_time, False)
+            return None, None, None, error
+
+        claim, duplicate = claim_event(token.dataset_id, event_name, data)
+        if duplicate:
+            DISPATCHER_EVENTS.labels(result='duplicate').inc()
+            self._log_complete(event_name, gtm_container_id, start_time, True)
+            return None, None, None, duplicate
+
+        GtmEventLogger.log_meta_request_sent(
+            event_name=event_name,
+            gtm_container_id=gtm_container_id,
+            meta_payload=payload,
+            access_token=token.access_token,
+            pixel_id=token.dataset_id
+        )
+        return token, payload, claim, None
+
+    def _record_result(self, token, claim, result):
+        if result['success']:
+            confirm_event(claim)
+            graph_circuit_breaker.record_success(token.dataset_id, token.access_token)
+        else:
+            graph_circuit_breaker.record_failure(token.dataset_id, token.access_token, result['auth_failure'], result['error'])
+
+    def _finish(self, event, claim, result, attempts, start_time):
+        event_name = event['event_name']
+        data = event['data']
+        gtm_container_id = data.get('gtm_container_id')
+        success = result['success']
+        GtmEventLogger.log_meta_response_received(
+            event_name=event_name,
+            gtm_container_id=gtm_container_id,
+            meta_response=result if success else {'error': result['error']},
+            success=success,
+            error_message=None if success else result['error']
+        )
+        self._log_complete(event_name, gtm_container_id, start_time, success)
+
+        if success:
+            DISPATCHER_EVENTS.labels(result='sent').inc()
+            return {'msg': 'Event sent to Meta', 'meta_response': result}, 200
+
+        DISPATCHER_EVENTS.labels(result='failed').inc()
+        release_event(claim)
+        body = {'msg': 'Meta event error', 'error': result['error'], 'retryable': result['retryable']}
+        record_dead_letter(event_name, data, event.get('custom_data'), body, attempts)
+        return body, 500
+
+    def _hold(self, event, claim, dataset_id, start_time, attempts):
+        release_event(claim)
+        body, status_code = held_response(dataset_id)
+        DISPATCHER_EVENTS.labels(result='held').inc()
+        self._log_complete(event['event_name'], event['data'].get('gtm_container_id'), start_time, False)
+        record_failures([event], [(body, status_code)], attempts)
+        return body, status_code
+
+    async def _post(self, dataset_id, request_body):
+        try:
+            async with self._session.post(f"{self.base_url}/{dataset_id}/events", json=request_body) as response:
+                text = await response.text()
+                if response.status == 200:
+                    return {'success': True, 'response': json_codec.loads(text)}
+                failure = classify_response(response.status, text)
+                return {'success': False, 'error': f"Facebook API error: {response.status} - {text}",
+                        'retryable': failure.retryable, 'auth_failure': failure.auth_failure}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            failure = classify_exception(e)
+            return {'success': False, 'error': f"Facebook CAPI exception: {failure.message}",
+                    'retryable': failure.retryable, 'auth_failure': False}
+
+    def _log_complete(self, event_name, gtm_container_id, start_time, success):
+        GtmEventLogger.log_gtm_event_complete(
+            event_name=event_name,
+            gtm_container_id=gtm_container_id,
+            total_duration_ms=int((time.time() - start_time) * 1000),
+            success=success
+        )
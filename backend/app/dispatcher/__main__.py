@@ -0,0 +1,37 @@
+import argparse
+import asyncio
+import signal
+from prometheus_client import start_http_server
+from app import create_app
+from . import Dispatcher, RedisQueueSource
+
+def main():
+    parser = argparse.ArgumentParser(description='Deliver queued CAPIFY events to the Graph API')
+    parser.add_argument('--config', default='default', help='Flask config name')
+    parser.add_argument('--max-in-flight', type=int, help='override DISPATCHER_MAX_IN_FLIGHT')
+    parser.add_argument('--per-dataset', type=int, help='override DISPATCHER_PER_DATASET_LIMIT')
+    parser.add_argument('--metrics-port', type=int, help='expose Prometheus metrics on this port')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+
+    dispatcher = Dispatcher(
+        app,
+        RedisQueueSource(app.config['EVENT_QUEUE_URL'], app.config['EVENT_QUEUE_KEY']),
+        max_in_flight=args.max_in_flight or app.config['DISPATCHER_MAX_IN_FLIGHT'],
+        per_dataset_limit=args.per_dataset or app.config['DISPATCHER_PER_DATASET_LIMIT'],
+        shutdown_timeout=app.config['DISPATCHER_SHUTDOWN_TIMEOUT']
+    )
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, dispatcher.stop)
+        await dispatcher.run()
+
+    asyncio.run(run())
+
+if __name__ == '__main__':
+    main()
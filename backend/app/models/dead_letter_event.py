@@ -0,0 +1,51 @@
+from ..extensions import db
+from datetime import datetime
+import json
+
+class DeadLetterEvent(db.Model):
+    """An event Meta did not accept after all retries, kept for replay"""
+
+    __table_args__ = (
+        db.Index('ix_dead_letter_event_container_status', 'gtm_container_id', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    gtm_container_id = db.Column(db.String(255), nullable=True)
+    event_name = db.Column(db.String(100), nullable=False)
+    event_id = db.Column(db.String(255), nullable=True)
+    payload = db.Column(db.Text, nullable=False)  # {'data': ..., 'custom_data': ...} JSON
+    
+    # Hata bilgisi
+    error = db.Column(db.Text, nullable=True)
+    retryable = db.Column(db.Boolean, default=False)
+    attempts = db.Column(db.Integer, default=0)
+    status = db.Column(db.String(20), default='pending')  # pending, held, replayed
+    
+    # Zaman damgaları
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    replayed_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<DeadLetterEvent {self.event_name} - {self.gtm_container_id}>'
+    
+    @property
+    def event(self):
+        """The queued-event dict this row was created from"""
+        payload = json.loads(self.payload)
+        return {'event_name': self.event_name, 'data': payload['data'], 'custom_data': payload.get('custom_data')}
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'gtm_container_id': self.gtm_container_id,
+            'event_name': self.event_name,
+            'event_id': self.event_id,
+            'error': self.error,
+            'retryable': self.retryable,
+            'attempts': self.attempts,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_attempt_at': self.last_attempt_at.isoformat() if self.last_attempt_at else None,
+            'replayed_at': self.replayed_at.isoformat() if self.replayed_at else None
+        }
@@ -3,6 +3,13 @@ from datetime import datetime
 import secrets
 
 class FacebookToken(db.Model):
+    __table_args__ = (
+        # Her GTM doğrulamasına kullanıcı başına tek token (add_facebook_token kuralı)
+        db.Index('uq_facebook_token_user_container', 'user_id', 'gtm_container_id', unique=True),
+        # Event akışı container'a göre token çözer
+        db.Index('ix_facebook_token_container_active', 'gtm_container_id', 'is_active'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
@@ -16,12 +23,22 @@ class FacebookToken(db.Model):
     updated_at = db.Column(db.DateTime)
     gtm_container_id = db.Column(db.String(255), nullable=False)  # GTM Tag/Container ID
     
+    # Circuit breaker durumu (Meta token'ı/dataset'i reddettiğinde 'open')
+    circuit_state = db.Column(db.String(20), default='closed')
+    circuit_opened_at = db.Column(db.DateTime, nullable=True)
+    circuit_last_error = db.Column(db.Text, nullable=True)
+    
     # Relationship
     user = db.relationship('User', backref=db.backref('facebook_tokens', lazy=True))
     
     def __repr__(self):
         return f'<FacebookToken {self.dataset_id}>'
     
+    @property
+    def pixel_id(self):
+        # Script şablonları pixel_id kullanır; dataset_id = pixel_id
+        return self.dataset_id
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -32,7 +49,10 @@ class FacebookToken(db.Model):
             'token_name': self.token_name,
             'is_active': self.is_active,
             'last_used': self.last_used.isoformat() if self.last_used else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'circuit_state': self.circuit_state or 'closed',
+            'circuit_opened_at': self.circuit_opened_at.isoformat() if self.circuit_opened_at else None,
+            'circuit_last_error': self.circuit_last_error
         }
     
     @staticmethod
@@ -3,12 +3,24 @@ from datetime import datetime
 import secrets
 
 class GtmVerification(db.Model):
+    __table_args__ = (
+        # Dashboard listeleri ve domain tekrar kontrolü
+        db.Index('ix_gtm_verification_user_domain', 'user_id', 'domain_name'),
+        # Event akışı sadece doğrulanmış kayıtları okur
+        db.Index(
+            'ix_gtm_verification_verified_container', 'gtm_container_id',
+            postgresql_where=db.text('is_verified'),
+            sqlite_where=db.text('is_verified = 1')
+        ),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
     # GTM Container bilgileri
     gtm_container_id = db.Column(db.String(255), nullable=False)
     domain_name = db.Column(db.String(255), nullable=False)
+    event_source_url = db.Column(db.String(512), nullable=True)  # domain_name'den önceden hesaplanır
     
     # Doğrulama durumu
     is_verified = db.Column(db.Boolean, default=False)
@@ -30,6 +42,7 @@ class GtmVerification(db.Model):
             'id': self.id,
             'gtm_container_id': self.gtm_container_id,
             'domain_name': self.domain_name,
+            'event_source_url': self.event_source_url,
             'is_verified': self.is_verified,
             'verification_token': self.verification_token,
             'verified_at': self.verified_at.isoformat() if self.verified_at else None,
@@ -37,6 +50,20 @@ class GtmVerification(db.Model):
             'updated_at': self.updated_at.isoformat()
         }
     
+    @staticmethod
+    def build_event_source_url(domain_name):
+        """Normalize a domain into the event_source_url sent to Meta"""
+        domain = domain_name
+        if not domain.startswith('http'):
+            domain = 'https://' + domain
+        # Domain'in başına www. ekle
+        if 'www.' not in domain:
+            domain = domain.replace('https://', 'https://www.')
+        return domain
+    
+    def refresh_event_source_url(self):
+        self.event_source_url = self.build_event_source_url(self.domain_name)
+    
     @staticmethod
     def generate_verification_token():
         """Generate a unique verification token for GTM"""
@@ -1,18 +1,28 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..models.facebook_token import FacebookToken
 from ..services.facebook_capi import FacebookCAPI
 from ..extensions import db
 from ..utils.logger import EventLogger, GtmEventLogger
+from ..utils import json_codec
 from datetime import datetime
 import hashlib
 from ..config import Config
-import threading
 import time
-from app.tasks import send_facebook_event
+import uuid
+import zlib
+from app.tasks import send_facebook_event, send_facebook_event_batch, replay_dead_letter_events
 from ..services.facebook_event_sender import send_event_to_meta
 from app import limiter
 from ..models.gtm_verification import GtmVerification
+from ..services.event_builder import snapshot_request_data
+from ..services.event_batcher import page_view_batcher
+from ..services.batch_sender import send_event_batch
+from ..services.event_registry import get_event_spec, get_event_spec_by_name
+from ..services.token_cache import get_token, invalidate_token
+from ..services.event_queue import push_events
+from ..services.dead_letters import replay_dead_letters, settle_failures, REPLAYABLE_STATUSES
+from ..models.dead_letter_event import DeadLetterEvent
 
 def hash_email(email):
     if not email:
@@ -24,198 +34,40 @@ def hash_phone(phone):
         return None
     return hashlib.sha256(phone.strip().encode('utf-8')).hexdigest()
 
-def get_user_data(data):
-    from app.utils.hashing import (
-        hash_email, hash_phone, hash_name, hash_city, hash_state, 
-        hash_zipcode, hash_country, hash_gender, hash_birthday, hash_external_id
-    )
-    
-    user_data = {
-        'em': [hash_email(data.get('email'))] if data.get('email') else [],
-        'ph': [hash_phone(data.get('phone'))] if data.get('phone') else [],
-        'client_ip_address': data.get('client_ip') or request.remote_addr,
-        'client_user_agent': data.get('user_agent') or request.headers.get('User-Agent')
-    }
-    
-    # Meta CAPI için ek alanları hash'le
-    if data.get('fn'):
-        user_data['fn'] = [hash_name(data.get('fn'))]
-    if data.get('ln'):
-        user_data['ln'] = [hash_name(data.get('ln'))]
-    if data.get('ge'):
-        user_data['ge'] = [hash_gender(data.get('ge'))]
-    if data.get('db'):
-        user_data['db'] = [hash_birthday(data.get('db'))]
-    if data.get('ct'):
-        user_data['ct'] = [hash_city(data.get('ct'))]
-    if data.get('st'):
-        user_data['st'] = [hash_state(data.get('st'))]
-    if data.get('zp'):
-        user_data['zp'] = [hash_zipcode(data.get('zp'))]
-    if data.get('country'):
-        user_data['country'] = [hash_country(data.get('country'))]
-    if data.get('external_id'):
-        user_data['external_id'] = [hash_external_id(data.get('external_id'))]
-    
-    # Facebook Browser ve Pixel ID'leri
-    if data.get('fbc'):
-        user_data['fbc'] = data.get('fbc')
-    if data.get('fbp'):
-        user_data['fbp'] = data.get('fbp')
-    
-    return user_data
-
-def get_domain_by_gtm_container_id(gtm_container_id):
-    verification = GtmVerification.query.filter_by(gtm_container_id=gtm_container_id, is_verified=True).first()
-    if verification:
-        domain = verification.domain_name
-        if not domain.startswith('http'):
-            domain = 'https://' + domain
-        # Domain'in başına www. ekle
-        if 'www.' not in domain:
-            domain = domain.replace('https://', 'https://www.')
-        return domain
-    return 'https://www.example.com'
+facebook_bp = Blueprint('facebook', __name__)
 
-def send_event_to_meta(event_name, data, custom_data=None):
-    start_time = time.time()
-    gtm_container_id = data.get('gtm_container_id')
-    
-    # Log GTM event received
-    GtmEventLogger.log_gtm_event_received(
-        event_name=event_name,
-        gtm_container_id=gtm_container_id,
-        event_data=data
-    )
-    
-    if not gtm_container_id:
-        error_msg = 'GTM Container ID is required'
-        GtmEventLogger.log_gtm_event_complete(
-            event_name=event_name,
-            gtm_container_id=gtm_container_id,
-            total_duration_ms=int((time.time() - start_time) * 1000),
-            success=False
-        )
-        return {'msg': error_msg}, 400
-    
-    token = FacebookToken.query.filter_by(gtm_container_id=gtm_container_id).first()
-    if not token:
-        error_msg = 'No Facebook token found for this GTM Container ID'
-        GtmEventLogger.log_gtm_event_complete(
-            event_name=event_name,
-            gtm_container_id=gtm_container_id,
-            total_duration_ms=int((time.time() - start_time) * 1000),
-            success=False
-        )
-        return {'msg': error_msg}, 404
-    
-    if not token.is_active:
-        error_msg = 'Token is inactive. Please activate the token to send events.'
-        GtmEventLogger.log_gtm_event_complete(
-            event_name=event_name,
-            gtm_container_id=gtm_container_id,
-            total_duration_ms=int((time.time() - start_time) * 1000),
-            success=False
-        )
-        return {'msg': error_msg}, 403
-    
-    # Her zaman domaini kullan
-    event_source_url = get_domain_by_gtm_container_id(gtm_container_id)
-    payload = {
-        'event_name': event_name,
-        'event_time': int(datetime.utcnow().timestamp()),
-        'user_data': get_user_data(data),
-        'custom_data': custom_data or {},
-        'action_source': 'website',
-        'event_source_url': event_source_url,
-    }
-    
-    if data.get('test_event_code'):
-        payload['test_event_code'] = data['test_event_code']
-        print(f"TEST EVENT CODE ADDED: {data['test_event_code']}")
-        print(f"FULL PAYLOAD: {payload}")
-    else:
-        print("NO TEST EVENT CODE FOUND IN DATA")
-        print(f"DATA RECEIVED: {data}")
-    
-    # Log Meta request being sent
-    GtmEventLogger.log_meta_request_sent(
-        event_name=event_name,
-        gtm_container_id=gtm_container_id,
-        meta_payload=payload,
-        access_token=token.access_token,
-        pixel_id=token.dataset_id
-    )
+QUEUED_INGEST_MODES = ('async', 'queue')
+
+def dispatch_event(event_name, data, custom_data=None):
+    """
+    Deliver inline (sync mode) or accept and enqueue for out-of-band delivery
+    (EVENT_INGEST_MODE=async for Celery, queue for the asyncio dispatcher)
+    """
+    mode = current_app.config.get('EVENT_INGEST_MODE')
+    if mode not in QUEUED_INGEST_MODES:
+        body, status_code = send_event_to_meta(event_name, data, custom_data)
+        event = {'event_name': event_name, 'data': data, 'custom_data': custom_data}
+        # İstek backoff beklemez; geçici hatalar worker'ın arka plan thread'inde tekrar denenir
+        settle_failures(current_app._get_current_object(), [event], [(body, status_code)])
+        return body, status_code
+    
+    if not data.get('gtm_container_id'):
+        return {'msg': 'GTM Container ID is required'}, 400
+    
+    # Meta event_id ile tekrar denemelerde deduplication yapar
+    event_id = str(data.get('event_id') or uuid.uuid4())
+    data['event_id'] = event_id
+    snapshot_request_data(data)
     
     try:
-        capi = FacebookCAPI(token.access_token, token.dataset_id)
-        response = capi.send_event(payload)
-        
-        # Log successful Meta response
-        GtmEventLogger.log_meta_response_received(
-            event_name=event_name,
-            gtm_container_id=gtm_container_id,
-            meta_response=response,
-            success=True
-        )
-        
-        # Log complete event cycle
-        GtmEventLogger.log_gtm_event_complete(
-            event_name=event_name,
-            gtm_container_id=gtm_container_id,
-            total_duration_ms=int((time.time() - start_time) * 1000),
-            success=True
-        )
-        
-        return {'msg': 'Event sent to Meta', 'meta_response': response}, 200
-        
+        if mode == 'queue':
+            push_events([{'event_name': event_name, 'data': data, 'custom_data': custom_data}])
+        else:
+            send_facebook_event.apply_async(args=[event_name, data, custom_data], task_id=event_id)
     except Exception as e:
-        error_msg = str(e)
-        
-        # Log failed Meta response
-        GtmEventLogger.log_meta_response_received(
-            event_name=event_name,
-            gtm_container_id=gtm_container_id,
-            meta_response={'error': error_msg},
-            success=False,
-            error_message=error_msg
-        )
-        
-        # Log complete event cycle (failed)
-        GtmEventLogger.log_gtm_event_complete(
-            event_name=event_name,
-            gtm_container_id=gtm_container_id,
-            total_duration_ms=int((time.time() - start_time) * 1000),
-            success=False
-        )
-        
-        return {'msg': 'Meta event error', 'error': error_msg}, 500
-
-facebook_bp = Blueprint('facebook', __name__)
-
-# Sadece page_view için kullanılacak global havuz
-PAGE_VIEW_POOL = []
-BATCH_SIZE = 100         # Kaç event biriktirilecek
-BATCH_INTERVAL = 60      # Kaç saniyede bir gönderilecek (ör: 60 sn)
-
-def send_batch_to_facebook(events):
-    for event in events:
-        try:
-            send_event_to_meta('PageView', event)
-        except Exception as e:
-            print(f"Batch Facebook gönderim hatası: {e}")
-
-def flush_page_view_pool():
-    global PAGE_VIEW_POOL
-    if PAGE_VIEW_POOL:
-        events_to_send = PAGE_VIEW_POOL.copy()
-        PAGE_VIEW_POOL.clear()
-        send_batch_to_facebook(events_to_send)
-    # Zamanlayıcıyı tekrar başlat
-    threading.Timer(BATCH_INTERVAL, flush_page_view_pool).start()
-
-# Sunucu ilk başladığında zamanlayıcıyı başlat
-threading.Timer(BATCH_INTERVAL, flush_page_view_pool).start()
+        return {'msg': 'Event queue unavailable', 'error': str(e)}, 503
+    
+    return {'msg': 'Event accepted', 'event_id': event_id, 'status': 'queued'}, 202
 
 # Duplicate endpoint'ler kaldırıldı - sadece optional JWT olanlar kullanılıyor
 
@@ -599,6 +451,7 @@ def create_token():
         
         db.session.add(token)
         db.session.commit()
+        invalidate_token(gtm_container_id)
         
         EventLogger.log_event(
             user_id=user_id,
@@ -627,435 +480,202 @@ def create_token():
             'error': str(e)
         }), 500
 
-@facebook_bp.route('/events/purchase', methods=['POST'])
-@jwt_required(optional=True)
-def event_purchase():
-    user_id = get_jwt_identity() or 1  # test için default user
-    data = request.get_json() or {}
-    custom_data = {
-        'value': data.get('value'),
-        'currency': data.get('currency'),
-        'content_ids': data.get('content_ids'),
-        'order_id': data.get('order_id'),
-        'contents': data.get('contents', []),
-    }
-    
-    # Test event code varsa custom_data'ya ekle
-    if data.get('test_event_code'):
-        custom_data['test_event_code'] = data['test_event_code']
-    
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
-    
-    return send_event_to_meta('Purchase', data, custom_data)
-
-@facebook_bp.route('/events/lead', methods=['POST'])
-@jwt_required(optional=True)
-def event_lead():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'form_id': data.get('form_id'),
-        'lead_type': data.get('lead_type'),
-    }
-    
-    # Test event code varsa custom_data'ya ekle
-    if data.get('test_event_code'):
-        custom_data['test_event_code'] = data['test_event_code']
-    
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
-    
-    return send_event_to_meta('Lead', data, custom_data)
-
-@facebook_bp.route('/events/add-to-cart', methods=['POST'])
-@jwt_required(optional=True)
-def event_add_to_cart():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'value': data.get('value'),
-        'currency': data.get('currency'),
-        'content_ids': data.get('content_ids'),
-        'contents': data.get('contents', []),
-    }
-    
-    # Test event code varsa custom_data'ya ekle
-    if data.get('test_event_code'):
-        custom_data['test_event_code'] = data['test_event_code']
-    
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
-    
-    return send_event_to_meta('AddToCart', data, custom_data)
-
-@facebook_bp.route('/events/view-content', methods=['POST'])
-@jwt_required(optional=True)
-def event_view_content():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'content_ids': data.get('content_ids'),
-        'value': data.get('value'),
-        'currency': data.get('currency'),
-        'contents': data.get('contents', []),
-    }
-    
-    # Test event code varsa custom_data'ya ekle
-    if data.get('test_event_code'):
-        custom_data['test_event_code'] = data['test_event_code']
-    
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
-    
-    return send_event_to_meta('ViewContent', data, custom_data)
-
-@facebook_bp.route('/events/complete-registration', methods=['POST'])
+@facebook_bp.route('/events/<slug>', methods=['POST'])
 @jwt_required(optional=True)
-def event_complete_registration():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'registration_method': data.get('registration_method'),
-    }
-    
-    # Test event code varsa custom_data'ya ekle
-    if data.get('test_event_code'):
-        custom_data['test_event_code'] = data['test_event_code']
-    
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
+def ingest_event(slug):
+    """Ingest a single Meta standard event; see services/event_registry.py"""
+    spec = get_event_spec(slug)
+    if spec is None:
+        return jsonify({'msg': f'Unknown event: {slug}'}), 404
     
-    return send_event_to_meta('CompleteRegistration', data, custom_data)
-
-@facebook_bp.route('/events/initiate-checkout', methods=['POST'])
-@jwt_required(optional=True)
-def event_initiate_checkout():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'value': data.get('value'),
-        'currency': data.get('currency'),
-        'content_ids': data.get('content_ids'),
-        'contents': data.get('contents', []),
-    }
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
-    return send_event_to_meta('InitiateCheckout', data, custom_data)
-
-@facebook_bp.route('/events/search', methods=['POST'])
-@jwt_required(optional=True)
-def event_search():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'search_string': data.get('search_string'),
-    }
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
-    return send_event_to_meta('Search', data, custom_data)
-
-@facebook_bp.route('/events/contact', methods=['POST'])
-@jwt_required(optional=True)
-def event_contact():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'contact_method': data.get('contact_method'),
-    }
-    
-    # Test event code varsa custom_data'ya ekle
-    if data.get('test_event_code'):
-        custom_data['test_event_code'] = data['test_event_code']
-    
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
-    
-    return send_event_to_meta('Contact', data, custom_data)
-
-@facebook_bp.route('/events/subscribe', methods=['POST'])
-@jwt_required(optional=True)
-def event_subscribe():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'value': data.get('value'),
-        'currency': data.get('currency'),
-        'predicted_ltv': data.get('predicted_ltv')
-    }
-    
-    # Test event code varsa custom_data'ya ekle
-    if data.get('test_event_code'):
-        custom_data['test_event_code'] = data['test_event_code']
-    
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
-    
-    return send_event_to_meta('Subscribe', data, custom_data)
-
-@facebook_bp.route('/events/add-payment-info', methods=['POST'])
-@jwt_required(optional=True)
-def event_add_payment_info():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'value': data.get('value'),
-        'currency': data.get('currency'),
-        'content_ids': data.get('content_ids'),
-        'contents': data.get('contents', [])
-    }
-    
-    # Test event code varsa custom_data'ya ekle
-    if data.get('test_event_code'):
-        custom_data['test_event_code'] = data['test_event_code']
-    
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
-    
-    return send_event_to_meta('AddPaymentInfo', data, custom_data)
-
-@facebook_bp.route('/events/add-to-wishlist', methods=['POST'])
-@jwt_required(optional=True)
-def event_add_to_wishlist():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'content_ids': data.get('content_ids'),
-        'contents': data.get('contents', []),
-    }
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
-    return send_event_to_meta('AddToWishlist', data, custom_data)
-
-@facebook_bp.route('/events/customize-product', methods=['POST'])
-@jwt_required(optional=True)
-def event_customize_product():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'content_ids': data.get('content_ids'),
-        'contents': data.get('contents', []),
-    }
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
-    return send_event_to_meta('CustomizeProduct', data, custom_data)
-
-@facebook_bp.route('/events/donate', methods=['POST'])
-@jwt_required(optional=True)
-def event_donate():
-    user_id = get_jwt_identity() or 1
     data = request.get_json() or {}
-    custom_data = {
-        'value': data.get('value'),
-        'currency': data.get('currency'),
-    }
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
-    return send_event_to_meta('Donate', data, custom_data)
-
-@facebook_bp.route('/events/find-location', methods=['POST'])
-@jwt_required(optional=True)
-def event_find_location():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'content_ids': data.get('content_ids'),
-        'contents': data.get('contents', []),
-        'search_string': data.get('search_string')
-    }
-    
-    # Test event code varsa custom_data'ya ekle
-    if data.get('test_event_code'):
-        custom_data['test_event_code'] = data['test_event_code']
+    custom_data = spec.build_custom_data(data)
+    
+    if spec.event_name == 'PageView' and current_app.config.get('PAGE_VIEW_BATCHING'):
+        return queue_page_view(data, custom_data)
+    
+    return dispatch_event(spec.event_name, data, custom_data)
+
+def queue_page_view(data, custom_data):
+    if not data.get('gtm_container_id'):
+        return {'msg': 'GTM Container ID is required'}, 400
+    page_view_batcher.start(current_app._get_current_object())
+    queued = page_view_batcher.submit({
+        'event_name': 'PageView',
+        'data': snapshot_request_data(data),
+        'custom_data': custom_data
+    })
+    if not queued:
+        return {'msg': 'PageView queue is full, retry later'}, 503
+    return {'msg': 'PageView queued for batch delivery'}, 202
+
+class BatchBodyError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def read_batch_body():
+    """Read a JSON (optionally gzip-encoded) batch body with a size cap"""
+    max_bytes = current_app.config['EVENT_BATCH_MAX_BYTES']
+    raw = request.get_data(cache=False)
+    
+    if request.headers.get('Content-Encoding', '').lower() == 'gzip':
+        try:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            raw = decompressor.decompress(raw, max_bytes + 1)
+        except zlib.error:
+            raise BatchBodyError('Invalid gzip body')
     
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
+    if len(raw) > max_bytes:
+        raise BatchBodyError(f'Batch body exceeds {max_bytes} bytes', 413)
     
-    return send_event_to_meta('FindLocation', data, custom_data)
-
-@facebook_bp.route('/events/schedule', methods=['POST'])
+    try:
+        body = json_codec.loads(raw or b'null')
+    except ValueError:
+        raise BatchBodyError('Invalid JSON body')
+    
+    events = body.get('events') if isinstance(body, dict) else body
+    if not isinstance(events, list) or not events:
+        raise BatchBodyError('Body must be a non-empty array of events or {"events": [...]}')
+    if len(events) > current_app.config['EVENT_BATCH_MAX_EVENTS']:
+        raise BatchBodyError(f"A batch can contain at most {current_app.config['EVENT_BATCH_MAX_EVENTS']} events", 413)
+    return events
+
+def validate_batch_item(item):
+    if not isinstance(item, dict):
+        return 'Event must be an object'
+    if get_event_spec_by_name(item.get('event_name')) is None:
+        return f"Unsupported event_name: {item.get('event_name')}"
+    if not item.get('gtm_container_id'):
+        return 'GTM Container ID is required'
+    if item.get('custom_data') is not None and not isinstance(item.get('custom_data'), dict):
+        return 'custom_data must be an object'
+    return None
+
+@facebook_bp.route('/events/batch', methods=['POST'])
 @jwt_required(optional=True)
-def event_schedule():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'content_ids': data.get('content_ids'),
-        'contents': data.get('contents', []),
-        'delivery_category': data.get('delivery_category')
-    }
-    
-    # Test event code varsa custom_data'ya ekle
-    if data.get('test_event_code'):
-        custom_data['test_event_code'] = data['test_event_code']
-    
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
-    
-    return send_event_to_meta('Schedule', data, custom_data)
+def event_batch():
+    """Ingest several heterogeneous events in one request"""
+    try:
+        items = read_batch_body()
+    except BatchBodyError as e:
+        return jsonify({'msg': str(e)}), e.status_code
+    
+    mode = current_app.config.get('EVENT_INGEST_MODE')
+    is_async = mode in QUEUED_INGEST_MODES
+    results = [None] * len(items)
+    events = []
+    positions = []
+    for index, item in enumerate(items):
+        error = validate_batch_item(item)
+        if error:
+            results[index] = {'index': index, 'status': 400, 'msg': error}
+            continue
+        data = {key: value for key, value in item.items() if key not in ('event_name', 'custom_data')}
+        if is_async:
+            data['event_id'] = str(data.get('event_id') or uuid.uuid4())
+        # custom_data verilmemişse tekil endpoint'lerdeki gibi düz alanlardan çıkar
+        custom_data = item.get('custom_data')
+        if custom_data is None:
+            custom_data = get_event_spec_by_name(item['event_name']).build_custom_data(data)
+        events.append({
+            'event_name': item['event_name'],
+            'data': snapshot_request_data(data),
+            'custom_data': custom_data
+        })
+        positions.append(index)
+    
+    if events and is_async:
+        try:
+            if mode == 'queue':
+                push_events(events)
+            else:
+                send_facebook_event_batch.apply_async(args=[events])
+        except Exception as e:
+            return jsonify({'msg': 'Event queue unavailable', 'error': str(e)}), 503
+        for index, event in zip(positions, events):
+            results[index] = {'index': index, 'status': 202, 'msg': 'Event accepted', 'event_id': event['data']['event_id']}
+    elif events:
+        sent = send_event_batch(events)
+        settle_failures(current_app._get_current_object(), events, sent)
+        for index, event, (body, status_code) in zip(positions, events, sent):
+            results[index] = dict(body, index=index, status=status_code)
+            if event['data'].get('event_id'):
+                results[index]['event_id'] = event['data']['event_id']
+    
+    accepted = sum(1 for result in results if result['status'] in (200, 202))
+    return jsonify({
+        'results': results,
+        'accepted': accepted,
+        'rejected': len(results) - accepted
+    }), 200
 
-@facebook_bp.route('/events/start-trial', methods=['POST'])
-@jwt_required(optional=True)
-def event_start_trial():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'value': data.get('value'),
-        'currency': data.get('currency'),
-        'predicted_ltv': data.get('predicted_ltv')
-    }
-    
-    # Test event code varsa custom_data'ya ekle
-    if data.get('test_event_code'):
-        custom_data['test_event_code'] = data['test_event_code']
-    
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
-    
-    return send_event_to_meta('StartTrial', data, custom_data)
+def user_dead_letters(user_id):
+    """Dead letters for the containers the user owns a token for"""
+    containers = db.session.query(FacebookToken.gtm_container_id).filter(FacebookToken.user_id == user_id)
+    return DeadLetterEvent.query.filter(DeadLetterEvent.gtm_container_id.in_(containers))
 
-@facebook_bp.route('/events/submit-application', methods=['POST'])
-@jwt_required(optional=True)
-def event_submit_application():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'value': data.get('value'),
-        'currency': data.get('currency'),
-        'content_ids': data.get('content_ids'),
-        'contents': data.get('contents', [])
-    }
-    
-    # Test event code varsa custom_data'ya ekle
-    if data.get('test_event_code'):
-        custom_data['test_event_code'] = data['test_event_code']
+@facebook_bp.route('/dead-letters', methods=['GET'])
+@jwt_required()
+def get_dead_letters():
+    """List failed deliveries waiting for replay"""
+    user_id = int(get_jwt_identity())
+    status = request.args.get('status', 'pending')
+    limit = min(request.args.get('limit', 50, type=int), 500)
     
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
+    query = user_dead_letters(user_id).filter(DeadLetterEvent.status == status)
+    if request.args.get('gtm_container_id'):
+        query = query.filter(DeadLetterEvent.gtm_container_id == request.args['gtm_container_id'])
     
-    return send_event_to_meta('SubmitApplication', data, custom_data)
+    return jsonify({
+        'dead_letters': [row.to_dict() for row in query.order_by(DeadLetterEvent.id.desc()).limit(limit)],
+        'total': query.count()
+    }), 200
 
-@facebook_bp.route('/events/page-view', methods=['POST'])
-@jwt_required(optional=True)
-def event_page_view():
-    user_id = get_jwt_identity() or 1
-    data = request.get_json() or {}
-    custom_data = {
-        'content_ids': data.get('content_ids'),
-        'contents': data.get('contents', [])
-    }
-    
-    # Test event code varsa custom_data'ya ekle
-    if data.get('test_event_code'):
-        custom_data['test_event_code'] = data['test_event_code']
-    
-    # Her event fonksiyonunda data sözlüğüne Meta user_data alanlarını ekle
-    meta_user_data_fields = [
-        'email', 'phone', 'fn', 'ln', 'ge', 'db', 'ct', 'st', 'zp', 'country',
-        'external_id', 'client_ip_address', 'client_user_agent', 'fbc', 'fbp'
-    ]
-    for field in meta_user_data_fields:
-        data[field] = data.get(field, '')
+@facebook_bp.route('/dead-letters/replay', methods=['POST'])
+@jwt_required()
+def replay_user_dead_letters():
+    """
+    Re-send pending or held dead letters (optionally by id or container), throttled.
+    EVENT_INGEST_MODE=async hands the replay to Celery (202); otherwise it runs
+    in the request for at most DEAD_LETTER_REPLAY_BUDGET seconds and reports
+    the rows left for the next call as ``remaining``.
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True) or {}
+    max_events = current_app.config['DEAD_LETTER_REPLAY_MAX']
+    limit = min(int(data.get('limit') or max_events), max_events)
+    rate = current_app.config['DEAD_LETTER_REPLAY_RATE']
+    
+    query = user_dead_letters(user_id)
+    if data.get('ids'):
+        query = query.filter(DeadLetterEvent.id.in_(data['ids']))
+    if data.get('gtm_container_id'):
+        query = query.filter(DeadLetterEvent.gtm_container_id == data['gtm_container_id'])
+    
+    if current_app.config.get('EVENT_INGEST_MODE') == 'async':
+        ids = [row.id for row in query.filter(DeadLetterEvent.status.in_(REPLAYABLE_STATUSES))
+               .order_by(DeadLetterEvent.id).with_entities(DeadLetterEvent.id).limit(limit)]
+        if not ids:
+            return jsonify({'queued': 0}), 200
+        try:
+            task = replay_dead_letter_events.apply_async(args=[ids], kwargs={'rate': rate})
+        except Exception as e:
+            return jsonify({'msg': 'Event queue unavailable', 'error': str(e)}), 503
+        return jsonify({'queued': len(ids), 'task_id': task.id}), 202
     
-    return send_event_to_meta('PageView', data, custom_data)
-
-
+    # Gunicorn timeout'u aşılmasın; kalanlar sonraki çağrıda gönderilir
+    summary = replay_dead_letters(query, limit, rate=rate, budget=current_app.config['DEAD_LETTER_REPLAY_BUDGET'])
+    return jsonify(summary), 200
 
 @facebook_bp.route('/token-info/<gtm_container_id>', methods=['GET'])
 def get_token_info(gtm_container_id):
     """Get Facebook token info by GTM container ID for GTM scripts"""
     try:
         # GTM container ID'ye göre aktif token'ı bul
-        token = FacebookToken.query.filter_by(
-            gtm_container_id=gtm_container_id, 
-            is_active=True
-        ).first()
+        token = get_token(gtm_container_id)
         
-        if not token:
+        if not token or not token.is_active:
             GtmEventLogger.log_token_info_request(
                 gtm_container_id=gtm_container_id,
                 success=False,
@@ -3,6 +3,8 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..models.gtm_verification import GtmVerification
 from ..models.facebook_token import FacebookToken
 from ..extensions import db
+from ..services.token_cache import invalidate_token
+from ..services.source_url_cache import invalidate_source_url
 import requests
 import re
 import urllib3
@@ -64,6 +66,7 @@ def add_gtm_verification():
         verification_token=GtmVerification.generate_verification_token(),
         is_verified=False
     )
+    verification.refresh_event_source_url()
 
     db.session.add(verification)
     db.session.commit()
@@ -83,6 +86,7 @@ def update_gtm_verification(verification_id):
     data = request.get_json()
     
     try:
+        previous_container_id = verification.gtm_container_id
         if 'gtm_container_id' in data:
             # GTM Container ID format kontrolü - daha esnek
             if not re.match(r'^GTM-[A-Z0-9]{6,10}$', data['gtm_container_id']):
@@ -94,8 +98,10 @@ def update_gtm_verification(verification_id):
             if not re.match(r'^[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?)*$', data['domain_name']):
                 return jsonify({'msg': 'Geçersiz domain formatı'}), 400
             verification.domain_name = data['domain_name']
+            verification.refresh_event_source_url()
         
         db.session.commit()
+        invalidate_source_url(previous_container_id, verification.gtm_container_id)
         
         return jsonify(verification.to_dict()), 200
     except Exception as e:
@@ -124,8 +130,11 @@ def delete_gtm_verification(verification_id):
         deleted_tokens_count += 1
     
     # GTM doğrulamasını sil
+    gtm_container_id = verification.gtm_container_id
     db.session.delete(verification)
     db.session.commit()
+    invalidate_token(gtm_container_id)
+    invalidate_source_url(gtm_container_id)
     
     if deleted_tokens_count > 0:
         return jsonify({
@@ -157,7 +166,9 @@ def verify_gtm_verification(verification_id):
             if verification.verification_token in response.text:
                 verification.is_verified = True
                 verification.verified_at = datetime.utcnow()
+                verification.refresh_event_source_url()
                 db.session.commit()
+                invalidate_source_url(verification.gtm_container_id)
                 
                 return jsonify({
                     "success": True,
@@ -1,5 +1,6 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, Response
 from flask_cors import cross_origin
+from prometheus_client import CONTENT_TYPE_LATEST
 
 health_bp = Blueprint('health', __name__)
 
@@ -11,4 +12,10 @@ def health_check():
         'status': 'healthy',
         'message': 'CAPIFY API is running',
         'version': '1.0.0'
-    }), 200 
\ No newline at end of file
+    }), 200
+
+@health_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint"""
+    from app.utils.monitoring import get_metrics
+    return Response(get_metrics(), mimetype=CONTENT_TYPE_LATEST)
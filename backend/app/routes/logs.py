@@ -1,15 +1,64 @@
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, jsonify, request, send_file, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import os
 import json
 from datetime import datetime, timedelta
 import re
+from collections import deque
+from ..utils import json_codec
+from ..utils.log_reader import read_lines_reverse
+from ..utils.log_index import sidecar_index, index_path, line_time
+from ..utils.log_stats import RECENT_SIZE, stats_key, split_key, empty_stats
+from ..utils.logger import gtm_log_stats
 
 logs_bp = Blueprint('logs', __name__)
 
+def gtm_log_path():
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs', 'gtm_events.log')
+
+def parse_gtm_jsonl_line(line):
+    """Parse one GTM_LOG_FORMAT=jsonl record into the entry shape of the text parser"""
+    record = json_codec.loads(line)
+    record_type = record.get('type')
+    status = record.get('status')
+    payload = record.get('payload')
+    entry = {
+        'timestamp': record.get('ts'),
+        'level': record.get('level'),
+        'type': record_type,
+        'event': record.get('event'),
+        'container': record.get('container'),
+        'pixel_id': record.get('pixel'),
+        'status': status,
+        'raw_message': line.strip()
+    }
+    
+    if record_type == 'GTM_EVENT_COMPLETE':
+        entry['status'] = 'COMPLETE'
+        entry['final_status'] = status
+        entry['duration'] = record.get('duration_ms')
+    elif record_type == 'GTM_EVENT_RECEIVED':
+        entry['data'] = payload
+    elif record_type == 'META_REQUEST_SENT':
+        entry['payload'] = payload
+    elif record_type == 'META_RESPONSE_RECEIVED':
+        if status == 'ERROR':
+            entry['error'] = payload.get('error')
+            entry['response'] = payload.get('response')
+        else:
+            entry['response'] = payload
+    elif status == 'TOKEN_ERROR':
+        entry['error'] = payload.get('error')
+    
+    # Filtreler .get(key, '') kullanır; boş alanları hiç koyma
+    return {key: value for key, value in entry.items() if value is not None}
+
 def parse_gtm_log_line(line):
-    """Parse a single line from the GTM events log file"""
+    """Parse a single line from the GTM events log file (text or JSONL record)"""
     try:
+        if line.startswith('{'):
+            return parse_gtm_jsonl_line(line)
+        
         # Extract timestamp and message from log line
         parts = line.strip().split(' - ', 2)
         if len(parts) >= 3:
@@ -156,49 +205,77 @@ def parse_gtm_log_line(line):
 @logs_bp.route('/gtm-events', methods=['GET'])
 @jwt_required()
 def get_gtm_events():
-    """Get GTM event logs"""
+    """
+    Get GTM event logs, newest first. The file is read backwards from the end
+    (or from ``cursor``) and reading stops once ``limit`` matching entries are
+    collected; pass ``next_cursor`` back as ``cursor`` for the next page.
+    ``container`` and ``since``/``until`` (epoch seconds) filters only read
+    the byte ranges the sidecar index lists for them.
+    """
     try:
         # Get query parameters
         limit = request.args.get('limit', 100, type=int)
-        level_filter = request.args.get('level', '')
-        event_filter = request.args.get('event', '')
-        container_filter = request.args.get('container', '')
+        level_filter = request.args.get('level', '').upper()
+        event_filter = request.args.get('event', '').upper()
+        container_filter = request.args.get('container', '').upper()
+        cursor = request.args.get('cursor', None, type=int)
+        since = request.args.get('since', None, type=float)
+        until = request.args.get('until', None, type=float)
+        if limit < 1 or (cursor is not None and cursor < 0):
+            return jsonify({'error': 'limit must be positive and cursor non-negative'}), 400
         
         # Log file path
-        log_file_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs', 'gtm_events.log')
+        log_file_path = gtm_log_path()
         
         if not os.path.exists(log_file_path):
-            return jsonify({'logs': [], 'total': 0, 'message': 'No log file found'}), 200
+            return jsonify({'logs': [], 'total': 0, 'next_cursor': None, 'message': 'No log file found'}), 200
+        
+        # Container/zaman filtresinde yalnızca index'in aday gösterdiği aralıklar okunur
+        ranges = [(0, cursor)]
+        if current_app.config.get('GTM_LOG_INDEX') and (container_filter or since is not None or until is not None):
+            index = sidecar_index(
+                log_file_path,
+                bucket_seconds=current_app.config['GTM_LOG_INDEX_BUCKET_SECONDS'],
+                segment_bytes=current_app.config['GTM_LOG_INDEX_SEGMENT_BYTES']
+            )
+            # Index yoksa arka planda kurulur, adaylar dosyanın çoğunu kaplıyorsa gerek yok; bu istek tüm dosyayı tarar
+            candidates = index.candidate_ranges(
+                end=cursor, container=container_filter, since=since, until=until, block=False
+            )
+            if candidates is not None:
+                ranges = candidates
         
-        # Read and parse logs
+        # Dosyanın sonundan geriye doğru oku; filtreyi okurken uygula
         logs = []
-        with open(log_file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            
-        # Parse each line
-        for line in lines:
-            if line.strip():
-                log_entry = parse_gtm_log_line(line)
-                if log_entry:
-                    # Apply filters
-                    if level_filter and log_entry.get('level', '').upper() != level_filter.upper():
-                        continue
-                    if event_filter and log_entry.get('event', '').upper() != event_filter.upper():
+        next_cursor = None
+        for range_start, range_end in ranges:
+            for offset, line in read_lines_reverse(log_file_path, end=range_end, start=range_start):
+                if since is not None or until is not None:
+                    moment = line_time(line)
+                    if moment is None or (since is not None and moment < since) or (until is not None and moment > until):
                         continue
-                    if container_filter and log_entry.get('container', '').upper() != container_filter.upper():
-                        continue
-                    
-                    logs.append(log_entry)
-        
-        # Sort by timestamp (newest first)
-        logs.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        
-        # Apply limit
-        logs = logs[:limit]
+                log_entry = parse_gtm_log_line(line)
+                if not log_entry:
+                    continue
+                # Apply filters
+                if level_filter and log_entry.get('level', '').upper() != level_filter:
+                    continue
+                if event_filter and log_entry.get('event', '').upper() != event_filter:
+                    continue
+                if container_filter and log_entry.get('container', '').upper() != container_filter:
+                    continue
+                
+                logs.append(log_entry)
+                if len(logs) >= limit:
+                    next_cursor = offset
+                    break
+            if next_cursor is not None:
+                break
         
         return jsonify({
             'logs': logs,
             'total': len(logs),
+            'next_cursor': next_cursor,
             'message': f'Retrieved {len(logs)} log entries'
         }), 200
         
@@ -210,7 +287,7 @@ def get_gtm_events():
 def download_gtm_events():
     """Download GTM event logs as file"""
     try:
-        log_file_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs', 'gtm_events.log')
+        log_file_path = gtm_log_path()
         
         if not os.path.exists(log_file_path):
             return jsonify({'error': 'Log file not found'}), 404
@@ -230,85 +307,108 @@ def download_gtm_events():
 def clear_gtm_events():
     """Clear GTM event logs"""
     try:
-        log_file_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs', 'gtm_events.log')
+        log_file_path = gtm_log_path()
         
         # Create empty file or clear existing
         with open(log_file_path, 'w') as f:
             f.write('')
+        # Eski index artık geçersiz; ilk filtreli sorgu yeniden kurar
+        if os.path.exists(index_path(log_file_path)):
+            os.remove(index_path(log_file_path))
+        gtm_log_stats.reset()
         
         return jsonify({'message': 'Logs cleared successfully'}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Metin formatında tür yazılmaz; mesajdan/durumdan çıkarılır
+TEXT_RECORD_TYPES = {
+    'RECEIVED': 'GTM_EVENT_RECEIVED',
+    'SENT': 'META_REQUEST_SENT',
+    'SUCCESS': 'META_RESPONSE_RECEIVED',
+    'ERROR': 'META_RESPONSE_RECEIVED',
+    'COMPLETE': 'GTM_EVENT_COMPLETE',
+    'TOKEN_ERROR': 'TOKEN_INFO_REQUEST'
+}
+
+def count_gtm_log(log_file_path):
+    """
+    Counters and recent items in the LogStats shape, counted from the log
+    file; used once to seed the stats kept by GtmEventLogger.
+    """
+    counters = {}
+    recent = deque(maxlen=RECENT_SIZE)
+    with open(log_file_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            entry = parse_gtm_log_line(line) if line.strip() else None
+            if not entry or entry.get('status') == 'PARSE_ERROR':
+                continue
+            status = entry.get('status')
+            record_type = entry.get('type') or TEXT_RECORD_TYPES.get(status)
+            message = entry.get('raw_message', '')
+            if record_type is None:
+                if message.startswith('Token Info Request:'):
+                    record_type, status = 'TOKEN_INFO_REQUEST', 'OK'
+                elif message.startswith('GTM Script Generated:'):
+                    record_type, status = 'GTM_SCRIPT_GENERATED', 'GENERATED'
+                else:
+                    continue
+                container_match = re.search(r'(GTM-[A-Z0-9]+)', message)
+                entry['container'] = container_match.group(1) if container_match else None
+            outcome = entry.get('final_status') if status == 'COMPLETE' else status
+            key = stats_key(entry.get('container'), entry.get('event'), record_type, entry.get('level'), outcome)
+            counters[key] = counters.get(key, 0) + 1
+            recent.append([line_time(line) or 0, key])
+    return counters, list(recent)
+
+def gtm_stats_response(data):
+    """Stats endpoint body from LogStats counters (kayıt sayısı, satır değil)"""
+    totals = {'total_events': 0, 'success_count': 0, 'error_count': 0, 'warning_count': 0, 'info_count': 0}
+    events_by_type = {}
+    by_container = {}
+    by_outcome = {}
+    for key, count in data['counters'].items():
+        fields = split_key(key)
+        totals['total_events'] += count
+        level = fields['level'].lower() if fields['level'] in ('ERROR', 'WARNING') else 'info'
+        totals[f'{level}_count'] += count
+        if fields['type'] == 'GTM_EVENT_COMPLETE' and fields['outcome'] == 'SUCCESS':
+            totals['success_count'] += count
+        if fields['type'] == 'GTM_EVENT_RECEIVED' and fields['event']:
+            events_by_type[fields['event']] = events_by_type.get(fields['event'], 0) + count
+        container = fields['container'] or 'unknown'
+        by_container[container] = by_container.get(container, 0) + count
+        outcome = f"{fields['type']}:{fields['outcome']}"
+        by_outcome[outcome] = by_outcome.get(outcome, 0) + count
+    
+    recent_activity = []
+    for moment, key in reversed(data['recent']):
+        fields = split_key(key)
+        recent_activity.append({
+            'timestamp': datetime.fromtimestamp(moment).strftime('%Y-%m-%d %H:%M:%S'),
+            'event_name': fields['event'] or None,
+            'level': fields['level'],
+            'message': f"{fields['type']}: {fields['event'] or '-'} | Container: {fields['container']} | Status: {fields['outcome']}"
+        })
+    
+    return dict(totals, events_by_type=events_by_type, by_container=by_container,
+                by_outcome=by_outcome, recent_activity=recent_activity)
+
 @logs_bp.route('/gtm-events/stats', methods=['GET'])
 @jwt_required()
 def get_gtm_events_stats():
-    """Get statistics about GTM events"""
+    """Get statistics about GTM events (counters kept by GtmEventLogger)"""
     try:
-        logs_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs')
-        log_file_path = os.path.join(logs_dir, 'gtm_events.log')
+        log_file_path = gtm_log_path()
+        data = gtm_log_stats.snapshot()
         
-        if not os.path.exists(log_file_path):
-            return jsonify({
-                'total_events': 0,
-                'success_count': 0,
-                'error_count': 0,
-                'warning_count': 0,
-                'info_count': 0,
-                'events_by_type': {},
-                'recent_activity': []
-            }), 200
+        if (data is None or not data['seeded']) and os.path.exists(log_file_path):
+            # Sayaçlardan önce yazılmış log satırları bir kez taranır
+            gtm_log_stats.seed(lambda: count_gtm_log(log_file_path))
+            data = gtm_log_stats.snapshot()
         
-        # Read and analyze logs
-        total_events = 0
-        success_count = 0
-        error_count = 0
-        warning_count = 0
-        info_count = 0
-        events_by_type = {}
-        recent_activity = []
-        
-        with open(log_file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():
-                    total_events += 1
-                    log_entry = parse_gtm_log_line(line)
-                    
-                    if log_entry:
-                        level = log_entry.get('level', 'INFO')
-                        if level == 'SUCCESS':
-                            success_count += 1
-                        elif level == 'ERROR':
-                            error_count += 1
-                        elif level == 'WARNING':
-                            warning_count += 1
-                        else:
-                            info_count += 1
-                        
-                        # Count events by type
-                        event_name = log_entry.get('event')
-                        if event_name:
-                            events_by_type[event_name] = events_by_type.get(event_name, 0) + 1
-                        
-                        # Add to recent activity (last 10 events)
-                        if len(recent_activity) < 10:
-                            recent_activity.append({
-                                'timestamp': log_entry.get('timestamp'),
-                                'event_name': event_name,
-                                'level': level,
-                                'message': log_entry.get('raw_message', '')[:100] + '...' if len(log_entry.get('raw_message', '')) > 100 else log_entry.get('raw_message', '')
-                            })
-        
-        return jsonify({
-            'total_events': total_events,
-            'success_count': success_count,
-            'error_count': error_count,
-            'warning_count': warning_count,
-            'info_count': info_count,
-            'events_by_type': events_by_type,
-            'recent_activity': recent_activity
-        }), 200
+        return jsonify(gtm_stats_response(data or empty_stats())), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
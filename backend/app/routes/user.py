@@ -4,6 +4,7 @@ from ..models.user import User
 from ..models.facebook_token import FacebookToken
 from ..models.gtm_verification import GtmVerification
 from ..extensions import db
+from ..services.token_cache import invalidate_token
 
 user_bp = Blueprint('user', __name__)
 
@@ -104,6 +105,7 @@ def add_facebook_token():
 
     db.session.add(token)
     db.session.commit()
+    invalidate_token(gtm_container_id)
 
     return jsonify(token.to_dict()), 201
 
@@ -124,6 +126,7 @@ def update_facebook_token(token_id):
     print(f"Update data: {data}")
     
     try:
+        previous_container_id = token.gtm_container_id
         if 'access_token' in data:
             token.access_token = data['access_token']
         if 'token_name' in data:
@@ -136,6 +139,7 @@ def update_facebook_token(token_id):
             token.gtm_container_id = data['gtm_container_id']
         
         db.session.commit()
+        invalidate_token(previous_container_id, token.gtm_container_id)
         print(f"Token {token_id} updated successfully")
         
         return jsonify(token.to_dict()), 200
@@ -154,8 +158,10 @@ def delete_facebook_token(token_id):
     if not token:
         return jsonify({'msg': 'Token not found'}), 404
     
+    gtm_container_id = token.gtm_container_id
     db.session.delete(token)
     db.session.commit()
+    invalidate_token(gtm_container_id)
     
     return jsonify({'msg': 'Token deleted successfully'}), 200
 
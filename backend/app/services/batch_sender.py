@@ -0,0 +1,142 @@
+import time
+from ..config import Config
+from ..services.facebook_capi import FacebookCAPI
+from ..services.event_builder import build_event_payload
+from ..services.routing import resolve_route
+from ..services.circuit_breaker import graph_circuit_breaker, held_response
+from ..services.event_dedup import claim_event, confirm_event, release_event
+from ..utils.logger import GtmEventLogger
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _resolve_containers(container_ids):
+    """Look up each container's token and source URL once per batch"""
+    routes = {}
+    for gtm_container_id in container_ids:
+        token, event_source_url = resolve_route(gtm_container_id)
+        if not token:
+            routes[gtm_container_id] = ({'msg': 'No Facebook token found for this GTM Container ID'}, 404)
+        elif not token.is_active:
+            routes[gtm_container_id] = ({'msg': 'Token is inactive. Please activate the token to send events.'}, 403)
+        else:
+            routes[gtm_container_id] = {
+                'access_token': token.access_token,
+                'dataset_id': token.dataset_id,
+                'event_source_url': event_source_url
+            }
+    return routes
+
+def send_event_batch(events):
+    """
+    Deliver events to Meta with as few Graph API requests as possible.
+
+    ``events`` is a list of ``{'event_name', 'data', 'custom_data'}`` dicts.
+    Events are grouped by dataset/access token (and test_event_code, which Meta
+    applies per request) and posted up to GRAPH_BATCH_MAX_EVENTS per request.
+    Returns a list of ``(body, status_code)`` tuples aligned with ``events``,
+    the same shape ``send_event_to_meta`` returns for a single event.
+    """
+    start_time = time.time()
+    results = [None] * len(events)
+
+    for event in events:
+        GtmEventLogger.log_gtm_event_received(
+            event_name=event['event_name'],
+            gtm_container_id=event['data'].get('gtm_container_id'),
+            event_data=event['data']
+        )
+
+    container_ids = {event['data'].get('gtm_container_id') for event in events}
+    container_ids.discard(None)
+    container_ids.discard('')
+    routes = _resolve_containers(container_ids)
+
+    # (dataset_id, access_token, test_event_code) -> [(index, payload)]
+    groups = {}
+    claims = {}
+    for index, event in enumerate(events):
+        data = event['data']
+        gtm_container_id = data.get('gtm_container_id')
+        if not gtm_container_id:
+            results[index] = ({'msg': 'GTM Container ID is required'}, 400)
+            continue
+        route = routes[gtm_container_id]
+        if isinstance(route, tuple):
+            results[index] = route
+            continue
+        claims[index], duplicate = claim_event(route['dataset_id'], event['event_name'], data)
+        if duplicate:
+            results[index] = duplicate
+            continue
+        payload = build_event_payload(
+            event['event_name'],
+            data,
+            event.get('custom_data'),
+            event_source_url=route['event_source_url']
+        )
+        key = (route['dataset_id'], route['access_token'], data.get('test_event_code') or '')
+        groups.setdefault(key, []).append((index, payload))
+
+    capi = FacebookCAPI()
+    for (dataset_id, access_token, test_event_code), members in groups.items():
+        for chunk in _chunks(members, Config.GRAPH_BATCH_MAX_EVENTS):
+            if not graph_circuit_breaker.allow(dataset_id, access_token):
+                for index, _ in chunk:
+                    results[index] = held_response(dataset_id)
+                    release_event(claims[index])
+                continue
+            
+            payloads = [payload for _, payload in chunk]
+            first_event = events[chunk[0][0]]
+            event_names = {payload['event_name'] for payload in payloads}
+            GtmEventLogger.log_meta_request_sent(
+                event_name=event_names.pop() if len(event_names) == 1 else 'Batch',
+                gtm_container_id=first_event['data'].get('gtm_container_id'),
+                meta_payload={'data': payloads},
+                access_token=access_token,
+                pixel_id=dataset_id
+            )
+
+            response = capi.send_events(access_token, dataset_id, payloads, test_event_code=test_event_code)
+            if response.get('success'):
+                graph_circuit_breaker.record_success(dataset_id, access_token)
+            else:
+                graph_circuit_breaker.record_failure(dataset_id, access_token, response.get('auth_failure', False), response.get('error'))
+
+            # Meta bir isteği bütün olarak kabul ya da reddeder; sonucu her event'e dağıt
+            for position, (index, payload) in enumerate(chunk):
+                gtm_container_id = events[index]['data'].get('gtm_container_id')
+                if response.get('success'):
+                    meta_response = dict(response['response'], batch_index=position, batch_size=len(chunk))
+                    results[index] = ({'msg': 'Event sent to Meta', 'meta_response': meta_response}, 200)
+                    confirm_event(claims[index])
+                    GtmEventLogger.log_meta_response_received(
+                        event_name=payload['event_name'],
+                        gtm_container_id=gtm_container_id,
+                        meta_response=meta_response,
+                        success=True
+                    )
+                else:
+                    error_msg = response.get('error')
+                    release_event(claims[index])
+                    results[index] = ({'msg': 'Meta event error', 'error': error_msg, 'retryable': response.get('retryable', False)}, 500)
+                    GtmEventLogger.log_meta_response_received(
+                        event_name=payload['event_name'],
+                        gtm_container_id=gtm_container_id,
+                        meta_response={'error': error_msg, 'batch_index': position, 'batch_size': len(chunk)},
+                        success=False,
+                        error_message=error_msg
+                    )
+
+    total_duration_ms = int((time.time() - start_time) * 1000)
+    for event, (body, status_code) in zip(events, results):
+        GtmEventLogger.log_gtm_event_complete(
+            event_name=event['event_name'],
+            gtm_container_id=event['data'].get('gtm_container_id'),
+            total_duration_ms=total_duration_ms,
+            success=status_code == 200
+        )
+
+    return results
@@ -0,0 +1,167 @@
+import threading
+import time
+from datetime import datetime
+from ..config import Config
+from ..extensions import db
+from ..models.facebook_token import FacebookToken
+from ..utils.logger import get_logger
+from ..utils.monitoring import CIRCUIT_STATE, CIRCUIT_SHORT_CIRCUITS
+
+logger = get_logger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class _Circuit:
+    __slots__ = ('state', 'failures', 'opened_at', 'probing', 'last_error')
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.last_error = None
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker keyed by (dataset id, access token).
+
+    Only auth/permission failures (revoked or expired token, missing dataset
+    permission) count: after ``failure_threshold`` consecutive ones the
+    circuit opens and sends are short-circuited. After ``reset_timeout``
+    seconds one probe is let through (half-open); success closes the circuit,
+    another auth failure opens it again.
+
+    The state machine is per process: ``allow`` does not read the database,
+    so each worker trips on the failures it sees itself. Transitions are
+    written to the token rows for the dashboard, and a success in any
+    worker closes a row another worker left open (one that was restarted or
+    recycled before its probe), checked at most every ``sync_interval``
+    seconds per credential.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout, sync_interval=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.sync_interval = sync_interval
+        self._circuits = {}
+        self._synced = {}
+        self._lock = threading.Lock()
+
+    def allow(self, dataset_id, access_token):
+        """Return True if a request may be sent for this credential"""
+        circuit = self._circuits.get((dataset_id, access_token))
+        if circuit is None or circuit.state == CLOSED:
+            return True
+        with self._lock:
+            if circuit.state == OPEN and time.monotonic() - circuit.opened_at >= self.reset_timeout:
+                self._set_state(dataset_id, circuit, HALF_OPEN)
+            if circuit.state == HALF_OPEN and not circuit.probing:
+                circuit.probing = True
+                return True
+        CIRCUIT_SHORT_CIRCUITS.labels(dataset_id=dataset_id).inc()
+        return False
+
+    def record_success(self, dataset_id, access_token):
+        circuit = self._circuits.get((dataset_id, access_token))
+        if circuit is None or (circuit.state == CLOSED and circuit.failures == 0):
+            self._close_persisted(dataset_id, access_token)
+            return
+        with self._lock:
+            previous = circuit.state
+            circuit.failures = 0
+            circuit.probing = False
+            circuit.last_error = None
+            self._set_state(dataset_id, circuit, CLOSED)
+        if previous != CLOSED:
+            logger.info(f"Circuit closed for dataset {dataset_id}")
+            self._persist(dataset_id, access_token, circuit)
+
+    def record_failure(self, dataset_id, access_token, auth_failure, error=None):
+        with self._lock:
+            circuit = self._circuits.get((dataset_id, access_token))
+            if circuit is None:
+                if not auth_failure:
+                    return
+                circuit = self._circuits[(dataset_id, access_token)] = _Circuit()
+            circuit.probing = False
+            if not auth_failure:
+                # Yetki dışı hata token hakkında bilgi vermez; sayaç değişmez
+                return
+            circuit.failures += 1
+            circuit.last_error = error
+            should_open = circuit.state == HALF_OPEN or \
+                (circuit.state == CLOSED and circuit.failures >= self.failure_threshold)
+            if should_open:
+                circuit.opened_at = time.monotonic()
+                self._set_state(dataset_id, circuit, OPEN)
+        if should_open:
+            logger.warning(f"Circuit opened for dataset {dataset_id} after {circuit.failures} auth failures: {error}")
+            self._persist(dataset_id, access_token, circuit)
+
+    def state(self, dataset_id, access_token):
+        circuit = self._circuits.get((dataset_id, access_token))
+        return circuit.state if circuit else CLOSED
+
+    def reset(self):
+        with self._lock:
+            self._circuits.clear()
+            self._synced.clear()
+
+    def _set_state(self, dataset_id, circuit, state):
+        circuit.state = state
+        CIRCUIT_STATE.labels(dataset_id=dataset_id).set(STATE_VALUES[state])
+
+    def _close_persisted(self, dataset_id, access_token):
+        """Close a row left 'open' by another process; at most once per sync_interval"""
+        now = time.monotonic()
+        key = (dataset_id, access_token)
+        last = self._synced.get(key)
+        if last is not None and now - last < self.sync_interval:
+            return
+        self._synced[key] = now
+        try:
+            closed = FacebookToken.query.filter(
+                FacebookToken.dataset_id == dataset_id,
+                FacebookToken.access_token == access_token,
+                FacebookToken.circuit_state != CLOSED
+            ).update({
+                'circuit_state': CLOSED,
+                'circuit_opened_at': None,
+                'circuit_last_error': None
+            }, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Circuit state write failed for dataset {dataset_id}: {str(e)}")
+            return
+        if closed:
+            logger.info(f"Circuit closed for dataset {dataset_id} (left open by another process)")
+
+    def _persist(self, dataset_id, access_token, circuit):
+        try:
+            FacebookToken.query.filter_by(dataset_id=dataset_id, access_token=access_token).update({
+                'circuit_state': OPEN if circuit.state == OPEN else CLOSED,
+                'circuit_opened_at': datetime.utcnow() if circuit.state == OPEN else None,
+                'circuit_last_error': circuit.last_error
+            }, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Circuit state write failed for dataset {dataset_id}: {str(e)}")
+
+graph_circuit_breaker = CircuitBreaker(
+    failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=Config.CIRCUIT_RESET_TIMEOUT
+)
+
+def held_response(dataset_id):
+    """Result for an event short-circuited by an open circuit; held for replay"""
+    return {
+        'msg': 'Delivery paused: Meta rejected this token or dataset. Event held for replay.',
+        'held': True,
+        'dataset_id': dataset_id
+    }, 503
@@ -0,0 +1,243 @@
+import atexit
+import heapq
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from ..config import Config
+from ..extensions import db
+from ..models.dead_letter_event import DeadLetterEvent
+from ..utils.logger import get_logger
+from ..utils.monitoring import DEAD_LETTERS, DEAD_LETTER_REPLAYS, DELIVERY_RETRIES
+
+logger = get_logger(__name__)
+
+REPLAYABLE_STATUSES = ('pending', 'held')
+
+def retry_delay(attempt):
+    """
+    Exponential backoff with jitter for the ``attempt``-th retry (1-based):
+    half of the window is fixed, half random, so retries never bunch up at 0
+    """
+    window = min(Config.DELIVERY_RETRY_MAX_DELAY, Config.DELIVERY_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    return window / 2 + random.uniform(0, window / 2)
+
+def should_retry(body, status_code, attempts):
+    """A failed delivery is retried while it is transient and attempts remain"""
+    return status_code == 500 and body.get('retryable', False) and attempts < Config.DELIVERY_MAX_ATTEMPTS
+
+def is_held(body, status_code):
+    """True for events short-circuited by an open circuit breaker"""
+    return status_code == 503 and body.get('held', False)
+
+def _build_row(event, body, attempts, status):
+    data = event['data']
+    return DeadLetterEvent(
+        gtm_container_id=data.get('gtm_container_id'),
+        event_name=event['event_name'],
+        event_id=data.get('event_id'),
+        payload=json.dumps({'data': data, 'custom_data': event.get('custom_data')}),
+        error=body.get('error') or body.get('msg'),
+        retryable=body.get('retryable', False),
+        attempts=attempts,
+        status=status
+    )
+
+def _store(rows):
+    try:
+        db.session.add_all(rows)
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Dead letter write failed ({len(rows)} events): {str(e)}")
+        return False
+
+def record_failures(events, results, attempts=1):
+    """
+    Store the events whose delivery failed (status 500) or was held by an
+    open circuit in the dead-letter table. ``results`` are
+    ``(body, status_code)`` tuples aligned with ``events``; client errors
+    (4xx) are not stored.
+    """
+    rows = [
+        _build_row(event, body, attempts, 'held' if is_held(body, status_code) else 'pending')
+        for event, (body, status_code) in zip(events, results)
+        if status_code == 500 or is_held(body, status_code)
+    ]
+    if not rows or not _store(rows):
+        return 0
+    for row in rows:
+        if row.status == 'held':
+            DEAD_LETTERS.labels(reason='held').inc()
+        else:
+            DEAD_LETTERS.labels(reason='exhausted' if row.retryable else 'permanent').inc()
+    return len(rows)
+
+def record_dead_letter(event_name, data, custom_data, body, attempts=1):
+    event = {'event_name': event_name, 'data': data, 'custom_data': custom_data}
+    return record_failures([event], [(body, 500)], attempts)
+
+def _redrive(row):
+    """Send a dead letter again and update its row; returns ``(body, status_code)``"""
+    from .facebook_event_sender import send_event_to_meta
+
+    event = row.event
+    body, status_code = send_event_to_meta(event['event_name'], event['data'], event['custom_data'])
+    row.attempts = (row.attempts or 0) + 1
+    row.last_attempt_at = datetime.utcnow()
+    if status_code == 200:
+        row.status = 'replayed'
+        row.replayed_at = row.last_attempt_at
+    else:
+        # Devre hâlâ açıksa event 'held' kalır, aksi halde normal hata kaydı olur
+        row.status = 'held' if is_held(body, status_code) else 'pending'
+        row.error = body.get('error') or body.get('msg')
+        row.retryable = body.get('retryable', False)
+    db.session.commit()
+    return body, status_code
+
+class RetryScheduler:
+    """
+    Per-worker retries for EVENT_INGEST_MODE=sync, where the request cannot
+    wait out a backoff and no Celery worker may be running.
+
+    A transient failure is first stored as a pending dead letter, so it
+    survives the worker; a background thread then re-sends the row after
+    ``retry_delay`` until it goes through, fails permanently or reaches
+    DELIVERY_MAX_ATTEMPTS. Rows left when the worker exits stay pending for
+    the replay API.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self._pid = None
+        self._app = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, app, row_id, delay):
+        with self._wakeup:
+            if self._pid != os.getpid():
+                # Fork sonrası master'ın listesi kullanılmaz
+                self._heap = []
+                self._stopping = False
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='delivery-retry', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+            self._app = app
+            heapq.heappush(self._heap, (time.monotonic() + delay, row_id))
+            self._wakeup.notify()
+
+    def stop(self, timeout=5):
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify()
+        self._thread.join(timeout)
+        self._thread = None
+        self._pid = None
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not self._stopping and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    self._wakeup.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                if self._stopping:
+                    return
+                _, row_id = heapq.heappop(self._heap)
+                app = self._app
+            try:
+                with app.app_context():
+                    self._retry(app, row_id)
+            except Exception as e:
+                logger.error(f"Retry of dead letter {row_id} failed: {str(e)}")
+
+    def _retry(self, app, row_id):
+        row = db.session.get(DeadLetterEvent, row_id)
+        # Bu arada replay API ile gönderilmiş ya da devre açılmış olabilir
+        if row is None or row.status != 'pending':
+            return
+        body, status_code = _redrive(row)
+        if should_retry(body, status_code, row.attempts):
+            DELIVERY_RETRIES.labels(path='sync').inc()
+            self.schedule(app, row_id, retry_delay(row.attempts))
+        elif status_code != 200:
+            DEAD_LETTERS.labels(reason='held' if row.status == 'held' else 'exhausted' if row.retryable else 'permanent').inc()
+
+retry_scheduler = RetryScheduler()
+
+def settle_failures(app, events, results, attempts=1):
+    """
+    Outcome handling for paths that send inline (EVENT_INGEST_MODE=sync, the
+    PageView batcher): transient failures are stored as pending dead letters
+    and re-sent from this worker after backoff, everything else goes to
+    ``record_failures``. ``results`` are ``(body, status_code)`` tuples
+    aligned with ``events``.
+    """
+    rows, final = [], []
+    for event, (body, status_code) in zip(events, results):
+        if should_retry(body, status_code, attempts):
+            rows.append(_build_row(event, body, attempts, 'pending'))
+        else:
+            final.append((event, (body, status_code)))
+    if rows and _store(rows):
+        for row in rows:
+            DELIVERY_RETRIES.labels(path='sync').inc()
+            retry_scheduler.schedule(app, row.id, retry_delay(attempts))
+    if final:
+        record_failures([event for event, _ in final], [result for _, result in final], attempts)
+
+def purge_dead_letters(older_than_days):
+    """
+    Delete the dead letters nothing will replay: replayed rows, and rows of
+    any status created more than ``older_than_days`` ago (0 keeps them).
+    Their payload is the raw event data, so it is not kept around.
+    Returns the deleted counts.
+    """
+    replayed = DeadLetterEvent.query.filter_by(status='replayed').delete(synchronize_session=False)
+    expired = 0
+    if older_than_days:
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        expired = DeadLetterEvent.query.filter(DeadLetterEvent.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    if expired:
+        logger.warning(f"Purged {expired} dead letters older than {older_than_days:g} days without replay")
+    return {'replayed': replayed, 'expired': expired}
+
+def replay_dead_letters(query, limit, rate=None, budget=None):
+    """
+    Re-drive pending and held dead letters from ``query`` (oldest first)
+    through send_event_to_meta, at most ``rate`` events per second. With
+    ``budget`` (seconds) no new event is started once it is spent; the
+    rows left over are reported as ``remaining``.
+    """
+    rows = query.filter(DeadLetterEvent.status.in_(REPLAYABLE_STATUSES)).order_by(DeadLetterEvent.id).limit(limit).all()
+    interval = 1.0 / rate if rate else 0
+    deadline = time.monotonic() + budget if budget else None
+    summary = {'replayed': 0, 'failed': 0, 'remaining': 0, 'results': []}
+
+    for position, row in enumerate(rows):
+        if deadline is not None and time.monotonic() + (interval if position else 0) >= deadline:
+            summary['remaining'] = len(rows) - position
+            break
+        if position and interval:
+            time.sleep(interval)
+        body, status_code = _redrive(row)
+        if status_code == 200:
+            summary['replayed'] += 1
+            DEAD_LETTER_REPLAYS.labels(result='replayed').inc()
+        else:
+            summary['failed'] += 1
+            DEAD_LETTER_REPLAYS.labels(result='failed').inc()
+        summary['results'].append({'id': row.id, 'status_code': status_code, 'status': row.status})
+
+    return summary
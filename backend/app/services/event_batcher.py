@@ -0,0 +1,143 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from ..config import Config
+from ..utils.logger import get_logger
+from ..utils.monitoring import EVENT_BATCH_QUEUE_DEPTH, EVENT_BATCH_FLUSH_LATENCY, EVENT_BATCH_REJECTED, track_gauge
+
+logger = get_logger(__name__)
+
+class EventBatcher:
+    """
+    Per-worker background batcher for pooled events.
+
+    Events are buffered in a bounded queue and flushed through
+    ``send_event_batch`` when ``max_batch_size`` events are waiting or the
+    oldest one is ``max_batch_age`` seconds old. A full queue rejects new
+    events instead of growing without bound. ``start`` is called from
+    gunicorn's ``post_fork`` (and lazily on first use), ``stop`` drains what
+    is left before the worker exits.
+    """
+
+    def __init__(self, name, max_batch_size, max_batch_age, max_queue_size, enqueue_timeout):
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_batch_age = max_batch_age
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._app = None
+        track_gauge(EVENT_BATCH_QUEUE_DEPTH.labels(batcher=name), self.qsize)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def is_running(self):
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def start(self, app):
+        """Start the flush thread for this process; safe to call repeatedly"""
+        if self.is_running():
+            return
+        with self._lock:
+            if self.is_running():
+                return
+            if self._pid != os.getpid():
+                # Fork sonrası master'dan kalan kuyruk ve kilitler kullanılmaz
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                atexit.register(self.stop)
+            self._stopping = threading.Event()
+            self._app = app
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=f'{self.name}-batcher', daemon=True)
+            self._thread.start()
+            logger.info(f"{self.name} batcher started (pid: {self._pid})")
+
+    def submit(self, event):
+        """
+        Queue an event for the next flush. Returns False when the queue is
+        full so the caller can push back on the client.
+        """
+        try:
+            self._queue.put((time.monotonic(), event), timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            EVENT_BATCH_REJECTED.labels(batcher=self.name).inc()
+            return False
+
+    def stop(self, timeout=None):
+        """Flush everything still queued and wait for the thread to finish"""
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info(f"{self.name} batcher stopped (pid: {self._pid})")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+        self._drain()
+
+    def _collect(self):
+        try:
+            enqueued_at, event = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        batch = [event]
+        deadline = enqueued_at + self.max_batch_age
+        while len(batch) < self.max_batch_size and not self._stopping.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.5))[1])
+            except queue.Empty:
+                continue
+        return batch
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait()[1])
+            except queue.Empty:
+                break
+            if len(batch) >= self.max_batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch):
+        from .batch_sender import send_event_batch
+        from .dead_letters import settle_failures
+
+        start_time = time.time()
+        try:
+            with self._app.app_context():
+                results = send_event_batch(batch)
+                settle_failures(self._app, batch, results)
+            failed = sum(1 for _, status_code in results if status_code != 200)
+            if failed:
+                logger.warning(f"{self.name} batch: {failed}/{len(batch)} events failed")
+        except Exception as e:
+            logger.error(f"{self.name} batch flush failed ({len(batch)} events): {str(e)}")
+        finally:
+            EVENT_BATCH_FLUSH_LATENCY.labels(batcher=self.name).observe(time.time() - start_time)
+
+page_view_batcher = EventBatcher(
+    name='page_view',
+    max_batch_size=Config.PAGE_VIEW_BATCH_SIZE,
+    max_batch_age=Config.PAGE_VIEW_BATCH_MAX_AGE,
+    max_queue_size=Config.PAGE_VIEW_QUEUE_MAX_SIZE,
+    enqueue_timeout=Config.PAGE_VIEW_ENQUEUE_TIMEOUT
+)
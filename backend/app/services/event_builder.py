@@ -0,0 +1,74 @@
+from flask import request, has_request_context
+from datetime import datetime
+from .source_url_cache import get_source_url, DEFAULT_EVENT_SOURCE_URL
+from ..utils.hashing import hash_user_fields
+
+def get_user_data(data):
+    """
+    Build Meta CAPI user_data from an inbound event.
+
+    Client IP and User-Agent fall back to the current request; events delivered
+    outside a request (batch flush, workers) must carry client_ip/user_agent.
+    """
+    if has_request_context():
+        fallback_ip = request.remote_addr
+        fallback_user_agent = request.headers.get('User-Agent')
+    else:
+        fallback_ip = None
+        fallback_user_agent = None
+
+    user_data = {
+        'em': [],
+        'ph': [],
+        'client_ip_address': data.get('client_ip') or fallback_ip,
+        'client_user_agent': data.get('user_agent') or fallback_user_agent
+    }
+
+    # Meta CAPI için PII alanlarını tek seferde hash'le
+    user_data.update(hash_user_fields(data))
+
+    # Facebook Browser ve Pixel ID'leri
+    if data.get('fbc'):
+        user_data['fbc'] = data.get('fbc')
+    if data.get('fbp'):
+        user_data['fbp'] = data.get('fbp')
+
+    return user_data
+
+def snapshot_request_data(data):
+    """
+    Freeze request-derived fields (client IP, User-Agent, event time) into the
+    event data so it can be delivered later without a request context
+    """
+    if has_request_context():
+        if not data.get('client_ip'):
+            data['client_ip'] = request.remote_addr
+        if not data.get('user_agent'):
+            data['user_agent'] = request.headers.get('User-Agent')
+    if not data.get('event_time'):
+        data['event_time'] = int(datetime.utcnow().timestamp())
+    return data
+
+def get_domain_by_gtm_container_id(gtm_container_id):
+    return get_source_url(gtm_container_id) or DEFAULT_EVENT_SOURCE_URL
+
+def build_event_payload(event_name, data, custom_data=None, event_source_url=None, user_data=None):
+    """
+    Build a single Meta CAPI event from inbound GTM event data.
+    ``user_data`` skips get_user_data when the caller already built it.
+    """
+    payload = {
+        'event_name': event_name,
+        'event_time': data.get('event_time') or int(datetime.utcnow().timestamp()),
+        'user_data': user_data if user_data is not None else get_user_data(data),
+        'custom_data': custom_data or {},
+        'action_source': 'website',
+        'event_source_url': event_source_url,
+    }
+
+    if data.get('event_id'):
+        payload['event_id'] = str(data['event_id'])
+    if data.get('test_event_code'):
+        payload['test_event_code'] = data['test_event_code']
+
+    return payload
@@ -0,0 +1,127 @@
+"""
+Windowed event_id deduplication in front of the Graph API.
+
+An event is keyed by (dataset id, event name, event_id). The first copy
+claims the key and is sent; later copies are dropped and counted per
+container. A claim first lives EVENT_DEDUP_CLAIM_TTL seconds and is
+extended to the full EVENT_DEDUP_WINDOW only once Meta accepted the
+event, so a worker that dies mid-send (Celery redelivers the task after
+the broker's visibility timeout) does not leave the event marked as
+sent. A failed, held or cancelled delivery releases its claim so retries,
+requeues and dead-letter replays still go out.
+
+EVENT_DEDUP_BACKEND=memory keeps an exact, size-bounded LRU set per
+process; redis shares the window across workers with SET NX EX keys.
+Events without an event_id are never deduplicated.
+"""
+import os
+from ..config import Config
+from ..utils.ttl_cache import TTLCache
+from ..utils.logger import get_logger
+from ..utils.monitoring import DEDUP_DROPPED
+
+logger = get_logger(__name__)
+
+class MemoryDedupStore:
+    def __init__(self, maxsize, window, claim_ttl):
+        self.window = window
+        self.claim_ttl = claim_ttl
+        self._seen = TTLCache('event_dedup', maxsize, window)
+
+    def claim(self, key):
+        return self._seen.add(key, ttl=self.claim_ttl)
+
+    def extend(self, key, ttl):
+        self._seen.set(key, True, ttl=ttl)
+
+    def release(self, key):
+        self._seen.invalidate(key)
+
+    def clear(self):
+        self._seen.clear()
+
+class RedisDedupStore:
+    def __init__(self, url, window, claim_ttl, prefix='capify:dedup:'):
+        self.url = url
+        self.window = int(window)
+        self.claim_ttl = int(claim_ttl)
+        self.prefix = prefix
+        self._client = None
+        self._client_pid = None
+
+    def _redis(self):
+        # Fork sonrası bağlantı paylaşılmasın
+        if self._client is None or self._client_pid != os.getpid():
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+            self._client_pid = os.getpid()
+        return self._client
+
+    def claim(self, key):
+        try:
+            return bool(self._redis().set(self.prefix + key, 1, nx=True, ex=self.claim_ttl))
+        except Exception as e:
+            # Redis yoksa event'i kaybetmek yerine gönder
+            logger.error(f"Dedup store unavailable, sending without dedup: {str(e)}")
+            return True
+
+    def extend(self, key, ttl):
+        try:
+            self._redis().set(self.prefix + key, 1, ex=int(ttl))
+        except Exception as e:
+            logger.error(f"Dedup extend failed for {key}: {str(e)}")
+
+    def release(self, key):
+        try:
+            self._redis().delete(self.prefix + key)
+        except Exception as e:
+            logger.error(f"Dedup release failed for {key}: {str(e)}")
+
+    def clear(self):
+        pass
+
+def make_store(backend):
+    backend = (backend or 'off').lower()
+    if backend == 'memory':
+        return MemoryDedupStore(Config.EVENT_DEDUP_MAX_SIZE, Config.EVENT_DEDUP_WINDOW, Config.EVENT_DEDUP_CLAIM_TTL)
+    if backend == 'redis':
+        return RedisDedupStore(Config.EVENT_DEDUP_URL, Config.EVENT_DEDUP_WINDOW, Config.EVENT_DEDUP_CLAIM_TTL)
+    return None
+
+dedup_store = make_store(Config.EVENT_DEDUP_BACKEND)
+
+def dedup_key(dataset_id, event_name, data):
+    event_id = data.get('event_id')
+    if not event_id:
+        return None
+    return f"{dataset_id}:{event_name}:{event_id}"
+
+def claim_event(dataset_id, event_name, data):
+    """
+    Claim an event for delivery. Returns ``(key, None)`` when it should be
+    sent (``key`` is None if dedup does not apply) or ``(None, response)``
+    for a duplicate.
+    """
+    key = dedup_key(dataset_id, event_name, data) if dedup_store is not None else None
+    if key is None or dedup_store.claim(key):
+        return key, None
+    DEDUP_DROPPED.labels(gtm_container_id=data.get('gtm_container_id') or 'unknown').inc()
+    return None, duplicate_response(data.get('event_id'))
+
+def refresh_claim(key):
+    """Keep an in-progress claim alive across retries of the same delivery"""
+    if key is not None and dedup_store is not None:
+        dedup_store.extend(key, dedup_store.claim_ttl)
+
+def confirm_event(key):
+    """Meta accepted the event; hold its key for the full dedup window"""
+    if key is not None and dedup_store is not None:
+        dedup_store.extend(key, dedup_store.window)
+
+def release_event(key):
+    """Forget a claim whose delivery did not succeed"""
+    if key is not None and dedup_store is not None:
+        dedup_store.release(key)
+
+def duplicate_response(event_id):
+    return {'msg': 'Duplicate event dropped', 'duplicate': True, 'event_id': event_id}, 200
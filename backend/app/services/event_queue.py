@@ -0,0 +1,24 @@
+import os
+import redis
+from ..config import Config
+from ..utils import json_codec
+
+_client = None
+_client_pid = None
+
+def get_redis():
+    """Per-process Redis client for the dispatcher queue (rebuilt after fork)"""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        _client = redis.Redis.from_url(Config.EVENT_QUEUE_URL)
+        _client_pid = os.getpid()
+    return _client
+
+def push_events(events):
+    """
+    Append ``{'event_name', 'data', 'custom_data'}`` events to the dispatcher
+    queue consumed by ``python -m app.dispatcher``
+    """
+    if not events:
+        return
+    get_redis().rpush(Config.EVENT_QUEUE_KEY, *[json_codec.dumps(event) for event in events])
@@ -0,0 +1,66 @@
+"""
+Meta standard event registry.
+
+Each event declares its URL slug and the custom_data fields it forwards once;
+the extractor is compiled when the module is imported so the ingest path only
+runs a single dict comprehension per event.
+"""
+
+# Varsayılanı None olmayan alanlar
+FIELD_DEFAULTS = {
+    'contents': [],
+}
+
+class EventSpec:
+    """A Meta standard event and the custom_data fields it carries"""
+
+    __slots__ = ('slug', 'event_name', 'custom_fields', '_fields')
+
+    def __init__(self, slug, event_name, custom_fields):
+        self.slug = slug
+        self.event_name = event_name
+        self.custom_fields = tuple(custom_fields)
+        # test_event_code tüm event'lerde custom_data'ya da eklenir
+        self._fields = tuple((field, FIELD_DEFAULTS.get(field)) for field in self.custom_fields)
+
+    def build_custom_data(self, data):
+        get = data.get
+        custom_data = {field: get(field, default) for field, default in self._fields}
+        if get('test_event_code'):
+            custom_data['test_event_code'] = data['test_event_code']
+        return custom_data
+
+    def __repr__(self):
+        return f'<EventSpec {self.event_name}>'
+
+_COMMERCE = ('value', 'currency', 'content_ids', 'contents')
+
+EVENT_SPECS = (
+    EventSpec('purchase', 'Purchase', ('value', 'currency', 'content_ids', 'order_id', 'contents')),
+    EventSpec('lead', 'Lead', ('form_id', 'lead_type')),
+    EventSpec('add-to-cart', 'AddToCart', _COMMERCE),
+    EventSpec('view-content', 'ViewContent', _COMMERCE),
+    EventSpec('complete-registration', 'CompleteRegistration', ('registration_method',)),
+    EventSpec('initiate-checkout', 'InitiateCheckout', _COMMERCE),
+    EventSpec('search', 'Search', ('search_string',)),
+    EventSpec('contact', 'Contact', ('contact_method',)),
+    EventSpec('subscribe', 'Subscribe', ('value', 'currency', 'predicted_ltv')),
+    EventSpec('add-payment-info', 'AddPaymentInfo', _COMMERCE),
+    EventSpec('add-to-wishlist', 'AddToWishlist', ('content_ids', 'contents')),
+    EventSpec('customize-product', 'CustomizeProduct', ('content_ids', 'contents')),
+    EventSpec('donate', 'Donate', ('value', 'currency')),
+    EventSpec('find-location', 'FindLocation', ('content_ids', 'contents', 'search_string')),
+    EventSpec('schedule', 'Schedule', ('content_ids', 'contents', 'delivery_category')),
+    EventSpec('start-trial', 'StartTrial', ('value', 'currency', 'predicted_ltv')),
+    EventSpec('submit-application', 'SubmitApplication', _COMMERCE),
+    EventSpec('page-view', 'PageView', ('content_ids', 'contents')),
+)
+
+EVENTS_BY_SLUG = {spec.slug: spec for spec in EVENT_SPECS}
+EVENTS_BY_NAME = {spec.event_name: spec for spec in EVENT_SPECS}
+
+def get_event_spec(slug):
+    return EVENTS_BY_SLUG.get(slug)
+
+def get_event_spec_by_name(event_name):
+    return EVENTS_BY_NAME.get(event_name)
@@ -1,75 +1,94 @@
 import requests
-import json
 import os
 from datetime import datetime
-from ..utils.hashing import hash_email, hash_phone, hash_external_id
+from ..utils.hashing import hash_user_fields
 from ..utils.logger import EventLogger
+from . import graph_transport
+from ..utils import json_codec
+from .graph_errors import classify_response, classify_exception, GraphFailure
 
 class FacebookCAPI:
-    def __init__(self):
-        self.base_url = "https://graph.facebook.com/v18.0"
+    def __init__(self, access_token=None, pixel_id=None):
+        self.base_url = graph_transport.graph_base_url()
+        self.access_token = access_token
+        self.pixel_id = pixel_id
         self.logger = EventLogger()
     
     def send_event(self, access_token, pixel_id, event_data):
         """
         Send event to Facebook Conversions API
         """
+        return self.send_events(
+            access_token,
+            pixel_id,
+            [event_data],
+            test_event_code=event_data.get("test_event_code", "")
+        )
+    
+    def send_events(self, access_token, pixel_id, events, test_event_code=""):
+        """
+        Send several events to Facebook Conversions API in one request
+        """
         url = f"{self.base_url}/{pixel_id}/events"
         
         payload = {
-            "data": [event_data],
+            "data": events,
             "access_token": access_token,
-            "test_event_code": event_data.get("test_event_code", "")
-        }
-        
-        headers = {
-            "Content-Type": "application/json"
+            "test_event_code": test_event_code or ""
         }
+        log_data = events[0] if len(events) == 1 else {"event_count": len(events)}
         
         try:
             # Disable SSL verification for development
-            response = requests.post(
+            response = graph_transport.post(
                 url,
-                data=json.dumps(payload),
-                headers=headers,
-                verify=False,  # Disable SSL verification
-                timeout=30
+                data=json_codec.dumps_bytes(payload),
+                verify=False  # Disable SSL verification
             )
             
             if response.status_code == 200:
                 result = response.json()
                 self.logger.log_event(
-                    event_type="facebook_capi",
-                    event_data=event_data,
-                    event_name=event_data.get("event_name"),
                     user_id=None,
-                    status="success",
-                    meta_response=result
+                    event_type="facebook_capi",
+                    event_data=log_data,
+                    success=True
                 )
                 return {"success": True, "response": result}
             else:
                 error_msg = f"Facebook API error: {response.status_code} - {response.text}"
                 self.logger.log_event(
-                    event_type="facebook_capi",
-                    event_data=event_data,
-                    event_name=event_data.get("event_name"),
                     user_id=None,
-                    status="error",
-                    error=error_msg
+                    event_type="facebook_capi",
+                    event_data=log_data,
+                    success=False,
+                    error_message=error_msg
                 )
-                return {"success": False, "error": error_msg}
+                return self._failure(error_msg, classify_response(response.status_code, response.text))
                 
         except Exception as e:
             error_msg = f"Facebook CAPI exception: {str(e)}"
             self.logger.log_event(
-                event_type="facebook_capi",
-                event_data=event_data,
-                event_name=event_data.get("event_name"),
                 user_id=None,
-                status="error",
-                error=error_msg
+                event_type="facebook_capi",
+                event_data=log_data,
+                success=False,
+                error_message=error_msg
             )
-            return {"success": False, "error": error_msg}
+            if isinstance(e, requests.exceptions.RequestException):
+                return self._failure(error_msg, classify_exception(e))
+            return self._failure(error_msg, GraphFailure(message=str(e)))
+    
+    @staticmethod
+    def _failure(error_msg, failure):
+        return {
+            "success": False,
+            "error": error_msg,
+            "status_code": failure.status_code,
+            "error_code": failure.error_code,
+            "retryable": failure.retryable,
+            "auth_failure": failure.auth_failure
+        }
     
     def _prepare_event_payload(self, event_data):
         """
@@ -84,7 +103,7 @@ class FacebookCAPI:
             'event_time': event_time,
             'action_source': 'website',
             'event_source_url': event_data.get('event_source_url'),
-            'user_data': self._prepare_user_data(event_data.get('user_data', {})),
+            'user_data': self._prepare_user_data(event_data.get('user_data', {}), event_data.get('gtm_container_id')),
             'custom_data': event_data.get('custom_data', {})
         }
         
@@ -102,35 +121,14 @@ class FacebookCAPI:
             'access_token': self.access_token
         }
     
-    def _prepare_user_data(self, user_data):
+    def _prepare_user_data(self, user_data, gtm_container_id=None):
         """
         Prepare and hash user data for Facebook CAPI (Meta uyumlu tüm alanlar)
         """
-        prepared_data = {}
-
-        # Hashlenmesi gereken alanlar
-        if user_data.get('email'):
-            prepared_data['em'] = hash_email(user_data['email'])
-        if user_data.get('phone'):
-            prepared_data['ph'] = hash_phone(user_data['phone'])
-        if user_data.get('fn'):
-            prepared_data['fn'] = hash_email(user_data['fn'])  # hash_email fonksiyonu SHA256 için kullanılabilir
-        if user_data.get('ln'):
-            prepared_data['ln'] = hash_email(user_data['ln'])
-        if user_data.get('ge'):
-            prepared_data['ge'] = hash_email(user_data['ge'])
-        if user_data.get('db'):
-            prepared_data['db'] = hash_email(user_data['db'])
-        if user_data.get('ct'):
-            prepared_data['ct'] = hash_email(user_data['ct'])
-        if user_data.get('st'):
-            prepared_data['st'] = hash_email(user_data['st'])
-        if user_data.get('zp'):
-            prepared_data['zp'] = hash_email(user_data['zp'])
-        if user_data.get('country'):
-            prepared_data['country'] = hash_email(user_data['country'])
-        if user_data.get('external_id'):
-            prepared_data['external_id'] = hash_external_id(user_data['external_id'])
+        # Hashlenmesi gereken alanlar; önceden hashlenmiş değerler olduğu gibi geçer
+        prepared_data = {
+            key: values[0] for key, values in hash_user_fields(user_data, gtm_container_id).items()
+        }
 
         # Düz olarak gönderilecek alanlar
         if user_data.get('client_ip_address'):
@@ -150,21 +148,15 @@ class FacebookCAPI:
         """
         url = f"{self.base_url}/{self.pixel_id}/events"
         
-        headers = {
-            'Content-Type': 'application/json'
-        }
-        
         # SSL verification ayarı - dinamik olarak al
         from ..utils.ssl_config import get_ssl_verify_setting
         ssl_verify = get_ssl_verify_setting()
         
         try:
-            response = requests.post(
+            response = graph_transport.post(
                 url,
-                data=json.dumps(payload),
-                verify=ssl_verify,
-                headers=headers,
-                timeout=30
+                data=json_codec.dumps_bytes(payload),
+                verify=ssl_verify
             )
             
             if response.status_code != 200:
@@ -175,12 +167,10 @@ class FacebookCAPI:
         except requests.exceptions.SSLError as e:
             # SSL hatası durumunda verify=False ile dene
             try:
-                response = requests.post(
+                response = graph_transport.post(
                     url,
-                    data=json.dumps(payload),
-                    headers=headers,
-                    verify=False,  # SSL verification'ı kapat
-                    timeout=30
+                    data=json_codec.dumps_bytes(payload),
+                    verify=False  # SSL verification'ı kapat
                 )
                 
                 if response.status_code != 200:
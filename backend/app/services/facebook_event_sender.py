@@ -1,80 +1,152 @@
-from ..models.facebook_token import FacebookToken
+from ..services.token_cache import get_token
 from ..services.facebook_capi import FacebookCAPI
-from ..utils.logger import EventLogger, get_logger
-from datetime import datetime
-from flask import request
-import hashlib
-from ..config import Config
+from ..services import graph_transport
+from ..utils import json_codec
+from ..services.event_builder import build_event_payload, get_user_data
+from ..services.routing import resolve_route
+from ..services.circuit_breaker import graph_circuit_breaker, held_response
+from ..services.event_dedup import claim_event, confirm_event, release_event
+from ..utils.logger import EventLogger, GtmEventLogger, get_logger
+from ..utils.monitoring import StageTimer
 import requests
 import logging
+import time
 
 logger = get_logger(__name__)
 
-def hash_email(email):
-    if not email:
-        return None
-    return hashlib.sha256(email.strip().lower().encode('utf-8')).hexdigest()
-
-def hash_phone(phone):
-    if not phone:
-        return None
-    return hashlib.sha256(phone.strip().encode('utf-8')).hexdigest()
-
-def get_user_data(data):
-    return {
-        'em': [hash_email(data.get('email'))] if data.get('email') else [],
-        'ph': [hash_phone(data.get('phone'))] if data.get('phone') else [],
-        'client_ip_address': data.get('client_ip') or request.remote_addr,
-        'client_user_agent': data.get('user_agent') or request.headers.get('User-Agent')
-    }
-
-def send_event_to_meta(event_name, data, custom_data=None):
+def prepare_event(event_name, data, custom_data=None, timer=None):
+    """
+    Resolve the container's token and build the Meta payload for one event.
+    Returns ``(token, payload, None)`` or ``(None, None, (body, status_code))``.
+    Shared by send_event_to_meta and the async dispatcher; ``timer`` (a
+    StageTimer) records the lookup, hashing and payload_build stages.
+    """
+    timer = timer or StageTimer()
     gtm_container_id = data.get('gtm_container_id')
     if not gtm_container_id:
-        return {'msg': 'GTM Container ID is required'}, 400
-    token = FacebookToken.query.filter_by(gtm_container_id=gtm_container_id).first()
+        return None, None, ({'msg': 'GTM Container ID is required'}, 400)
+    
+    token, event_source_url = resolve_route(gtm_container_id, timer)
     if not token:
-        return {'msg': 'No Facebook token found for this GTM Container ID'}, 404
+        return None, None, ({'msg': 'No Facebook token found for this GTM Container ID'}, 404)
+    
     if not token.is_active:
-        return {'msg': 'Token is inactive. Please activate the token to send events.'}, 403
-    payload = {
-        'event_name': event_name,
-        'event_time': int(datetime.utcnow().timestamp()),
-        'user_data': get_user_data(data),
-        'custom_data': custom_data or {},
-        'action_source': 'website',
-        'event_source_url': data.get('event_source_url', request.referrer or ''),
-    }
-    # Test event code varsa payload'a ekle
-    if data.get('test_event_code'):
-        payload['test_event_code'] = data['test_event_code']
-        print(f"TEST EVENT CODE ADDED: {data['test_event_code']}")
-        print(f"FULL PAYLOAD: {payload}")
-    else:
-        print("NO TEST EVENT CODE FOUND IN DATA")
-        print(f"DATA RECEIVED: {data}")
+        return None, None, ({'msg': 'Token is inactive. Please activate the token to send events.'}, 403)
+    
+    with timer.stage('hashing'):
+        user_data = get_user_data(data)
+    # Her zaman domaini kullan
+    with timer.stage('payload_build'):
+        payload = build_event_payload(event_name, data, custom_data, event_source_url=event_source_url, user_data=user_data)
+    return token, payload, None
+
+def send_event_to_meta(event_name, data, custom_data=None):
+    start_time = time.time()
+    gtm_container_id = data.get('gtm_container_id')
+    timer = StageTimer()
+    
+    def complete(outcome, success):
+        with timer.stage('logging'):
+            GtmEventLogger.log_gtm_event_complete(
+                event_name=event_name,
+                gtm_container_id=gtm_container_id,
+                total_duration_ms=int((time.time() - start_time) * 1000),
+                success=success
+            )
+        timer.observe(event_name, outcome, gtm_container_id)
+    
+    # Log GTM event received
+    with timer.stage('logging'):
+        GtmEventLogger.log_gtm_event_received(
+            event_name=event_name,
+            gtm_container_id=gtm_container_id,
+            event_data=data
+        )
+    
+    token, payload, error = prepare_event(event_name, data, custom_data, timer)
+    if error:
+        complete('rejected', False)
+        return error
+    
+    # Aynı event_id pencere içinde zaten gönderildiyse Meta'ya tekrar gitme
+    claim, duplicate = claim_event(token.dataset_id, event_name, data)
+    if duplicate:
+        complete('duplicate', True)
+        return duplicate
     
+    # Meta bu token'ı/dataset'i reddediyorsa istek gönderme, event'i beklet
+    if not graph_circuit_breaker.allow(token.dataset_id, token.access_token):
+        release_event(claim)
+        complete('held', False)
+        return held_response(token.dataset_id)
+    
+    with timer.stage('logging'):
+        # Ham PII içerir; yalnızca debug seviyesinde ve argümanlar gerektiğinde biçimlenir
+        if data.get('test_event_code'):
+            logger.debug("Test event code %s | Payload: %s", data['test_event_code'], payload)
+        else:
+            logger.debug("No test event code | Data: %s", data)
+        
+        # Log Meta request being sent
+        GtmEventLogger.log_meta_request_sent(
+            event_name=event_name,
+            gtm_container_id=gtm_container_id,
+            meta_payload=payload,
+            access_token=token.access_token,
+            pixel_id=token.dataset_id
+        )
+    
+    failure = {}
     try:
-        capi = FacebookCAPI(token.access_token, token.dataset_id)
-        response = capi.send_event(payload)
+        with timer.stage('graph_api'):
+            capi = FacebookCAPI(token.access_token, token.dataset_id)
+            response = capi.send_event(token.access_token, token.dataset_id, payload)
+        if not response.get('success'):
+            failure = response
+            graph_circuit_breaker.record_failure(
+                token.dataset_id, token.access_token, response.get('auth_failure', False), response.get('error')
+            )
+            raise Exception(response.get('error'))
+        graph_circuit_breaker.record_success(token.dataset_id, token.access_token)
+        confirm_event(claim)
+        
+        # Log successful Meta response
+        with timer.stage('logging'):
+            GtmEventLogger.log_meta_response_received(
+                event_name=event_name,
+                gtm_container_id=gtm_container_id,
+                meta_response=response,
+                success=True
+            )
+        
+        # Log complete event cycle
+        complete('sent', True)
+        
         return {'msg': 'Event sent to Meta', 'meta_response': response}, 200
+        
     except Exception as e:
-        return {'msg': 'Meta event error', 'error': str(e)}, 500
-
-# Celery worker için task olarak kullanılacak fonksiyon
-try:
-    from app.extensions import make_celery
-    from flask import current_app
-    celery = make_celery(current_app)
-    @celery.task()
-    def send_facebook_event(event_name, data, custom_data=None):
-        send_event_to_meta(event_name, data, custom_data)
-except Exception:
-    pass 
+        error_msg = str(e)
+        release_event(claim)
+        
+        # Log failed Meta response
+        with timer.stage('logging'):
+            GtmEventLogger.log_meta_response_received(
+                event_name=event_name,
+                gtm_container_id=gtm_container_id,
+                meta_response={'error': error_msg},
+                success=False,
+                error_message=error_msg
+            )
+        
+        # Log complete event cycle (failed)
+        complete('failed', False)
+        
+        # retryable: geçici hata (ağ, 429, 5xx); tekrar denemeye değer
+        return {'msg': 'Meta event error', 'error': error_msg, 'retryable': failure.get('retryable', False)}, 500
 
 class FacebookEventSender:
     def __init__(self):
-        self.base_url = "https://graph.facebook.com/v18.0"
+        self.base_url = graph_transport.graph_base_url()
         
     def send_event(self, event_data, gtm_container_id):
         """
@@ -82,7 +154,7 @@ class FacebookEventSender:
         """
         try:
             # Get token from database
-            token = FacebookToken.query.filter_by(gtm_container_id=gtm_container_id).first()
+            token = get_token(gtm_container_id)
             if not token:
                 logger.error(f"No token found for GTM container: {gtm_container_id}")
                 return False, "No token found"
@@ -103,15 +175,10 @@ class FacebookEventSender:
                 payload["test_event_code"] = event_data["test_event_code"]
             
             # Send request with SSL verification disabled to avoid certifi path issues
-            response = requests.post(
-                f"{self.base_url}/{token.pixel_id}/events",
-                json=payload,
-                timeout=30,
-                verify=False,  # Disable SSL verification to avoid certifi path issues
-                headers={
-                    "Content-Type": "application/json",
-                    "User-Agent": "CAPIFY-EventSender/1.0"
-                }
+            response = graph_transport.post(
+                f"{self.base_url}/{token.dataset_id}/events",
+                data=json_codec.dumps_bytes(payload),
+                verify=False  # Disable SSL verification to avoid certifi path issues
             )
             
             if response.status_code == 200:
@@ -126,15 +193,10 @@ class FacebookEventSender:
             logger.error(f"SSL Error: {str(e)}")
             # Fallback: try without SSL verification (not recommended for production)
             try:
-                response = requests.post(
-                    f"{self.base_url}/{token.pixel_id}/events",
-                    json=payload,
-                    timeout=30,
-                    verify=False,  # Disable SSL verification as fallback
-                    headers={
-                        "Content-Type": "application/json",
-                        "User-Agent": "CAPIFY-EventSender/1.0"
-                    }
+                response = graph_transport.post(
+                    f"{self.base_url}/{token.dataset_id}/events",
+                    data=json_codec.dumps_bytes(payload),
+                    verify=False  # Disable SSL verification as fallback
                 )
                 
                 if response.status_code == 200:
@@ -0,0 +1,49 @@
+import json
+
+# Graph API hata kodları
+# https://developers.facebook.com/docs/graph-api/guides/error-handling
+TRANSIENT_ERROR_CODES = {1, 2, 4, 17, 32, 341, 613, 80004}  # Geçici hata ve rate limit
+AUTH_ERROR_CODES = {102, 190}  # Geçersiz / süresi dolmuş access token
+PERMISSION_ERROR_CODES = {3, 10}  # 200-299 aralığı da izin hatasıdır
+
+class GraphFailure:
+    """
+    Classified outcome of a failed Graph API request. ``retryable`` failures
+    (network errors, timeouts, 429, 5xx, throttling codes) are worth retrying
+    with backoff; the rest will fail the same way again.
+    """
+
+    __slots__ = ('status_code', 'error_code', 'message', 'retryable', 'auth_failure')
+
+    def __init__(self, status_code=None, error_code=None, message=None, retryable=False, auth_failure=False):
+        self.status_code = status_code
+        self.error_code = error_code
+        self.message = message
+        self.retryable = retryable
+        self.auth_failure = auth_failure
+
+    def __repr__(self):
+        return f'<GraphFailure {self.status_code}/{self.error_code} retryable={self.retryable}>'
+
+def parse_graph_error(text):
+    try:
+        error = json.loads(text).get('error') or {}
+    except (ValueError, AttributeError):
+        return None, None
+    return error.get('code'), error.get('message')
+
+def classify_response(status_code, text):
+    error_code, message = parse_graph_error(text)
+    auth_failure = error_code in AUTH_ERROR_CODES or error_code in PERMISSION_ERROR_CODES \
+        or (isinstance(error_code, int) and 200 <= error_code <= 299)
+    if auth_failure:
+        retryable = False
+    elif error_code in TRANSIENT_ERROR_CODES:
+        retryable = True
+    else:
+        retryable = status_code == 429 or status_code >= 500
+    return GraphFailure(status_code, error_code, message or text, retryable, auth_failure)
+
+def classify_exception(exception):
+    """Connection errors and timeouts never reached Meta; always retryable"""
+    return GraphFailure(message=str(exception) or type(exception).__name__, retryable=True)
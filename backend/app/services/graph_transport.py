@@ -0,0 +1,116 @@
+import os
+import threading
+import requests
+from flask import current_app, has_app_context
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from ..config import Config
+from ..utils.ssl_config import get_ssl_verify_setting
+from ..utils.monitoring import GRAPH_POOL_HITS, GRAPH_HANDSHAKES
+
+DEFAULT_HEADERS = {
+    "Content-Type": "application/json",
+    "User-Agent": "CAPIFY-EventSender/1.0"
+}
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        GRAPH_HANDSHAKES.inc()
+        return super().connect()
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        GRAPH_HANDSHAKES.inc()
+        return super().connect()
+
+class _CountingPoolMixin:
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout=timeout)
+        # Havuzdan gelen ve hala açık olan bağlantı = handshake yok
+        if getattr(conn, 'sock', None) is not None:
+            GRAPH_POOL_HITS.inc()
+        return conn
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+class GraphHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report keep-alive reuse and new handshakes"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool
+        }
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+def _build_session():
+    session = requests.Session()
+    adapter = GraphHTTPAdapter(
+        pool_connections=Config.GRAPH_POOL_CONNECTIONS,
+        pool_maxsize=Config.GRAPH_POOL_MAXSIZE,
+        max_retries=0
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    session.verify = get_ssl_verify_setting()
+    return session
+
+def get_session():
+    """
+    Return the keep-alive session shared by every Graph API sender in this process.
+
+    The session is rebuilt after a fork so gunicorn workers never share sockets
+    inherited from the master.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+def reset_session():
+    """Close pooled connections; the next request opens a fresh pool"""
+    global _session, _session_pid
+    with _session_lock:
+        if _session is not None and _session_pid == os.getpid():
+            _session.close()
+        _session = None
+        _session_pid = None
+
+def graph_base_url():
+    """
+    Versioned Graph API base URL from FACEBOOK_GRAPH_URL / FACEBOOK_API_VERSION;
+    point FACEBOOK_GRAPH_URL at benchmarks/graph_stub.py for load tests
+    """
+    config = current_app.config if has_app_context() else vars(Config)
+    return f"{config['FACEBOOK_GRAPH_URL'].rstrip('/')}/{config['FACEBOOK_API_VERSION']}"
+
+def default_timeout():
+    return (Config.GRAPH_CONNECT_TIMEOUT, Config.GRAPH_READ_TIMEOUT)
+
+def post(url, data=None, json=None, headers=None, timeout=None, verify=None):
+    """
+    POST to the Graph API over the pooled session
+    """
+    kwargs = {
+        'data': data,
+        'json': json,
+        'headers': headers,
+        'timeout': timeout or default_timeout()
+    }
+    if verify is not None:
+        kwargs['verify'] = verify
+    return get_session().post(url, **kwargs)
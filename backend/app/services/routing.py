@@ -0,0 +1,55 @@
+from ..extensions import db
+from ..models.facebook_token import FacebookToken
+from ..models.gtm_verification import GtmVerification
+from ..utils.ttl_cache import MISSING
+from ..utils.monitoring import StageTimer
+from .token_cache import TokenSnapshot, token_cache
+from .source_url_cache import source_url_cache, DEFAULT_EVENT_SOURCE_URL
+
+def load_route(gtm_container_id):
+    """
+    Fetch a container's token and verified source URL in one round trip
+    (token LEFT JOIN verified gtm_verification)
+    """
+    row = db.session.query(FacebookToken, GtmVerification.event_source_url, GtmVerification.domain_name) \
+        .outerjoin(GtmVerification, db.and_(
+            GtmVerification.gtm_container_id == FacebookToken.gtm_container_id,
+            GtmVerification.is_verified == db.true()
+        )) \
+        .filter(FacebookToken.gtm_container_id == gtm_container_id) \
+        .order_by(FacebookToken.is_active.desc(), FacebookToken.id, GtmVerification.id) \
+        .first()
+    if not row:
+        return None, None
+    token, event_source_url, domain_name = row
+    if not event_source_url and domain_name:
+        event_source_url = GtmVerification.build_event_source_url(domain_name)
+    return TokenSnapshot(token), event_source_url
+
+def resolve_route(gtm_container_id, timer=None):
+    """
+    Return ``(token, event_source_url)`` for a container. Served from the
+    token and source URL caches when both are warm; otherwise one joined query
+    refreshes both. ``token`` is None for unknown containers.
+
+    ``timer`` (a StageTimer) receives token_lookup / domain_lookup durations;
+    the joined query counts as token_lookup.
+    """
+    timer = timer or StageTimer()
+    with timer.stage('token_lookup'):
+        token = token_cache.get(gtm_container_id)
+    if token is None:
+        # Bilinmeyen container (negatif önbellek); domain'e gerek yok
+        return None, DEFAULT_EVENT_SOURCE_URL
+    if token is not MISSING:
+        with timer.stage('domain_lookup'):
+            event_source_url = source_url_cache.get(gtm_container_id)
+        if event_source_url is not MISSING:
+            return token, event_source_url or DEFAULT_EVENT_SOURCE_URL
+    
+    with timer.stage('token_lookup'):
+        token, event_source_url = load_route(gtm_container_id)
+        token_cache.set(gtm_container_id, token)
+        if token is not None:
+            source_url_cache.set(gtm_container_id, event_source_url)
+    return token, event_source_url or DEFAULT_EVENT_SOURCE_URL
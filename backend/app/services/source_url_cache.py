@@ -0,0 +1,31 @@
+from ..config import Config
+from ..models.gtm_verification import GtmVerification
+from ..utils.ttl_cache import TTLCache
+
+# Doğrulanmış domain yoksa Meta'ya gönderilen varsayılan
+DEFAULT_EVENT_SOURCE_URL = 'https://www.example.com'
+
+source_url_cache = TTLCache(
+    name='event_source_url',
+    maxsize=Config.TOKEN_CACHE_MAX_SIZE,
+    ttl=Config.SOURCE_URL_CACHE_TTL,
+    negative_ttl=Config.TOKEN_CACHE_NEGATIVE_TTL
+)
+
+def load_source_url(gtm_container_id):
+    row = GtmVerification.query \
+        .with_entities(GtmVerification.event_source_url, GtmVerification.domain_name) \
+        .filter_by(gtm_container_id=gtm_container_id, is_verified=True).first()
+    if not row:
+        return None
+    # Kolon eklenmeden önce oluşturulmuş kayıtlar için
+    return row.event_source_url or GtmVerification.build_event_source_url(row.domain_name)
+
+def get_source_url(gtm_container_id):
+    """Verified event_source_url for a container from the per-worker map (None if unverified)"""
+    return source_url_cache.get_or_load(gtm_container_id, load_source_url)
+
+def invalidate_source_url(*gtm_container_ids):
+    for gtm_container_id in gtm_container_ids:
+        if gtm_container_id:
+            source_url_cache.invalidate(gtm_container_id)
@@ -0,0 +1,45 @@
+from ..config import Config
+from ..models.facebook_token import FacebookToken
+from ..utils.ttl_cache import TTLCache
+
+class TokenSnapshot:
+    """
+    Detached copy of the FacebookToken fields the event path needs; ORM
+    instances are bound to a session and must not outlive the request
+    """
+
+    __slots__ = ('id', 'user_id', 'gtm_container_id', 'dataset_id', 'access_token', 'is_active')
+
+    def __init__(self, token):
+        self.id = token.id
+        self.user_id = token.user_id
+        self.gtm_container_id = token.gtm_container_id
+        self.dataset_id = token.dataset_id
+        self.access_token = token.access_token
+        self.is_active = token.is_active
+
+    def __repr__(self):
+        return f'<TokenSnapshot {self.dataset_id}>'
+
+token_cache = TTLCache(
+    name='facebook_token',
+    maxsize=Config.TOKEN_CACHE_MAX_SIZE,
+    ttl=Config.TOKEN_CACHE_TTL,
+    negative_ttl=Config.TOKEN_CACHE_NEGATIVE_TTL
+)
+
+def load_token(gtm_container_id):
+    # Aynı container için birden fazla kayıt varsa aktif olan tercih edilir
+    token = FacebookToken.query.filter_by(gtm_container_id=gtm_container_id) \
+        .order_by(FacebookToken.is_active.desc(), FacebookToken.id).first()
+    return TokenSnapshot(token) if token else None
+
+def get_token(gtm_container_id):
+    """Resolve a container's token through the per-worker cache (None if unknown)"""
+    return token_cache.get_or_load(gtm_container_id, load_token)
+
+def invalidate_token(*gtm_container_ids):
+    """Drop cached tokens after a write; call after the commit"""
+    for gtm_container_id in gtm_container_ids:
+        if gtm_container_id:
+            token_cache.invalidate(gtm_container_id)
@@ -1,4 +1,54 @@
+from celery import shared_task
+from flask import current_app
 from .services.facebook_event_sender import send_event_to_meta
+from .services.dead_letters import retry_delay, should_retry, record_failures, replay_dead_letters, purge_dead_letters
+from .models.dead_letter_event import DeadLetterEvent
+from .utils.monitoring import DELIVERY_RETRIES
 
-def send_facebook_event(event_name, data, custom_data=None):
-    send_event_to_meta(event_name, data, custom_data) 
\ No newline at end of file
+@shared_task(name='app.tasks.send_facebook_event', bind=True, acks_late=True, reject_on_worker_lost=True, max_retries=None)
+def send_facebook_event(self, event_name, data, custom_data=None):
+    """Deliver an event accepted by the async ingest mode"""
+    body, status_code = send_event_to_meta(event_name, data, custom_data)
+    attempts = self.request.retries + 1
+
+    if should_retry(body, status_code, attempts):
+        DELIVERY_RETRIES.labels(path='celery').inc()
+        raise self.retry(countdown=retry_delay(attempts))
+    record_failures([{'event_name': event_name, 'data': data, 'custom_data': custom_data}], [(body, status_code)], attempts)
+
+    return {'status_code': status_code, 'msg': body.get('msg'), 'event_id': data.get('event_id'), 'attempts': attempts}
+
+@shared_task(name='app.tasks.send_facebook_event_batch', acks_late=True, reject_on_worker_lost=True)
+def send_facebook_event_batch(events, attempt=1):
+    """Deliver a batch accepted by /api/facebook/events/batch in async mode"""
+    from .services.batch_sender import send_event_batch
+    results = send_event_batch(events)
+
+    # Sadece geçici hata alan event'ler yeni bir batch olarak tekrar denenir
+    retry, final = [], []
+    for event, result in zip(events, results):
+        (retry if should_retry(*result, attempt) else final).append((event, result))
+    if retry:
+        DELIVERY_RETRIES.labels(path='celery_batch').inc(len(retry))
+        send_facebook_event_batch.apply_async(
+            args=[[event for event, _ in retry]],
+            kwargs={'attempt': attempt + 1},
+            countdown=retry_delay(attempt)
+        )
+    record_failures([event for event, _ in final], [result for _, result in final], attempt)
+
+    return [
+        {'status_code': status_code, 'msg': body.get('msg'), 'event_id': event['data'].get('event_id')}
+        for event, (body, status_code) in zip(events, results)
+    ]
+
+@shared_task(name='app.tasks.replay_dead_letter_events')
+def replay_dead_letter_events(ids, rate=None):
+    """Replay dead letters selected through /api/facebook/dead-letters/replay"""
+    summary = replay_dead_letters(DeadLetterEvent.query.filter(DeadLetterEvent.id.in_(ids)), len(ids), rate=rate)
+    return {key: summary[key] for key in ('replayed', 'failed')}
+
+@shared_task(name='app.tasks.purge_dead_letter_events')
+def purge_dead_letter_events():
+    """Periodic dead-letter cleanup run by celery beat (DEAD_LETTER_PURGE_INTERVAL)"""
+    return purge_dead_letters(current_app.config['DEAD_LETTER_RETENTION_DAYS'])
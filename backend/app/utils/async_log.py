@@ -0,0 +1,170 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from .monitoring import LOG_QUEUE_DEPTH, LOG_RECORDS_DROPPED, LOG_WRITE_BATCH_SIZE, track_gauge
+
+logger = logging.getLogger(__name__)
+
+class AsyncFileHandler(logging.Handler):
+    """
+    File handler that leaves formatting and the disk to a background writer.
+
+    Records go into a bounded queue; every ``flush_interval`` seconds the
+    writer drains it, formats the records and writes them with one
+    ``write()`` per ``batch_size`` lines and calls ``fsync``
+    at most every ``fsync_interval`` seconds (0 disables it). Polling instead
+    of waking on each line keeps the writer from contending for the GIL with
+    request threads.
+
+    The file is reopened when it is renamed or deleted (rotation), and each
+    written byte range can be reported to a sidecar ``index`` (see
+    ``log_index.SidecarIndex``). When the queue is full, ``policy='drop'`` drops
+    the record at once and ``policy='block'`` waits up to ``block_timeout``
+    seconds before dropping it; either way the request thread never waits on
+    the disk for longer than that. The writer starts lazily in each process,
+    so gunicorn workers forked after import get their own thread and file.
+    """
+
+    def __init__(self, filename, name='gtm_events', max_queue_size=10000, policy='drop',
+                 block_timeout=0.05, batch_size=256, flush_interval=0.05, fsync_interval=1.0, encoding='utf-8',
+                 index=None):
+        super().__init__()
+        if policy not in ('drop', 'block'):
+            raise ValueError(f"Unknown log queue policy: {policy}")
+        self.filename = os.path.abspath(filename)
+        self.name = name
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.encoding = encoding
+        self.index = index
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        track_gauge(LOG_QUEUE_DEPTH.labels(handler=name), self.qsize)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def is_running(self):
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def emit(self, record):
+        if not self.is_running():
+            self._start()
+        try:
+            # Mesaj yazıcı thread'inde üretilir; istek thread'i yalnızca kuyruğa ekler
+            if self.policy == 'block':
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(handler=self.name).inc()
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        if self.is_running():
+            self._queue.join()
+
+    def close(self):
+        """Write what is left, stop the writer and close the file"""
+        self._stop()
+        super().close()
+
+    def _start(self):
+        with self._start_lock:
+            if self.is_running():
+                return
+            if self._pid != os.getpid():
+                if self._pid is not None:
+                    # Fork sonrası master'dan kalan kuyruk kullanılmaz
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                atexit.register(self._stop)
+            self._stopping = threading.Event()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=f'{self.name}-log-writer', daemon=True)
+            self._thread.start()
+
+    def _stop(self, timeout=5):
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _open(self):
+        # O_APPEND: birden fazla worker aynı dosyaya yazar; her write() kendi aralığına düşer
+        stream = open(self.filename, 'ab', buffering=0)
+        return stream, os.fstat(stream.fileno()).st_ino
+
+    def _rotated(self, inode):
+        try:
+            return os.stat(self.filename).st_ino != inode
+        except FileNotFoundError:
+            return True
+
+    def _run(self):
+        stream, inode = self._open()
+        last_fsync = time.monotonic()
+        try:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    if self._stopping.is_set():
+                        break
+                    if self.index:
+                        self.index.flush_if_stale()
+                    self._stopping.wait(self.flush_interval)
+                    continue
+                lines, created = [], []
+                for record in batch:
+                    try:
+                        lines.append(self.format(record))
+                        created.append(record.created)
+                    except Exception:
+                        self.handleError(record)
+                if not lines:
+                    for _ in batch:
+                        self._queue.task_done()
+                    continue
+                try:
+                    if self._rotated(inode):
+                        if self.index:
+                            self.index.flush()
+                        stream.close()
+                        stream, inode = self._open()
+                    data = ('\n'.join(lines) + '\n').encode(self.encoding)
+                    stream.write(data)
+                    end = stream.tell()
+                    if self.index:
+                        self.index.record_batch(inode, end - len(data), end, created, lines)
+                    if self.fsync_interval and time.monotonic() - last_fsync >= self.fsync_interval:
+                        os.fsync(stream.fileno())
+                        last_fsync = time.monotonic()
+                except OSError as e:
+                    LOG_RECORDS_DROPPED.labels(handler=self.name).inc(len(lines))
+                    logger.error(f"{self.name} log write failed ({len(lines)} lines): {e}")
+                finally:
+                    LOG_WRITE_BATCH_SIZE.labels(handler=self.name).observe(len(lines))
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            try:
+                if self.index:
+                    self.index.flush()
+                if self.fsync_interval:
+                    os.fsync(stream.fileno())
+            finally:
+                stream.close()
@@ -1,6 +1,163 @@
+import atexit
 import hashlib
+import os
+import re
 import secrets
+import threading
+import time
+from collections import OrderedDict
 import bcrypt
+from ..config import Config
+from .monitoring import CACHE_HITS, CACHE_MISSES, CACHE_EVICTIONS, CACHE_SIZE, USER_DATA_FIELDS_SEEN, USER_DATA_PREHASHED, track_gauge
+
+_SHA256_HEX = re.compile(r'[0-9a-f]{64}')
+
+class DigestMemo:
+    """
+    Bounded per-process LRU memo of normalized value -> SHA-256 digest,
+    entries expiring ``ttl`` seconds after they were stored. At most
+    ``maxsize`` normalized PII values are held in memory at any time and
+    none for longer than ``ttl``.
+
+    ``_data`` is kept in recency order (a hit moves its entry to the end, the
+    size bound evicts from the front) and ``_expiry`` in insertion order,
+    which is also expiry order. A background thread sleeps until the oldest
+    entry expires and drops it, so raw values are gone on time even in a
+    worker that only sees hits or no traffic at all; the same thread pushes
+    the hit count to ``cache_hits_total{cache="pii_hash"}`` at least once a
+    second (hashing is ~1us, so a Prometheus increment per hit would cost
+    more than it saves).
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._reported_hits = 0
+        self._data = OrderedDict()
+        self._expiry = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = False
+        self._pid = None
+        self._hits = CACHE_HITS.labels(cache='pii_hash')
+        self._misses = CACHE_MISSES.labels(cache='pii_hash')
+        self._evictions = CACHE_EVICTIONS.labels(cache='pii_hash')
+        track_gauge(CACHE_SIZE.labels(cache='pii_hash'), self.__len__)
+
+    def __len__(self):
+        return len(self._data)
+
+    def digest(self, value):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(value)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(value)
+                self.hits += 1
+                return entry[1]
+
+        digest = hashlib.sha256(value.encode('utf-8')).hexdigest()
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+            self.misses += 1
+            self._misses.inc()
+            self._push_hits()
+            # Süresi dolmuş değer yeni süreyle sona eklenir
+            self._data.pop(value, None)
+            self._expiry.pop(value, None)
+            self._data[value] = (now + self.ttl, digest)
+            self._expiry[value] = now + self.ttl
+            self._expire(now)
+            while len(self._data) > self.maxsize:
+                evicted, _ = self._data.popitem(last=False)
+                del self._expiry[evicted]
+                self._evictions.inc()
+            if len(self._expiry) == 1:
+                # Temizleyici boş listede bekliyordu; yeni en eski kayıt için uyandır
+                self._wakeup.notify()
+        return digest
+
+    def _expire(self, now):
+        # _expiry'nin başı en önce dolacak kayıt
+        while self._expiry:
+            value, expires_at = next(iter(self._expiry.items()))
+            if expires_at > now:
+                break
+            del self._expiry[value]
+            del self._data[value]
+
+    def _push_hits(self):
+        if self.hits != self._reported_hits:
+            self._hits.inc(self.hits - self._reported_hits)
+            self._reported_hits = self.hits
+
+    def _start(self):
+        # Fork sonrası master'ın kayıtları ve thread'i bu süreçte kullanılmaz
+        self._data.clear()
+        self._expiry.clear()
+        self._stopping = False
+        self._pid = os.getpid()
+        threading.Thread(target=self._run, name='pii-hash-memo', daemon=True).start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        with self._wakeup:
+            while not self._stopping:
+                now = time.monotonic()
+                self._expire(now)
+                self._push_hits()
+                timeout = 1.0
+                if self._expiry:
+                    timeout = min(timeout, next(iter(self._expiry.values())) - now)
+                self._wakeup.wait(max(timeout, 0))
+
+    def stop(self):
+        with self._wakeup:
+            self._stopping = True
+            self._push_hits()
+            self._wakeup.notify()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._expiry.clear()
+
+_memo = None
+
+def configure_hash_memo(enabled, maxsize=None, ttl=None):
+    """Turn the PII digest memo on or off for this process"""
+    global _memo
+    if _memo is not None:
+        _memo.stop()
+    _memo = DigestMemo(
+        maxsize if maxsize is not None else Config.HASH_MEMO_MAX_SIZE,
+        ttl if ttl is not None else Config.HASH_MEMO_TTL
+    ) if enabled else None
+    return _memo
+
+def hash_memo_stats():
+    """Size and hit rate of the digest memo, or None when it is disabled"""
+    return _memo.stats() if _memo is not None else None
+
+def _sha256(value):
+    """SHA-256 hex digest of an already normalized value"""
+    if _memo is not None:
+        return _memo.digest(value)
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+configure_hash_memo(Config.HASH_MEMO_ENABLED)
 
 def hash_user_data(data, salt=None):
     """
@@ -27,12 +184,7 @@ def hash_email(email):
     
     email_lower = email.lower().strip()
     # Meta CAPI için salt olmadan hash
-    if isinstance(email_lower, str):
-        email_lower = email_lower.encode('utf-8')
-    
-    hash_obj = hashlib.sha256()
-    hash_obj.update(email_lower)
-    return hash_obj.hexdigest()
+    return _sha256(email_lower)
 
 def hash_phone(phone):
     """
@@ -47,12 +199,7 @@ def hash_phone(phone):
         return None
     
     # Meta CAPI için salt olmadan hash
-    if isinstance(phone_clean, str):
-        phone_clean = phone_clean.encode('utf-8')
-    
-    hash_obj = hashlib.sha256()
-    hash_obj.update(phone_clean)
-    return hash_obj.hexdigest()
+    return _sha256(phone_clean)
 
 def hash_external_id(external_id):
     """
@@ -62,12 +209,7 @@ def hash_external_id(external_id):
         return None
     
     external_id_str = str(external_id)
-    if isinstance(external_id_str, str):
-        external_id_str = external_id_str.encode('utf-8')
-    
-    hash_obj = hashlib.sha256()
-    hash_obj.update(external_id_str)
-    return hash_obj.hexdigest()
+    return _sha256(external_id_str)
 
 def hash_name(name):
     """
@@ -77,12 +219,7 @@ def hash_name(name):
         return None
     
     name_lower = name.lower().strip()
-    if isinstance(name_lower, str):
-        name_lower = name_lower.encode('utf-8')
-    
-    hash_obj = hashlib.sha256()
-    hash_obj.update(name_lower)
-    return hash_obj.hexdigest()
+    return _sha256(name_lower)
 
 def hash_city(city):
     """
@@ -92,12 +229,7 @@ def hash_city(city):
         return None
     
     city_lower = city.lower().strip()
-    if isinstance(city_lower, str):
-        city_lower = city_lower.encode('utf-8')
-    
-    hash_obj = hashlib.sha256()
-    hash_obj.update(city_lower)
-    return hash_obj.hexdigest()
+    return _sha256(city_lower)
 
 def hash_state(state):
     """
@@ -107,12 +239,7 @@ def hash_state(state):
         return None
     
     state_lower = state.lower().strip()
-    if isinstance(state_lower, str):
-        state_lower = state_lower.encode('utf-8')
-    
-    hash_obj = hashlib.sha256()
-    hash_obj.update(state_lower)
-    return hash_obj.hexdigest()
+    return _sha256(state_lower)
 
 def hash_zipcode(zipcode):
     """
@@ -122,12 +249,7 @@ def hash_zipcode(zipcode):
         return None
     
     zipcode_str = str(zipcode)
-    if isinstance(zipcode_str, str):
-        zipcode_str = zipcode_str.encode('utf-8')
-    
-    hash_obj = hashlib.sha256()
-    hash_obj.update(zipcode_str)
-    return hash_obj.hexdigest()
+    return _sha256(zipcode_str)
 
 def hash_country(country):
     """
@@ -137,12 +259,7 @@ def hash_country(country):
         return None
     
     country_lower = country.lower().strip()
-    if isinstance(country_lower, str):
-        country_lower = country_lower.encode('utf-8')
-    
-    hash_obj = hashlib.sha256()
-    hash_obj.update(country_lower)
-    return hash_obj.hexdigest()
+    return _sha256(country_lower)
 
 def hash_gender(gender):
     """
@@ -152,12 +269,7 @@ def hash_gender(gender):
         return None
     
     gender_lower = gender.lower().strip()
-    if isinstance(gender_lower, str):
-        gender_lower = gender_lower.encode('utf-8')
-    
-    hash_obj = hashlib.sha256()
-    hash_obj.update(gender_lower)
-    return hash_obj.hexdigest()
+    return _sha256(gender_lower)
 
 def hash_birthday(birthday):
     """
@@ -167,12 +279,52 @@ def hash_birthday(birthday):
         return None
     
     birthday_str = str(birthday)
-    if isinstance(birthday_str, str):
-        birthday_str = birthday_str.encode('utf-8')
-    
-    hash_obj = hashlib.sha256()
-    hash_obj.update(birthday_str)
-    return hash_obj.hexdigest()
+    return _sha256(birthday_str)
+
+# Gelen event alanı -> (Meta user_data anahtarı, hash fonksiyonu)
+USER_DATA_FIELDS = (
+    ('email', 'em', hash_email),
+    ('phone', 'ph', hash_phone),
+    ('fn', 'fn', hash_name),
+    ('ln', 'ln', hash_name),
+    ('ge', 'ge', hash_gender),
+    ('db', 'db', hash_birthday),
+    ('ct', 'ct', hash_city),
+    ('st', 'st', hash_state),
+    ('zp', 'zp', hash_zipcode),
+    ('country', 'country', hash_country),
+    ('external_id', 'external_id', hash_external_id),
+)
+
+def is_prehashed(value):
+    """True for a value that already is a lowercase SHA-256 hex digest"""
+    return isinstance(value, str) and len(value) == 64 and _SHA256_HEX.fullmatch(value) is not None
+
+def hash_user_fields(data, gtm_container_id=None):
+    """
+    Hash every PII field present in an inbound event in one call; returns
+    Meta user_data entries such as ``{'em': [digest], 'ph': [digest]}``.
+    Values hashed client-side (lowercase SHA-256 hex) are passed through and
+    counted per container.
+    """
+    hashed = {}
+    prehashed = 0
+    for field, key, hasher in USER_DATA_FIELDS:
+        value = data.get(field)
+        if not value:
+            continue
+        if is_prehashed(value):
+            hashed[key] = [value]
+            prehashed += 1
+        else:
+            hashed[key] = [hasher(value)]
+
+    if hashed:
+        container = gtm_container_id or data.get('gtm_container_id') or 'unknown'
+        USER_DATA_FIELDS_SEEN.labels(gtm_container_id=container).inc(len(hashed))
+        if prehashed:
+            USER_DATA_PREHASHED.labels(gtm_container_id=container).inc(prehashed)
+    return hashed
 
 def hash_password(password):
     """
@@ -0,0 +1,114 @@
+"""
+JSON encoding for the event path: Flask request/response bodies, Graph API
+payloads, the dispatcher queue and the GTM event log lines.
+
+orjson is used when it is installed (JSON_CODEC=auto or orjson); otherwise,
+or with JSON_CODEC=stdlib, everything goes through the stdlib json module.
+Both codecs decode to the same Python objects and accept the same input.
+"""
+import json
+import logging
+from flask.json.provider import DefaultJSONProvider
+from ..config import Config
+
+try:
+    import orjson
+except ImportError:  # Opsiyonel bağımlılık; yoksa stdlib kullanılır
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+class StdlibCodec:
+    name = 'stdlib'
+
+    def dumps(self, obj, default=None, sort_keys=False):
+        """Compact JSON as ``str``"""
+        return json.dumps(obj, default=default, sort_keys=sort_keys, separators=(',', ':'))
+
+    def dumps_bytes(self, obj, default=None, sort_keys=False):
+        """Compact JSON as UTF-8 ``bytes``, ready for an HTTP body"""
+        return self.dumps(obj, default=default, sort_keys=sort_keys).encode('utf-8')
+
+    def dumps_pretty(self, obj):
+        """Indented JSON for log lines"""
+        return json.dumps(obj, indent=2)
+
+    def loads(self, data):
+        return json.loads(data)
+
+class OrjsonCodec:
+    name = 'orjson'
+
+    def __init__(self):
+        self._fallback = StdlibCodec()
+
+    def dumps(self, obj, default=None, sort_keys=False):
+        return self.dumps_bytes(obj, default=default, sort_keys=sort_keys).decode('utf-8')
+
+    def dumps_bytes(self, obj, default=None, sort_keys=False):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            # 64 bit dışı tamsayı gibi orjson'ın desteklemediği değerler
+            return self._fallback.dumps(obj, default=default, sort_keys=sort_keys).encode('utf-8')
+
+    def dumps_pretty(self, obj):
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:
+            return self._fallback.dumps_pretty(obj)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+def make_codec(name):
+    """Codec for ``auto``, ``orjson`` or ``stdlib``"""
+    name = (name or 'auto').lower()
+    if name == 'stdlib':
+        return StdlibCodec()
+    if orjson is None:
+        if name == 'orjson':
+            logger.warning("JSON_CODEC=orjson but orjson is not installed; using stdlib json")
+        return StdlibCodec()
+    return OrjsonCodec()
+
+codec = make_codec(Config.JSON_CODEC)
+
+def set_codec(name):
+    """Switch the process-wide codec (tests and benchmarks)"""
+    global codec
+    codec = make_codec(name)
+    return codec
+
+def dumps(obj, default=None, sort_keys=False):
+    return codec.dumps(obj, default=default, sort_keys=sort_keys)
+
+def dumps_bytes(obj, default=None):
+    return codec.dumps_bytes(obj, default=default)
+
+def dumps_pretty(obj):
+    return codec.dumps_pretty(obj)
+
+def loads(data):
+    return codec.loads(data)
+
+class CodecJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by the active codec, used by
+    ``request.get_json`` and ``jsonify``. Pretty-printed (debug) responses and
+    calls with extra ``json.dumps`` arguments keep Flask's stdlib path.
+    """
+
+    def dumps(self, obj, **kwargs):
+        compact = set(kwargs) <= {'separators'} and kwargs.get('separators', (',', ':')) == (',', ':')
+        if codec.name == 'stdlib' or not compact:
+            return super().dumps(obj, **kwargs)
+        return codec.dumps(obj, default=self.default, sort_keys=self.sort_keys)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return codec.loads(s)
@@ -0,0 +1,385 @@
+"""
+Sidecar index for the GTM event log (``gtm_events.log.idx``).
+
+Each entry covers one byte range of the log and records the time span and
+the GTM container ids of the lines in it, so filtered queries only read the
+ranges that can match:
+
+    {"v": 2, "inode": 1234, "head_len": 4096, "head": "<sha1>"}        header
+    {"open": "<writer>", "at": 4096, "inode": 1234, "t": 1718000000}    open bucket
+    [start, end, t0, t1, inode, ["GTM-AAA", "GTM-BBB"], "<writer>"]     entries
+
+The background log writer appends one entry per process per time bucket
+(or per ``segment_bytes``). With several gunicorn workers appending to the
+same file a range may also contain other workers' lines, so ranges are
+candidates, not exact matches, and readers keep filtering line by line.
+Bytes no entry covers (lines written with GTM_LOG_ASYNC off) are always
+read.
+
+A worker's lines that are still in its open bucket can sit inside another
+worker's closed range, where "covered" alone would hide them. Each writer
+therefore appends an ``open`` marker when it starts a bucket, and readers
+always read from every open marker to the end of the file until the
+writer's entry closes it. A marker older than one bucket belongs to a
+writer that died before closing it; readers rebuild the index then.
+
+When the candidates cover more than ``SCAN_FRACTION`` of the file (a busy
+container) the index only adds seeks, so readers fall back to a plain
+reverse scan.
+
+The header ties the index to one log file: a different inode (rotation),
+a changed head (the log was cleared and rewritten) or entries past the end
+of the file make readers rebuild the index with one scan of the log.
+"""
+import calendar
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+INDEX_VERSION = 2
+HEAD_BYTES = 4096
+# Açık bucket bu süreden (bucket_seconds'a ek) eskiyse yazıcı ölmüş sayılır
+STALE_WRITER_SLACK = 60
+# Adaylar dosyanın bu oranından fazlasını kaplıyorsa düz tarama daha hızlı
+SCAN_FRACTION = 0.5
+# Bu kadar yakın aralıklar tek okumada birleşir; boşluğu okumak seek'ten ucuz
+MERGE_GAP_BYTES = 4096
+GTM_CONTAINER_RE = re.compile(r'GTM-[A-Z0-9]+')
+
+_last_minute = (None, None)
+
+def line_time(line):
+    """
+    Epoch seconds of a text (``2024-06-10 12:00:00,000 - ...``, local time)
+    or JSONL (``{"ts":"2024-06-10T12:00:00.000Z"...``) log line; None for
+    continuation lines of multi-line records.
+    """
+    global _last_minute
+    if line.startswith('{"ts":"'):
+        stamp = line[7:26]
+    elif line[:4].isdigit() and line[19:20] == ',':
+        stamp = line[:19]
+    else:
+        return None
+    # strptime yavaş; dakika başına bir kez çözülür, saniye eklenir
+    minute, cached = stamp[:16], _last_minute
+    try:
+        if cached[0] != minute:
+            if 'T' in minute:
+                cached = (minute, calendar.timegm(time.strptime(minute, '%Y-%m-%dT%H:%M')))
+            else:
+                cached = (minute, time.mktime(time.strptime(minute, '%Y-%m-%d %H:%M')))
+            _last_minute = cached
+        return cached[1] + int(stamp[17:19])
+    except ValueError:
+        return None
+
+def index_path(log_path):
+    return os.path.abspath(log_path) + '.idx'
+
+def merge_ranges(ranges, gap=0):
+    """Sorted, non-overlapping ``[start, end]`` pairs; ranges at most ``gap`` bytes apart are joined"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+class SidecarIndex:
+    def __init__(self, log_path, bucket_seconds=600, segment_bytes=256 * 1024):
+        self.log_path = os.path.abspath(log_path)
+        self.path = index_path(log_path)
+        self.bucket_seconds = bucket_seconds
+        self.segment_bytes = segment_bytes
+        self._pending = None
+        self._marked = None
+        self._writer_id = None
+        self._writer_pid = None
+        self._lock = threading.Lock()
+        self._cache = None
+        self._rebuilding = None
+
+    # Yazıcı tarafı (AsyncFileHandler thread'i)
+
+    @property
+    def writer_id(self):
+        # pid tekrar kullanılabilir; rastgele ek ölü bir yazıcıyla karışmasın
+        if self._writer_pid != os.getpid():
+            self._writer_id = f"{os.getpid()}-{os.urandom(4).hex()}"
+            self._writer_pid = os.getpid()
+        return self._writer_id
+
+    def _append(self, line):
+        """Append to the sidecar if it exists; returns its inode, or None"""
+        try:
+            # Dosya yoksa oluşturma; okuyucu ilk sorguda baştan kurar
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        except FileNotFoundError:
+            return None
+        try:
+            os.write(fd, line.encode('utf-8'))
+            return os.fstat(fd).st_ino
+        finally:
+            os.close(fd)
+
+    def _mark_open(self):
+        """
+        Announce the open entry's start, again whenever the sidecar was
+        replaced (rebuild, clear) since the last announcement.
+        """
+        pending = self._pending
+        try:
+            sidecar_inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            self._marked = None
+            return
+        if self._marked == sidecar_inode:
+            return
+        marker = {'open': self.writer_id, 'at': pending[0], 'inode': pending[4], 't': int(time.time())}
+        self._marked = self._append(json.dumps(marker, separators=(',', ':')) + '\n')
+
+    def record_batch(self, inode, start, end, times, lines):
+        """Add one written batch to the open entry; closes it on bucket/size limits"""
+        pending = self._pending
+        if pending and (pending[4] != inode or start < pending[0]):
+            self.flush()
+            pending = None
+        if pending is None:
+            pending = self._pending = [start, end, min(times), max(times), inode, set()]
+        self._mark_open()
+        pending[1] = end
+        pending[2] = min(pending[2], min(times))
+        pending[3] = max(pending[3], max(times))
+        for line in lines:
+            match = GTM_CONTAINER_RE.search(line)
+            if match:
+                pending[5].add(match.group(0))
+        if pending[3] - pending[2] >= self.bucket_seconds or pending[1] - pending[0] >= self.segment_bytes:
+            self.flush()
+
+    def flush_if_stale(self):
+        """Close the open entry once its bucket is over, even if no more lines arrive"""
+        if self._pending is None:
+            return
+        if time.time() - self._pending[2] >= self.bucket_seconds:
+            self.flush()
+        else:
+            self._mark_open()
+
+    def flush(self):
+        """Append the open entry to the sidecar (if the sidecar exists)"""
+        pending, self._pending = self._pending, None
+        self._marked = None
+        if pending is None:
+            return
+        self._append(self._entry_line(pending, self.writer_id))
+
+    @staticmethod
+    def _entry_line(entry, writer=None):
+        start, end, t0, t1, inode, containers = entry
+        return json.dumps([start, end, int(t0), int(t1) + 1, inode, sorted(containers), writer],
+                          separators=(',', ':')) + '\n'
+
+    # Okuyucu tarafı
+
+    def _log_identity(self, size=None):
+        with open(self.log_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            head = f.read(min(HEAD_BYTES, stat.st_size if size is None else size))
+        return stat, {'v': INDEX_VERSION, 'inode': stat.st_ino, 'head_len': len(head), 'head': hashlib.sha1(head).hexdigest()}
+
+    def _read(self):
+        """Header, entries and open markers, reading only what was appended since the last call"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._cache = None
+            return None, [], {}
+        cache = self._cache
+        if cache is None or cache['inode'] != stat.st_ino or stat.st_size < cache['offset']:
+            cache = self._cache = {'inode': stat.st_ino, 'offset': 0, 'header': None, 'entries': [], 'open': {},
+                                   'ends': {}, 'bytes': {}, 'covered': {}}
+        if stat.st_size > cache['offset']:
+            with open(self.path, 'rb') as f:
+                f.seek(cache['offset'])
+                chunk = f.read(stat.st_size - cache['offset'])
+            # Yarım yazılmış son satırı sonraki okumaya bırak
+            complete = chunk.rfind(b'\n') + 1
+            cache['offset'] += complete
+            for raw in chunk[:complete].splitlines():
+                try:
+                    item = json.loads(raw)
+                except ValueError:
+                    continue
+                if isinstance(item, dict) and 'open' in item:
+                    cache['open'][item['open']] = item
+                elif isinstance(item, dict):
+                    cache['header'] = item
+                elif isinstance(item, list) and len(item) == 7:
+                    cache['entries'].append(item)
+                    # Yazıcının kaydı açık bucket'ını kapatır
+                    cache['open'].pop(item[6], None)
+                    # Sorgular her seferinde tüm kayıtları dolaşmasın
+                    start, stop, inode = item[0], item[1], item[4]
+                    cache['ends'][inode] = max(cache['ends'].get(inode, 0), stop)
+                    for name in item[5]:
+                        cache['bytes'][inode, name] = cache['bytes'].get((inode, name), 0) + stop - start
+                    cache['covered'].pop(inode, None)
+        return cache['header'], cache['entries'], cache['open']
+
+    def _is_stale(self, marker):
+        return time.time() - marker['t'] > self.bucket_seconds + STALE_WRITER_SLACK
+
+    def _is_valid(self, header, open_markers, stat):
+        if not header or header.get('v') != INDEX_VERSION or header.get('inode') != stat.st_ino:
+            return False
+        if stat.st_size < header['head_len']:
+            return False
+        _, identity = self._log_identity(header['head_len'])
+        if identity['head'] != header['head']:
+            return False
+        # Ölü yazıcının kapanmamış bucket'ı: satırları ancak yeniden kurulumla kapsanır
+        if any(marker['inode'] == stat.st_ino and self._is_stale(marker) for marker in open_markers.values()):
+            return False
+        return self._cache['ends'].get(stat.st_ino, 0) <= stat.st_size
+
+    def rebuild(self):
+        """Scan the whole log and replace the sidecar; returns the number of entries"""
+        # Canlı yazıcıların açık bucket'ları yeni dosyaya taşınır
+        _, _, open_markers = self._read()
+        open_markers = [dict(marker) for marker in open_markers.values() if not self._is_stale(marker)]
+        stat, header = self._log_identity()
+        entries = []
+        current = None
+        offset = 0
+        with open(self.log_path, 'rb') as f:
+            for raw in f:
+                line = raw.decode('utf-8', errors='replace')
+                moment = line_time(line)
+                if current is not None and moment is not None and (
+                        offset - current[0] >= self.segment_bytes
+                        or (current[2] is not None and moment - current[2] >= self.bucket_seconds)):
+                    entries.append(current)
+                    current = None
+                if current is None:
+                    current = [offset, offset, moment, moment, stat.st_ino, set()]
+                offset += len(raw)
+                current[1] = offset
+                if moment is not None:
+                    current[2] = moment if current[2] is None else min(current[2], moment)
+                    current[3] = moment if current[3] is None else max(current[3], moment)
+                match = GTM_CONTAINER_RE.search(line)
+                if match:
+                    current[5].add(match.group(0))
+        if current is not None:
+            entries.append(current)
+
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header, separators=(',', ':')) + '\n')
+            for entry in entries:
+                if entry[2] is None:
+                    # Zaman damgası olmayan aralık; her zaman aday olsun
+                    entry[2], entry[3] = 0, 2 ** 40
+                f.write(self._entry_line(entry))
+            for marker in open_markers:
+                if marker['inode'] == stat.st_ino:
+                    # Taranan kısım artık kapsanıyor; açık kalan yalnızca sonrası
+                    marker['at'] = max(marker['at'], offset)
+                    f.write(json.dumps(marker, separators=(',', ':')) + '\n')
+        os.replace(temp_path, self.path)
+        self._cache = None
+        return len(entries)
+
+    def _rebuild_in_background(self):
+        def run():
+            try:
+                self.rebuild()
+            finally:
+                self._rebuilding = None
+        if self._rebuilding is None:
+            self._rebuilding = threading.Thread(target=run, name='gtm-log-index-rebuild', daemon=True)
+            self._rebuilding.start()
+
+    def candidate_ranges(self, end=None, container=None, since=None, until=None, block=True):
+        """
+        Byte ranges ``[start, end)`` that may hold matching lines, newest
+        first. Uncovered bytes are always included. Rebuilds the sidecar when
+        it is missing or belongs to another version of the log; with
+        ``block=False`` the rebuild runs in a background thread and None is
+        returned until it finishes (callers scan the whole file meanwhile).
+        None is also returned when the candidates cover more than
+        ``SCAN_FRACTION`` of the file.
+        """
+        with self._lock:
+            if self._rebuilding is not None and not block:
+                return None
+            stat = os.stat(self.log_path)
+            header, entries, open_markers = self._read()
+            if not self._is_valid(header, open_markers, stat):
+                if not block:
+                    self._rebuild_in_background()
+                    return None
+                self.rebuild()
+                header, entries, open_markers = self._read()
+            cache = self._cache
+        size = stat.st_size if end is None else min(end, stat.st_size)
+        limit = size * SCAN_FRACTION
+        # Yoğun container: kayıtları dolaşmadan düz taramaya dön
+        if container and since is None and until is None and cache['bytes'].get((stat.st_ino, container), 0) > limit:
+            return None
+        entries = [entry for entry in entries if entry[4] == stat.st_ino and entry[0] < size]
+
+        ranges = []
+        matched = 0
+        for start, stop, t0, t1, _, containers, _ in entries:
+            if container and container not in containers:
+                continue
+            if since is not None and t1 < since:
+                continue
+            if until is not None and t0 > until:
+                continue
+            ranges.append((start, stop))
+            # Zaman penceresi de dosyanın çoğunu kaplayabilir
+            matched += min(stop, size) - start
+            if matched > limit:
+                return None
+
+        covered = cache['covered'].get(stat.st_ino)
+        if covered is None:
+            covered = cache['covered'][stat.st_ino] = merge_ranges(
+                (entry[0], entry[1]) for entry in cache['entries'] if entry[4] == stat.st_ino)
+        position = 0
+        for start, stop in covered:
+            if start >= size:
+                break
+            if start > position:
+                ranges.append((position, start))
+            position = max(position, stop)
+        if position < size:
+            ranges.append((position, size))
+        # Açık bucket'lar: başka yazıcının aralığına düşen satırları henüz kapsanmadı
+        for marker in open_markers.values():
+            if marker['inode'] == stat.st_ino and marker['at'] < size:
+                ranges.append((marker['at'], size))
+
+        ranges = [(start, min(stop, size)) for start, stop in merge_ranges(ranges, MERGE_GAP_BYTES) if start < size]
+        if sum(stop - start for start, stop in ranges) > limit:
+            return None
+        return ranges[::-1]
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def sidecar_index(log_path, bucket_seconds=600, segment_bytes=256 * 1024):
+    """One SidecarIndex per log file and process, shared by the writer and the log endpoints"""
+    key = index_path(log_path)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = SidecarIndex(log_path, bucket_seconds, segment_bytes)
+        return _indexes[key]
@@ -0,0 +1,33 @@
+import os
+
+def read_lines_reverse(path, end=None, start=0, block_size=64 * 1024):
+    """
+    Yield ``(offset, line)`` for the non-empty lines of ``path``, newest
+    first, reading fixed-size blocks backwards from the end of the file.
+
+    ``offset`` is the byte position where the line starts. Passing it back
+    as ``end`` resumes with the line before it, which is what the log
+    endpoints use as a pagination cursor. ``end`` past the end of the file
+    (the log was cleared) is clamped to the file size. ``start`` must be a
+    line start; reading stops there (sidecar index ranges).
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell() if end is None else min(end, f.tell())
+        remainder = b''
+        while position > start:
+            read_size = min(block_size, position - start)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size) + remainder
+            lines = block.split(b'\n')
+            # İlk parça bir önceki blokta başlıyor olabilir; sonraki turda tamamlanır
+            remainder = lines.pop(0)
+            line_end = position + len(block)
+            for line in reversed(lines):
+                line_start = line_end - len(line)
+                if line.strip():
+                    yield line_start, line.decode('utf-8', errors='replace')
+                line_end = line_start - 1
+        if remainder.strip():
+            yield start, remainder.decode('utf-8', errors='replace')
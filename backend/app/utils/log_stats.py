@@ -0,0 +1,193 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows; worker'lar arası kilit olmadan devam edilir
+    fcntl = None
+
+RECENT_SIZE = 10
+STATS_VERSION = 2
+KEY_FIELDS = ('container', 'event', 'type', 'level', 'outcome')
+# İstemcinin gönderdiği değerler; biçime uymayanlar tek 'unknown' anahtarında toplanır
+CONTAINER_PATTERN = re.compile(r'GTM-[A-Z0-9]{1,12}')
+EVENT_PATTERN = re.compile(r'[A-Za-z0-9_\- ]{1,50}')
+
+def _bucket(value, pattern):
+    if not value:
+        return ''
+    return value if isinstance(value, str) and pattern.fullmatch(value) else 'unknown'
+
+def stats_key(gtm_container_id, event_name, record_type, level, outcome):
+    """
+    Counter key: JSON list ``[container, event, type, level, outcome]``
+    (missing parts empty). Malformed container ids and event names count
+    as 'unknown', so client input cannot grow the set of keys.
+    """
+    return json.dumps([
+        _bucket(gtm_container_id, CONTAINER_PATTERN),
+        _bucket(event_name, EVENT_PATTERN),
+        record_type or '', level or '', outcome or ''
+    ], separators=(',', ':'))
+
+def split_key(key):
+    return dict(zip(KEY_FIELDS, json.loads(key)))
+
+def empty_stats():
+    return {'version': STATS_VERSION, 'seeded': False, 'counters': {}, 'recent': []}
+
+def merge_recent(older, newer):
+    """Newest RECENT_SIZE ``[epoch, key]`` items of both lists, oldest first"""
+    return sorted(older + newer, key=lambda item: item[0])[-RECENT_SIZE:]
+
+class LogStats:
+    """
+    GTM event log aggregates kept at write time instead of re-reading the log.
+
+    Every GtmEventLogger record bumps one counter keyed by container, event,
+    record type, level and outcome. Each process collects deltas in memory
+    and a background thread adds them to a shared JSON file every
+    ``flush_interval`` seconds under an exclusive ``flock``, so gunicorn
+    workers share one set of totals and they survive restarts. Reading the
+    totals costs O(number of distinct keys), independent of the log size.
+
+    ``seeded`` is False while the file only holds what was counted since it
+    was created; the stats endpoint then backfills it once from the log.
+    """
+
+    def __init__(self, path, flush_interval=5.0):
+        self.path = os.path.abspath(path)
+        self.lock_path = self.path + '.lock'
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._deltas = {}
+        self._recent = deque(maxlen=RECENT_SIZE)
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def record(self, level, record_type, event_name, gtm_container_id, outcome):
+        """Count one log record (called by GtmEventLogger on the request thread)"""
+        if self._pid != os.getpid():
+            self._start()
+        key = stats_key(gtm_container_id, event_name, record_type, level, outcome)
+        with self._lock:
+            self._deltas[key] = self._deltas.get(key, 0) + 1
+            self._recent.append([time.time(), key])
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Fork sonrası master'ın biriktirdikleri master'da kalır
+            if self._pid is not None:
+                self._deltas = {}
+                self._recent = deque(maxlen=RECENT_SIZE)
+            self._pid = os.getpid()
+            self._stopping = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='gtm-log-stats', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(5)
+        self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self.flush()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        # Eski '|' anahtarlı dosya yok sayılır; endpoint toplamları log'dan yeniden sayar
+        return data if data.get('version') == STATS_VERSION else None
+
+    def _update(self, change):
+        """Apply ``change(data)`` to the shared file under the cross-process lock"""
+        with open(self.lock_path, 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            data = self._load() or empty_stats()
+            change(data)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+
+    def flush(self):
+        """Add this process's pending deltas to the shared file"""
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+            recent, self._recent = list(self._recent), deque(maxlen=RECENT_SIZE)
+        if not deltas:
+            return
+
+        def merge(data):
+            counters = data['counters']
+            for key, count in deltas.items():
+                counters[key] = counters.get(key, 0) + count
+            data['recent'] = merge_recent(data['recent'], recent)
+
+        try:
+            self._update(merge)
+        except OSError:
+            # Dosyaya yazılamadı; sayımlar bir sonraki denemeye kalır
+            with self._lock:
+                for key, count in deltas.items():
+                    self._deltas[key] = self._deltas.get(key, 0) + count
+                self._recent.extendleft(reversed(recent))
+
+    def seed(self, build):
+        """
+        Replace unseeded totals with ``build()`` -> ``(counters, recent)``,
+        counted from the log. ``build`` runs under the file lock, so no
+        worker flushes in between and only one worker scans the log.
+        """
+        def replace(data):
+            if data['seeded']:
+                return
+            counters, recent = build()
+            data.update(seeded=True, counters=counters, recent=merge_recent([], recent))
+        self._update(replace)
+
+    def reset(self):
+        """Zero the shared totals (the log was cleared)"""
+        with self._lock:
+            self._deltas = {}
+            self._recent = deque(maxlen=RECENT_SIZE)
+
+        def replace(data):
+            data.update(empty_stats(), seeded=True)
+        self._update(replace)
+
+    def snapshot(self):
+        """
+        Shared totals plus this process's not yet flushed deltas:
+        ``{'seeded': bool, 'counters': {key: count}, 'recent': [...]}``,
+        or None when no totals were ever written.
+        """
+        data = self._load()
+        with self._lock:
+            deltas = dict(self._deltas)
+            recent = list(self._recent)
+        if data is None and not deltas:
+            return None
+        data = data or empty_stats()
+        counters = data['counters']
+        for key, count in deltas.items():
+            counters[key] = counters.get(key, 0) + count
+        data['recent'] = merge_recent(data['recent'], recent)
+        return data
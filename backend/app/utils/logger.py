@@ -1,8 +1,12 @@
 import logging
 from datetime import datetime
 from flask import request
-import json
 import os
+from . import json_codec
+from .async_log import AsyncFileHandler
+from .log_index import sidecar_index
+from .log_stats import LogStats
+from ..config import Config
 
 # Configure logging
 logging.basicConfig(
@@ -20,16 +24,84 @@ def get_logger(name):
 logs_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs')
 os.makedirs(logs_dir, exist_ok=True)
 
+# 'jsonl': kayıt başına tek satır JSON (GTM_LOG_KEYS); 'text': eski okunabilir format
+GTM_LOG_JSONL = Config.GTM_LOG_FORMAT == 'jsonl'
+GTM_LOG_KEYS = ('ts', 'level', 'type', 'event', 'container', 'pixel', 'status', 'duration_ms', 'payload')
+
+if GTM_LOG_JSONL:
+    gtm_formatter = logging.Formatter('%(message)s')
+else:
+    gtm_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+def make_gtm_file_handler(path, async_write=None):
+    """File handler for the GTM event log; background writer unless GTM_LOG_ASYNC is off"""
+    if async_write is None:
+        async_write = Config.GTM_LOG_ASYNC
+    if async_write:
+        handler = AsyncFileHandler(
+            path,
+            max_queue_size=Config.GTM_LOG_QUEUE_MAX_SIZE,
+            policy=Config.GTM_LOG_QUEUE_POLICY,
+            block_timeout=Config.GTM_LOG_BLOCK_TIMEOUT,
+            batch_size=Config.GTM_LOG_BATCH_SIZE,
+            flush_interval=Config.GTM_LOG_FLUSH_INTERVAL,
+            fsync_interval=Config.GTM_LOG_FSYNC_INTERVAL,
+            index=sidecar_index(
+                path,
+                bucket_seconds=Config.GTM_LOG_INDEX_BUCKET_SECONDS,
+                segment_bytes=Config.GTM_LOG_INDEX_SEGMENT_BYTES
+            ) if Config.GTM_LOG_INDEX else None
+        )
+    else:
+        handler = logging.FileHandler(path)
+    handler.setLevel(logging.INFO)
+    handler.setFormatter(gtm_formatter)
+    return handler
+
 # Create file handler for GTM events
-gtm_file_handler = logging.FileHandler(os.path.join(logs_dir, 'gtm_events.log'))
-gtm_file_handler.setLevel(logging.INFO)
-gtm_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-gtm_file_handler.setFormatter(gtm_formatter)
+gtm_file_handler = make_gtm_file_handler(os.path.join(logs_dir, 'gtm_events.log'))
 
 # Create GTM logger
 gtm_logger = logging.getLogger('gtm_events')
 gtm_logger.addHandler(gtm_file_handler)
 gtm_logger.setLevel(logging.INFO)
+# Root'un basicConfig StreamHandler'ı her kaydı istek thread'inde yeniden biçimleyip yazardı
+gtm_logger.propagate = False
+
+# /api/logs/gtm-events/stats sayaçları; kayıt yazılırken artırılır
+gtm_log_stats = LogStats(os.path.join(logs_dir, 'gtm_events.stats.json'), flush_interval=Config.GTM_STATS_FLUSH_INTERVAL)
+
+class LazyJson:
+    """
+    Log argument serialized only when the record is formatted, which for the
+    async GTM handler happens on its writer thread. Top-level dicts are
+    copied so later changes by the caller do not leak into the line.
+    """
+
+    __slots__ = ('value', 'pretty')
+
+    def __init__(self, value, pretty=False):
+        self.value = dict(value) if isinstance(value, dict) else value
+        self.pretty = pretty
+
+    def __str__(self):
+        if self.pretty:
+            return json_codec.dumps_pretty(self.value)
+        return json_codec.dumps(self.value, default=str)
+
+def log_gtm_record(level, record_type, event_name, gtm_container_id, status, pixel_id=None, duration_ms=None, payload=None):
+    """Write one JSONL record to the GTM event log (GTM_LOG_FORMAT=jsonl)"""
+    getattr(gtm_logger, level)('%s', LazyJson({
+        'ts': datetime.utcnow().isoformat(timespec='milliseconds') + 'Z',
+        'level': level.upper(),
+        'type': record_type,
+        'event': event_name,
+        'container': gtm_container_id,
+        'pixel': pixel_id,
+        'status': status,
+        'duration_ms': duration_ms,
+        'payload': dict(payload) if isinstance(payload, dict) else payload
+    }))
 
 class EventLogger:
     """Custom logger for Facebook CAPI events"""
@@ -94,7 +166,11 @@ class GtmEventLogger:
             'user_agent': user_agent or (request.headers.get('User-Agent') if request else None)
         }
         
-        gtm_logger.info(f"GTM Event Received: {event_name} | Container: {gtm_container_id} | Data: {json.dumps(event_data, indent=2)}")
+        gtm_log_stats.record('INFO', 'GTM_EVENT_RECEIVED', event_name, gtm_container_id, 'RECEIVED')
+        if GTM_LOG_JSONL:
+            log_gtm_record('info', 'GTM_EVENT_RECEIVED', event_name, gtm_container_id, 'RECEIVED', payload=event_data)
+        else:
+            gtm_logger.info("GTM Event Received: %s | Container: %s | Data: %s", event_name, gtm_container_id, LazyJson(event_data, pretty=True))
         return log_entry
     
     @staticmethod
@@ -117,7 +193,11 @@ class GtmEventLogger:
             'pixel_id': pixel_id
         }
         
-        gtm_logger.info(f"Meta Request Sent: {event_name} | Container: {gtm_container_id} | Pixel: {pixel_id} | Payload: {json.dumps(safe_payload, indent=2)}")
+        gtm_log_stats.record('INFO', 'META_REQUEST_SENT', event_name, gtm_container_id, 'SENT')
+        if GTM_LOG_JSONL:
+            log_gtm_record('info', 'META_REQUEST_SENT', event_name, gtm_container_id, 'SENT', pixel_id=pixel_id, payload=safe_payload)
+        else:
+            gtm_logger.info("Meta Request Sent: %s | Container: %s | Pixel: %s | Payload: %s", event_name, gtm_container_id, pixel_id, LazyJson(safe_payload, pretty=True))
         return log_entry
     
     @staticmethod
@@ -137,9 +217,19 @@ class GtmEventLogger:
         }
         
         if success:
-            gtm_logger.info(f"Meta Response Success: {event_name} | Container: {gtm_container_id} | Response: {json.dumps(meta_response, indent=2)}")
+            gtm_log_stats.record('INFO', 'META_RESPONSE_RECEIVED', event_name, gtm_container_id, 'SUCCESS')
         else:
-            gtm_logger.error(f"Meta Response Error: {event_name} | Container: {gtm_container_id} | Error: {error_message} | Response: {json.dumps(meta_response, indent=2)}")
+            gtm_log_stats.record('ERROR', 'META_RESPONSE_RECEIVED', event_name, gtm_container_id, 'ERROR')
+        if GTM_LOG_JSONL:
+            if success:
+                log_gtm_record('info', 'META_RESPONSE_RECEIVED', event_name, gtm_container_id, 'SUCCESS', payload=meta_response)
+            else:
+                log_gtm_record('error', 'META_RESPONSE_RECEIVED', event_name, gtm_container_id, 'ERROR',
+                               payload={'error': error_message, 'response': meta_response})
+        elif success:
+            gtm_logger.info("Meta Response Success: %s | Container: %s | Response: %s", event_name, gtm_container_id, LazyJson(meta_response, pretty=True))
+        else:
+            gtm_logger.error("Meta Response Error: %s | Container: %s | Error: %s | Response: %s", event_name, gtm_container_id, error_message, LazyJson(meta_response, pretty=True))
         
         return log_entry
     
@@ -159,7 +249,11 @@ class GtmEventLogger:
         }
         
         status = "SUCCESS" if success else "FAILED"
-        gtm_logger.info(f"GTM Event Complete: {event_name} | Container: {gtm_container_id} | Status: {status} | Duration: {total_duration_ms}ms")
+        gtm_log_stats.record('INFO', 'GTM_EVENT_COMPLETE', event_name, gtm_container_id, status)
+        if GTM_LOG_JSONL:
+            log_gtm_record('info', 'GTM_EVENT_COMPLETE', event_name, gtm_container_id, status, duration_ms=total_duration_ms)
+        else:
+            gtm_logger.info(f"GTM Event Complete: {event_name} | Container: {gtm_container_id} | Status: {status} | Duration: {total_duration_ms}ms")
         return log_entry
     
     @staticmethod
@@ -179,6 +273,15 @@ class GtmEventLogger:
         }
         
         if success:
+            gtm_log_stats.record('INFO', 'TOKEN_INFO_REQUEST', None, gtm_container_id, 'OK')
+        else:
+            gtm_log_stats.record('WARNING', 'TOKEN_INFO_REQUEST', None, gtm_container_id, 'TOKEN_ERROR')
+        if GTM_LOG_JSONL:
+            if success:
+                log_gtm_record('info', 'TOKEN_INFO_REQUEST', None, gtm_container_id, 'OK', payload={'source_ip': log_entry['source_ip']})
+            else:
+                log_gtm_record('warning', 'TOKEN_INFO_REQUEST', None, gtm_container_id, 'TOKEN_ERROR', payload={'error': error_message})
+        elif success:
             gtm_logger.info(f"Token Info Request: {gtm_container_id} | IP: {log_entry['source_ip']}")
         else:
             gtm_logger.warning(f"Token Info Request Failed: {gtm_container_id} | Error: {error_message}")
@@ -200,7 +303,11 @@ class GtmEventLogger:
             'source_ip': request.remote_addr if request else None
         }
         
-        gtm_logger.info(f"GTM Script Generated: Token {token_id} | Container: {gtm_container_id} | User: {user_id}")
+        gtm_log_stats.record('INFO', 'GTM_SCRIPT_GENERATED', None, gtm_container_id, 'GENERATED')
+        if GTM_LOG_JSONL:
+            log_gtm_record('info', 'GTM_SCRIPT_GENERATED', None, gtm_container_id, 'GENERATED', payload={'token_id': token_id, 'user_id': user_id})
+        else:
+            gtm_logger.info(f"GTM Script Generated: Token {token_id} | Container: {gtm_container_id} | User: {user_id}")
         return log_entry
 
 def log_error(error, context=None):
@@ -1,19 +1,146 @@
+import os
 import time
+import threading
 import psutil
 import logging
+from contextlib import contextmanager
 from functools import wraps
 from flask import request, g
-from prometheus_client import Counter, Histogram, Gauge, generate_latest
+from prometheus_client import CollectorRegistry, Counter, Histogram, Gauge, generate_latest, multiprocess
+from ..config import Config
+
+# gunicorn.conf.py ayarlar: worker'lar metriklerini bu dizindeki mmap dosyalarına yazar,
+# /metrics hangi worker'a düşerse düşsün hepsinin toplamını döner
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
 
 # Prometheus metrics
 REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status'])
 REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'HTTP request latency')
-ACTIVE_CONNECTIONS = Gauge('active_connections', 'Number of active connections')
-MEMORY_USAGE = Gauge('memory_usage_bytes', 'Memory usage in bytes')
-CPU_USAGE = Gauge('cpu_usage_percent', 'CPU usage percentage')
+ACTIVE_CONNECTIONS = Gauge('active_connections', 'Number of active connections', multiprocess_mode='livesum')
+MEMORY_USAGE = Gauge('memory_usage_bytes', 'Memory usage in bytes', multiprocess_mode='livemostrecent')
+CPU_USAGE = Gauge('cpu_usage_percent', 'CPU usage percentage', multiprocess_mode='livemostrecent')
+
+# Graph API transport metrics
+GRAPH_POOL_HITS = Counter('graph_api_pool_hits_total', 'Graph API requests served on a reused keep-alive connection')
+GRAPH_HANDSHAKES = Counter('graph_api_handshakes_total', 'New TCP/TLS connections opened to the Graph API')
+
+# Event batcher metrics
+EVENT_BATCH_QUEUE_DEPTH = Gauge('event_batch_queue_depth', 'Events waiting in the batcher queue', ['batcher'], multiprocess_mode='livesum')
+EVENT_BATCH_FLUSH_LATENCY = Histogram('event_batch_flush_duration_seconds', 'Time to deliver one batch to Meta', ['batcher'])
+EVENT_BATCH_REJECTED = Counter('event_batch_rejected_total', 'Events rejected because the batcher queue was full', ['batcher'])
+
+# Asyncio dispatcher metrics
+DISPATCHER_IN_FLIGHT = Gauge('dispatcher_in_flight', 'Events currently being delivered by the asyncio dispatcher', multiprocess_mode='livesum')
+DISPATCHER_EVENTS = Counter('dispatcher_events_total', 'Events handled by the asyncio dispatcher', ['result'])
+
+# Retry / dead-letter metrics
+DELIVERY_RETRIES = Counter('delivery_retries_total', 'Meta deliveries scheduled for another attempt', ['path'])
+DEAD_LETTERS = Counter('dead_letters_total', 'Events written to the dead-letter table', ['reason'])
+DEAD_LETTER_REPLAYS = Counter('dead_letter_replays_total', 'Dead-letter replay attempts', ['result'])
+
+# Circuit breaker metrics (0 closed, 1 half-open, 2 open)
+CIRCUIT_STATE = Gauge('graph_circuit_state', 'Circuit breaker state per dataset', ['dataset_id'], multiprocess_mode='livemax')
+CIRCUIT_SHORT_CIRCUITS = Counter('graph_circuit_short_circuits_total', 'Sends skipped because the circuit was open', ['dataset_id'])
+
+# In-process cache metrics
+CACHE_HITS = Counter('cache_hits_total', 'In-process cache hits', ['cache'])
+CACHE_MISSES = Counter('cache_misses_total', 'In-process cache misses', ['cache'])
+CACHE_EVICTIONS = Counter('cache_evictions_total', 'Entries evicted because the cache was full', ['cache'])
+CACHE_SIZE = Gauge('cache_entries', 'Entries currently held by an in-process cache', ['cache'], multiprocess_mode='livesum')
+
+# event_id deduplication
+DEDUP_DROPPED = Counter('event_dedup_dropped_total', 'Duplicate events dropped before reaching Meta', ['gtm_container_id'])
+
+# Client-side hashing rate (prehashed / seen)
+USER_DATA_FIELDS_SEEN = Counter('user_data_fields_total', 'PII user_data fields received', ['gtm_container_id'])
+USER_DATA_PREHASHED = Counter('user_data_prehashed_total', 'PII user_data fields received already SHA-256 hashed', ['gtm_container_id'])
+
+# Arka planda yazılan log dosyaları (GTM event log)
+LOG_QUEUE_DEPTH = Gauge('log_queue_depth', 'Log lines waiting for the background writer', ['handler'], multiprocess_mode='livesum')
+LOG_RECORDS_DROPPED = Counter('log_records_dropped_total', 'Log lines dropped because the queue was full or the write failed', ['handler'])
+LOG_WRITE_BATCH_SIZE = Histogram('log_write_batch_lines', 'Lines written per write() call', ['handler'], buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000))
+
+_callback_gauges = []
+
+def track_gauge(child, fn):
+    """
+    Gauge child whose value is ``fn()``. A single process reads it at scrape
+    time; in multiprocess mode the scrape cannot call into other workers, so
+    each worker's GaugeRefresher copies the value into the shared files.
+    """
+    if MULTIPROCESS:
+        _callback_gauges.append((child, fn))
+    else:
+        child.set_function(fn)
+
+class GaugeRefresher:
+    """Per-worker thread that writes ``track_gauge`` values every ``interval`` seconds"""
+
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        if not MULTIPROCESS or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='metrics-gauge-refresher', daemon=True).start()
+
+    def _run(self):
+        while True:
+            self.refresh()
+            time.sleep(self.interval)
+
+    def refresh(self):
+        for child, fn in list(_callback_gauges):
+            try:
+                child.set(fn())
+            except Exception as e:
+                logger.error(f"Error refreshing gauge: {e}")
+
+gauge_refresher = GaugeRefresher(Config.METRICS_GAUGE_REFRESH_INTERVAL)
+
+# send_event_to_meta aşama süreleri; container etiketi isteğe bağlı (container başına seri sayısı artar)
+EVENT_STAGES = ('token_lookup', 'domain_lookup', 'hashing', 'payload_build', 'logging', 'graph_api')
+STAGE_CONTAINER_LABEL = Config.STAGE_METRICS_CONTAINER_LABEL
+EVENT_STAGE_LATENCY = Histogram(
+    'event_stage_duration_seconds',
+    'Time spent in each stage of send_event_to_meta',
+    ['stage', 'event_name', 'outcome'] + (['gtm_container_id'] if STAGE_CONTAINER_LABEL else []),
+    # Önbellek ve hash aşamaları mikro saniyeler, Graph isteği yüzlerce ms sürer
+    buckets=(.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+)
 
 logger = logging.getLogger(__name__)
 
+class StageTimer:
+    """
+    Per-event stage stopwatch. Durations accumulate per stage while the event
+    is processed and are observed once, with the outcome, by ``observe``.
+    """
+
+    def __init__(self):
+        self.durations = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - started
+
+    def observe(self, event_name, outcome, gtm_container_id=None):
+        labels = {'event_name': event_name, 'outcome': outcome}
+        if STAGE_CONTAINER_LABEL:
+            labels['gtm_container_id'] = gtm_container_id or ''
+        for stage, duration in self.durations.items():
+            EVENT_STAGE_LATENCY.labels(stage=stage, **labels).observe(duration)
+
 def monitor_request():
     """Monitor HTTP requests"""
     def decorator(f):
@@ -72,8 +199,13 @@ def update_system_metrics():
         logger.error(f"Error updating system metrics: {e}")
 
 def get_metrics():
-    """Get Prometheus metrics"""
+    """Get Prometheus metrics (summed over gunicorn workers in multiprocess mode)"""
     update_system_metrics()
+    if MULTIPROCESS:
+        gauge_refresher.refresh()
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
     return generate_latest()
 
 class PerformanceMonitor:
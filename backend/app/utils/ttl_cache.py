@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+from .monitoring import CACHE_HITS, CACHE_MISSES, CACHE_EVICTIONS, CACHE_SIZE, track_gauge
+
+MISSING = object()
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU cache whose entries expire after ``ttl``
+    seconds. ``None`` is a valid cached value (negative caching) and can be
+    given its own, shorter ``negative_ttl``. Each process has its own copy.
+    """
+
+    def __init__(self, name, maxsize, ttl, negative_ttl=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = CACHE_HITS.labels(cache=name)
+        self._misses = CACHE_MISSES.labels(cache=name)
+        self._evictions = CACHE_EVICTIONS.labels(cache=name)
+        track_gauge(CACHE_SIZE.labels(cache=name), self.__len__)
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """Return the cached value or ``MISSING``"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self._hits.inc()
+                    return value
+                del self._data[key]
+        self._misses.inc()
+        return MISSING
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions.inc()
+
+    def add(self, key, value=True, ttl=None):
+        """Store ``value`` only if ``key`` is absent or expired; returns True if stored"""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return False
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions.inc()
+        return True
+
+    def get_or_load(self, key, loader):
+        """Return the cached value, calling ``loader(key)`` on a miss"""
+        value = self.get(key)
+        if value is MISSING:
+            value = loader(key)
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,90 @@
+"""
+Per-event JSON cost on the delivery path for each available codec:
+parsing the inbound body, serializing the Graph API payload and the four
+indented GtmEventLogger lines.
+
+    python benchmarks/bench_json_codec.py --events 20000
+
+Codecs that are not installed (orjson) are skipped.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import json_codec
+
+INBOUND = {
+    'gtm_container_id': 'GTM-ABC1234',
+    'event_id': '4b7f8e4e-3c1d-4a55-9d2e-0f6c1b2a9e11',
+    'event_time': 1718000000,
+    'user_data': {
+        'em': 'customer@example.com',
+        'ph': '+905551112233',
+        'client_ip_address': '203.0.113.7',
+        'client_user_agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15',
+        'fbp': 'fb.1.1718000000000.1234567890',
+        'fbc': 'fb.1.1718000000000.AbCdEfGhIjKlMnOp'
+    },
+    'value': 149.9,
+    'currency': 'TRY',
+    'contents': [{'id': f'sku-{i}', 'quantity': i, 'item_price': 49.9} for i in range(1, 4)],
+    'content_type': 'product',
+    'order_id': 'ORDER-100045'
+}
+
+PAYLOAD = {
+    'event_name': 'Purchase',
+    'event_time': 1718000000,
+    'event_id': INBOUND['event_id'],
+    'action_source': 'website',
+    'event_source_url': 'https://www.example.com',
+    'user_data': {
+        'em': ['a3f1' * 16],
+        'ph': ['9b2c' * 16],
+        'client_ip_address': '203.0.113.7',
+        'client_user_agent': INBOUND['user_data']['client_user_agent'],
+        'fbp': INBOUND['user_data']['fbp'],
+        'fbc': INBOUND['user_data']['fbc']
+    },
+    'custom_data': {key: INBOUND[key] for key in ('value', 'currency', 'contents', 'content_type', 'order_id')}
+}
+
+REQUEST_BODY = {'data': [PAYLOAD], 'access_token': 'EAAB' + 'x' * 180, 'test_event_code': ''}
+META_RESPONSE = {'events_received': 1, 'messages': [], 'fbtrace_id': 'AbCdEfGhIjKl'}
+
+def per_event(codec, raw_inbound):
+    codec.loads(raw_inbound)                  # request.get_json
+    codec.dumps_pretty(INBOUND)               # log_gtm_event_received
+    codec.dumps_pretty(PAYLOAD)               # log_meta_request_sent
+    codec.dumps_bytes(REQUEST_BODY)           # FacebookCAPI.send_events
+    codec.dumps_pretty(META_RESPONSE)         # log_meta_response_received
+
+def measure(codec, events):
+    raw_inbound = json_codec.StdlibCodec().dumps_bytes(INBOUND)
+    for _ in range(min(events, 1000)):
+        per_event(codec, raw_inbound)
+    start = time.perf_counter()
+    for _ in range(events):
+        per_event(codec, raw_inbound)
+    return (time.perf_counter() - start) / events * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=20000)
+    args = parser.parse_args()
+
+    codecs = [json_codec.StdlibCodec()]
+    if json_codec.orjson is not None:
+        codecs.append(json_codec.OrjsonCodec())
+
+    results = {codec.name: measure(codec, args.events) for codec in codecs}
+    baseline = results['stdlib']
+    print(f"{'codec':<8} {'us/event':>10} {'speedup':>8}")
+    for name, micros in results.items():
+        print(f"{name:<8} {micros:>10.1f} {baseline / micros:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
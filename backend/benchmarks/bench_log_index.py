@@ -0,0 +1,142 @@
+"""
+Benchmark the gtm_events.log sidecar index against a plain reverse scan.
+
+    python benchmarks/bench_log_index.py --lines 10000000 --dir /tmp/capify-logs
+
+Writes a synthetic log (text format, --containers containers with a skewed
+traffic share, --days of timestamps), builds the index once, then times
+filtered queries for the newest --limit entries with and without it:
+a busy container, a rare container, a one-hour window and a rare
+container inside that window. The log is reused between runs when it
+already has the requested number of lines.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.routes.logs import parse_gtm_log_line
+from app.utils.log_index import SidecarIndex, line_time
+from app.utils.log_reader import read_lines_reverse
+
+TEMPLATES = [
+    '{ts} - INFO - GTM Event Received: {event} | Container: {container} | Data: {{"value": 12.5, "currency": "TRY"}}',
+    '{ts} - INFO - Meta Request Sent: {event} | Container: {container} | Pixel: 123456789 | Payload: {{"event_name": "{event}"}}',
+    '{ts} - INFO - Meta Response Success: {event} | Container: {container} | Response: {{"events_received": 1}}',
+    '{ts} - INFO - GTM Event Complete: {event} | Container: {container} | Status: SUCCESS | Duration: 87ms',
+]
+EVENTS = ['PageView', 'ViewContent', 'AddToCart', 'Purchase', 'Lead']
+
+def container_names(count):
+    return [f'GTM-{index:07d}' for index in range(count)]
+
+def generate(path, lines, containers, days, seed):
+    rng = random.Random(seed)
+    # Az sayıda container trafiğin çoğunu üretir
+    names = container_names(containers)
+    weights = [1 / (rank + 1) for rank in range(containers)]
+    start = time.mktime(time.strptime('2024-06-01 00:00:00', '%Y-%m-%d %H:%M:%S'))
+    step = days * 86400 / lines
+    with open(path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        written = 0
+        while written < lines:
+            chunk = []
+            container_batch = rng.choices(names, weights, k=1000)
+            for container in container_batch:
+                moment = start + written * step
+                stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(moment)) + ',000'
+                event = EVENTS[written % len(EVENTS)]
+                chunk.append(TEMPLATES[written % 4].format(ts=stamp, event=event, container=container))
+                written += 1
+                if written >= lines:
+                    break
+            f.write('\n'.join(chunk) + '\n')
+
+def count_lines(path):
+    with open(path, 'rb') as f:
+        return sum(block.count(b'\n') for block in iter(lambda: f.read(1 << 20), b''))
+
+def query(path, ranges, container, since, until, limit):
+    found = []
+    for range_start, range_end in ranges:
+        for _, line in read_lines_reverse(path, end=range_end, start=range_start):
+            if since is not None:
+                moment = line_time(line)
+                if moment is None or moment < since or moment > until:
+                    continue
+            entry = parse_gtm_log_line(line)
+            if not entry or (container and entry.get('container') != container):
+                continue
+            found.append(entry)
+            if len(found) >= limit:
+                return found
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=10_000_000)
+    parser.add_argument('--containers', type=int, default=500)
+    parser.add_argument('--days', type=float, default=30)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--dir', default='/tmp/capify-log-bench')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    path = os.path.join(args.dir, 'gtm_events.log')
+    started = time.perf_counter()
+    if not os.path.exists(path) or count_lines(path) != args.lines:
+        generate(path, args.lines, args.containers, args.days, args.seed)
+        print(f"generated {args.lines} lines ({os.path.getsize(path) / 2 ** 20:.0f} MiB) in {time.perf_counter() - started:.1f}s")
+    names = container_names(args.containers)
+
+    index = SidecarIndex(path)
+    if os.path.exists(index.path):
+        os.remove(index.path)
+    started = time.perf_counter()
+    entries = index.rebuild()
+    print(f"index rebuild: {time.perf_counter() - started:.1f}s, {entries} entries, "
+          f"{os.path.getsize(index.path) / 2 ** 10:.0f} KiB")
+    # Sidecar süreç başına bir kez okunur; sorgular yalnızca eklenenleri okur
+    started = time.perf_counter()
+    index.candidate_ranges()
+    print(f"index load: {time.perf_counter() - started:.3f}s")
+
+    # Zaman penceresi: logun ortasında bir saat
+    with open(path, 'rb') as f:
+        first = line_time(f.readline().decode())
+        f.seek(max(0, os.path.getsize(path) - 4096))
+        last = line_time(f.read().decode().splitlines()[-1])
+    since = first + (last - first) / 2
+    until = since + 3600
+
+    cases = [
+        ('busy container', names[0], None, None),
+        ('rare container', names[-1], None, None),
+        ('one-hour window', None, since, until),
+        ('rare container in window', names[-1], since, until),
+    ]
+    size = os.path.getsize(path)
+    print(f"\n{'query':<26} {'scan s':>9} {'index s':>9} {'cand. MiB':>9} {'matches':>8}")
+    for label, container, window_start, window_end in cases:
+        started = time.perf_counter()
+        plain = query(path, [(0, size)], container, window_start, window_end, args.limit)
+        scan_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        ranges = index.candidate_ranges(container=container, since=window_start, until=window_end)
+        if ranges is None:
+            # Adaylar dosyanın çoğunu kaplıyor; endpoint gibi düz taramaya dön
+            ranges = [(0, size)]
+        indexed = query(path, ranges, container, window_start, window_end, args.limit)
+        index_time = time.perf_counter() - started
+
+        assert [entry['raw_message'] for entry in indexed] == [entry['raw_message'] for entry in plain]
+        read_mib = sum(end - start for start, end in ranges) / 2 ** 20
+        print(f"{label:<26} {scan_time:>9.3f} {index_time:>9.3f} {read_mib:>9.1f} {len(indexed):>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Lookup cost of the event-path queries with and without the indexes from
+migration b41e0c8d2f6a.
+
+    python benchmarks/bench_lookup_indexes.py --containers 100000 --lookups 2000
+
+Runs against a throwaway SQLite database (in memory unless --db is given);
+pass a PostgreSQL URL with --db to measure the production engine.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlalchemy as sa
+from app.models.user import User
+from app.models.facebook_token import FacebookToken
+from app.models.gtm_verification import GtmVerification
+
+TABLES = [User.__table__, FacebookToken.__table__, GtmVerification.__table__]
+
+QUERIES = {
+    'token by container': (
+        FacebookToken.__table__,
+        lambda c: sa.select(FacebookToken.__table__).where(
+            FacebookToken.__table__.c.gtm_container_id == c['container']
+        ).limit(1)
+    ),
+    'verified source url': (
+        GtmVerification.__table__,
+        lambda c: sa.select(GtmVerification.__table__.c.event_source_url).where(
+            GtmVerification.__table__.c.gtm_container_id == c['container'],
+            GtmVerification.__table__.c.is_verified == sa.true()
+        ).limit(1)
+    ),
+    'tokens by user': (
+        FacebookToken.__table__,
+        lambda c: sa.select(FacebookToken.__table__).where(FacebookToken.__table__.c.user_id == c['user_id'])
+    ),
+    'verification by user+domain': (
+        GtmVerification.__table__,
+        lambda c: sa.select(GtmVerification.__table__).where(
+            GtmVerification.__table__.c.user_id == c['user_id'],
+            GtmVerification.__table__.c.domain_name == c['domain']
+        ).limit(1)
+    ),
+}
+
+def seed(engine, containers, users):
+    for table in TABLES:
+        table.create(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'id': i, 'email': f'user{i}@example.com', 'password_hash': 'x'} for i in range(1, users + 1)
+        ])
+        tokens, verifications = [], []
+        for i in range(containers):
+            user_id = i % users + 1
+            container = f'GTM-{i:08X}'
+            domain = f'shop{i}.example.com'
+            tokens.append({
+                'user_id': user_id, 'dataset_id': str(10 ** 12 + i), 'access_token': f'token-{i}',
+                'token_name': f'Token_{i}', 'gtm_container_id': container, 'is_active': i % 10 != 0
+            })
+            verifications.append({
+                'user_id': user_id, 'gtm_container_id': container, 'domain_name': domain,
+                'event_source_url': f'https://www.{domain}', 'is_verified': i % 4 != 0,
+                'verification_token': f'CAPIFY_VERIFY_{i}'
+            })
+        conn.execute(FacebookToken.__table__.insert(), tokens)
+        conn.execute(GtmVerification.__table__.insert(), verifications)
+
+def drop_indexes(engine):
+    for table in TABLES:
+        for index in table.indexes:
+            index.drop(engine)
+
+def create_indexes(engine):
+    for table in TABLES:
+        for index in table.indexes:
+            index.create(engine)
+
+def measure(engine, samples):
+    results = {}
+    with engine.connect() as conn:
+        for name, (_, build) in QUERIES.items():
+            statements = [build(sample) for sample in samples]
+            start = time.perf_counter()
+            for statement in statements:
+                conn.execute(statement).fetchall()
+            results[name] = (time.perf_counter() - start) / len(statements) * 1e6
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--containers', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--db', default='sqlite://')
+    args = parser.parse_args()
+
+    engine = sa.create_engine(args.db)
+    print(f'Seeding {args.containers} containers for {args.users} users...')
+    seed(engine, args.containers, args.users)
+
+    rng = random.Random(42)
+    samples = []
+    for _ in range(args.lookups):
+        i = rng.randrange(args.containers)
+        samples.append({'container': f'GTM-{i:08X}', 'user_id': i % args.users + 1, 'domain': f'shop{i}.example.com'})
+
+    drop_indexes(engine)
+    before = measure(engine, samples)
+    create_indexes(engine)
+    after = measure(engine, samples)
+
+    print(f"\n{'query':<30}{'no index (us)':>15}{'indexed (us)':>15}{'speedup':>10}")
+    for name in QUERIES:
+        print(f'{name:<30}{before[name]:>15.1f}{after[name]:>15.1f}{before[name] / after[name]:>9.0f}x')
+
+    # Gerçek bir veritabanına karşı çalıştırıldıysa tabloları temizle
+    if args.db != 'sqlite://':
+        for table in reversed(TABLES):
+            table.drop(engine)
+
+if __name__ == '__main__':
+    main()
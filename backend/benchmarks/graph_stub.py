@@ -0,0 +1,147 @@
+"""
+Local stand-in for the Graph API Conversions endpoint, for load tests.
+
+    python benchmarks/graph_stub.py --port 8088 --latency lognormal:80,0.5 \
+        --error-rate 0.01 --throttle-rate 0.02
+
+    FACEBOOK_GRAPH_URL=http://127.0.0.1:8088 gunicorn wsgi:app ...
+
+POST /<version>/<dataset_id>/events behaves like Meta for the parts the
+pipeline depends on: the body's ``data`` array is validated (1-1000
+events, each with event_name and event_time), accepted requests answer
+``{"events_received": n, "fbtrace_id": ...}`` and failures use Graph error
+bodies (code 2 for 5xx, code 4 / HTTP 429 for throttling, code 190 for
+``--auth-error-rate``). Latency is drawn per request from ``--latency``:
+
+    fixed:MS            constant
+    uniform:MIN,MAX     uniform between MIN and MAX ms
+    lognormal:MEDIAN,S  log-normal with the given median (ms) and sigma
+    exp:MEAN            exponential with the given mean (ms)
+
+GET /_stats returns request/event counters; POST /_stats/reset clears them.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from aiohttp import web
+
+MAX_EVENTS_PER_REQUEST = 1000
+
+def parse_latency(spec):
+    """Return a function that draws one latency in seconds"""
+    kind, _, args = spec.partition(':')
+    values = [float(value) for value in args.split(',')] if args else []
+    if kind == 'fixed':
+        return lambda: values[0] / 1000
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == 'lognormal':
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1]) / 1000
+    if kind == 'exp':
+        return lambda: random.expovariate(1 / values[0]) / 1000
+    raise argparse.ArgumentTypeError(f'unknown latency distribution: {spec}')
+
+def graph_error(status, code, message, error_type='OAuthException'):
+    body = {'error': {'message': message, 'type': error_type, 'code': code, 'fbtrace_id': uuid.uuid4().hex[:12]}}
+    return web.json_response(body, status=status)
+
+class GraphStub:
+    def __init__(self, latency, error_rate=0.0, throttle_rate=0.0, auth_error_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.auth_error_rate = auth_error_rate
+        self.reset()
+
+    def reset(self):
+        self.stats = {
+            'requests': 0,
+            'events_received': 0,
+            'errors': 0,
+            'throttled': 0,
+            'auth_errors': 0,
+            'invalid': 0,
+            'max_batch': 0,
+            'started_at': time.time()
+        }
+
+    async def events(self, request):
+        self.stats['requests'] += 1
+        await asyncio.sleep(self.latency())
+
+        try:
+            body = json.loads(await request.read())
+        except ValueError:
+            self.stats['invalid'] += 1
+            return graph_error(400, 100, 'Invalid JSON body', 'GraphMethodException')
+        events = body.get('data') if isinstance(body, dict) else None
+        if not isinstance(events, list) or not events:
+            self.stats['invalid'] += 1
+            return graph_error(400, 100, 'The parameter data is required', 'GraphMethodException')
+        if len(events) > MAX_EVENTS_PER_REQUEST:
+            self.stats['invalid'] += 1
+            return graph_error(400, 100, f'A batch can contain at most {MAX_EVENTS_PER_REQUEST} events', 'GraphMethodException')
+        if not all(isinstance(event, dict) and event.get('event_name') and event.get('event_time') for event in events):
+            self.stats['invalid'] += 1
+            return graph_error(400, 100, 'Each event needs event_name and event_time', 'GraphMethodException')
+
+        # Hata türleri sırayla, bağımsız olasılıklarla seçilir
+        draw = random.random()
+        if draw < self.auth_error_rate:
+            self.stats['auth_errors'] += 1
+            return graph_error(400, 190, 'Error validating access token')
+        draw -= self.auth_error_rate
+        if draw < self.throttle_rate:
+            self.stats['throttled'] += 1
+            return graph_error(429, 4, 'Application request limit reached')
+        draw -= self.throttle_rate
+        if draw < self.error_rate:
+            self.stats['errors'] += 1
+            return graph_error(503, 2, 'Service temporarily unavailable', 'FacebookApiException')
+
+        self.stats['events_received'] += len(events)
+        self.stats['max_batch'] = max(self.stats['max_batch'], len(events))
+        return web.json_response({
+            'events_received': len(events),
+            'messages': [],
+            'fbtrace_id': uuid.uuid4().hex[:12]
+        })
+
+    async def get_stats(self, request):
+        elapsed = time.time() - self.stats['started_at']
+        return web.json_response(dict(self.stats, events_per_second=self.stats['events_received'] / elapsed if elapsed else 0))
+
+    async def reset_stats(self, request):
+        self.reset()
+        return web.json_response({'reset': True})
+
+    def make_app(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/{version}/{dataset_id}/events', self.events)
+        app.router.add_get('/_stats', self.get_stats)
+        app.router.add_post('/_stats/reset', self.reset_stats)
+        return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8088)
+    parser.add_argument('--latency', type=parse_latency, default='lognormal:80,0.5', help='default: lognormal:80,0.5')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered 503 (retryable)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of requests answered 429')
+    parser.add_argument('--auth-error-rate', type=float, default=0.0, help='share of requests answered with code 190')
+    parser.add_argument('--seed', type=int, help='random seed for reproducible runs')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    stub = GraphStub(args.latency, args.error_rate, args.throttle_rate, args.auth_error_rate)
+    web.run_app(stub.make_app(), host=args.host, port=args.port, access_log=None)
+
+if __name__ == '__main__':
+    main()
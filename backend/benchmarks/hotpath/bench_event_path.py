@@ -0,0 +1,15 @@
+from app.services.event_builder import build_event_payload
+from app.services.facebook_event_sender import send_event_to_meta
+from conftest import EVENT_DATA
+
+CUSTOM_DATA = {key: EVENT_DATA[key] for key in ('value', 'currency', 'content_ids', 'contents', 'order_id')}
+
+def bench_build_event_payload(benchmark, app):
+    with app.app_context():
+        benchmark(build_event_payload, 'Purchase', dict(EVENT_DATA), CUSTOM_DATA, 'https://shop.example.com')
+
+def bench_send_event_to_meta(benchmark, app, stub_graph, log_file):
+    # HTTP katmanı stub; ölçülen: route çözümü, payload, hash, loglar ve sonuç
+    with app.app_context():
+        body, status_code = benchmark(send_event_to_meta, 'Purchase', dict(EVENT_DATA), CUSTOM_DATA)
+    assert status_code == 200
@@ -0,0 +1,47 @@
+import pytest
+from app.utils import hashing
+from app.services.event_builder import get_user_data
+from conftest import EVENT_DATA
+
+PII_FUNCTIONS = [
+    (hashing.hash_email, ' Customer@Example.com '),
+    (hashing.hash_phone, '+90 (555) 111-22-33'),
+    (hashing.hash_external_id, 'user-100045'),
+    (hashing.hash_name, 'Ada'),
+    (hashing.hash_city, 'Istanbul'),
+    (hashing.hash_state, 'Marmara'),
+    (hashing.hash_zipcode, '34000'),
+    (hashing.hash_country, 'TR'),
+    (hashing.hash_gender, 'f'),
+    (hashing.hash_birthday, '19901231'),
+]
+
+@pytest.fixture(params=[False, True], ids=['memo_off', 'memo_on'])
+def hash_memo(request):
+    hashing.configure_hash_memo(request.param)
+    yield request.param
+    hashing.configure_hash_memo(False)
+
+@pytest.mark.parametrize('function, value', PII_FUNCTIONS, ids=[function.__name__ for function, _ in PII_FUNCTIONS])
+def bench_pii_hash(benchmark, hash_memo, function, value):
+    benchmark(function, value)
+
+def bench_hash_user_data(benchmark):
+    benchmark(hashing.hash_user_data, 'customer@example.com', 'f' * 32)
+
+def bench_is_prehashed(benchmark):
+    benchmark(hashing.is_prehashed, 'a3f1' * 16)
+
+def bench_hash_user_fields(benchmark, hash_memo):
+    benchmark(hashing.hash_user_fields, EVENT_DATA)
+
+def bench_get_user_data(benchmark, hash_memo):
+    benchmark(get_user_data, EVENT_DATA)
+
+def bench_hash_password(benchmark):
+    # bcrypt kasıtlı olarak yavaş; birkaç tur yeterli
+    benchmark.pedantic(hashing.hash_password, args=('password123',), rounds=5, iterations=1)
+
+def bench_verify_password(benchmark):
+    hashed = hashing.hash_password('password123')
+    benchmark.pedantic(hashing.verify_password, args=('password123', hashed), rounds=5, iterations=1)
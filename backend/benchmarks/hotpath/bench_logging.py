@@ -0,0 +1,56 @@
+import logging
+import pytest
+from app.utils import logger as logger_module
+from app.utils.logger import GtmEventLogger, gtm_logger
+from app.routes.logs import parse_gtm_log_line
+from app.utils.log_reader import read_lines_reverse
+from conftest import EVENT_DATA, CONTAINER_ID
+
+PAYLOAD = {'event_name': 'Purchase', 'event_time': 1718000000, 'user_data': {'em': ['a3f1' * 16]}, 'custom_data': {'value': 149.9}}
+
+LOG_LINES = {
+    'received': f'2024-06-10 12:00:00,000 - INFO - GTM Event Received: Purchase | Container: {CONTAINER_ID} | Data: {{"value": 149.9, "currency": "TRY"}}',
+    'sent': f'2024-06-10 12:00:00,001 - INFO - Meta Request Sent: Purchase | Container: {CONTAINER_ID} | Pixel: 123456789 | Payload: {{"event_name": "Purchase"}}',
+    'success': f'2024-06-10 12:00:00,090 - INFO - Meta Response Success: Purchase | Container: {CONTAINER_ID} | Response: {{"events_received": 1, "fbtrace_id": "abc"}}',
+    'error': f'2024-06-10 12:00:00,090 - ERROR - Meta Response Error: Purchase | Container: {CONTAINER_ID} | Error: Facebook API error: 400 | Response: {{"error": "x"}}',
+    'complete': f'2024-06-10 12:00:00,091 - INFO - GTM Event Complete: Purchase | Container: {CONTAINER_ID} | Status: SUCCESS | Duration: 91ms',
+    'jsonl': f'{{"ts":"2024-06-10T12:00:00.000000Z","level":"INFO","type":"GTM_EVENT_RECEIVED","event":"Purchase","container":"{CONTAINER_ID}",'
+             f'"pixel":null,"status":"RECEIVED","duration_ms":null,"payload":{{"value":149.9,"currency":"TRY"}}}}',
+}
+
+def log_event_cycle():
+    GtmEventLogger.log_gtm_event_received('Purchase', CONTAINER_ID, EVENT_DATA, source_ip='203.0.113.7', user_agent='bench')
+    GtmEventLogger.log_meta_request_sent('Purchase', CONTAINER_ID, PAYLOAD, access_token='EAAB' + 'x' * 180, pixel_id='123456789')
+    GtmEventLogger.log_meta_response_received('Purchase', CONTAINER_ID, {'events_received': 1, 'fbtrace_id': 'abc'})
+    GtmEventLogger.log_gtm_event_complete('Purchase', CONTAINER_ID, 91)
+
+def bench_gtm_logger_event_cycle(benchmark, log_file):
+    benchmark(log_event_cycle)
+
+def bench_gtm_logger_event_cycle_jsonl(benchmark, log_file, monkeypatch):
+    monkeypatch.setattr(logger_module, 'GTM_LOG_JSONL', True)
+    gtm_logger.handlers[0].setFormatter(logging.Formatter('%(message)s'))
+    benchmark(log_event_cycle)
+
+@pytest.mark.parametrize('kind', list(LOG_LINES))
+def bench_parse_gtm_log_line(benchmark, kind):
+    entry = benchmark(parse_gtm_log_line, LOG_LINES[kind])
+    assert entry['container'] == CONTAINER_ID
+
+@pytest.fixture(scope='module')
+def large_log(tmp_path_factory):
+    """~20 MB GTM log; newest-first okumanın dosya boyutundan bağımsız olduğunu göstermek için"""
+    path = tmp_path_factory.mktemp('logs') / 'gtm_events.log'
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(200000):
+            f.write(LOG_LINES['received' if i % 2 else 'complete'] + '\n')
+    return path
+
+def bench_read_newest_100_entries(benchmark, large_log):
+    def read_newest():
+        entries = []
+        for _, line in read_lines_reverse(large_log):
+            entries.append(parse_gtm_log_line(line))
+            if len(entries) >= 100:
+                return entries
+    assert len(benchmark(read_newest)) == 100
@@ -0,0 +1,19 @@
+from flask_jwt_extended import create_access_token
+from app.models.gtm_verification import GtmVerification
+from app.routes.gtm_verification import get_verification_script
+from conftest import CONTAINER_ID
+
+def bench_user_script_templates(benchmark, app):
+    # 18 event şablonunu üreten /api/user/facebook-tokens/<id>/script
+    with app.app_context():
+        headers = {'Authorization': f"Bearer {create_access_token(identity=str(app.config['BENCH_USER_ID']))}"}
+    client = app.test_client()
+    url = f"/api/user/facebook-tokens/{app.config['BENCH_TOKEN_ID']}/script"
+
+    response = benchmark(client.get, url, headers=headers)
+    assert response.status_code == 200
+
+def bench_verification_script(benchmark, app):
+    with app.app_context():
+        verification = GtmVerification.query.filter_by(gtm_container_id=CONTAINER_ID).one()
+        benchmark(get_verification_script, verification)
@@ -0,0 +1,51 @@
+"""
+Compare two pytest-benchmark JSON files and fail on regressions.
+
+    python benchmarks/hotpath/compare.py BASELINE.json CURRENT.json --threshold 15
+
+A benchmark regresses when its median in CURRENT is more than
+``--threshold`` percent above BASELINE. Benchmarks present in only one file
+are listed but never fail the run. Exit status: 0 ok, 1 regression.
+"""
+import argparse
+import json
+import sys
+
+def load(path, stat):
+    with open(path) as f:
+        data = json.load(f)
+    return {bench['fullname']: bench['stats'][stat] for bench in data['benchmarks']}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=15.0, help='allowed slowdown in percent (default 15)')
+    parser.add_argument('--stat', default='median', choices=['min', 'median', 'mean'])
+    args = parser.parse_args()
+
+    baseline = load(args.baseline, args.stat)
+    current = load(args.current, args.stat)
+    regressions = []
+
+    width = max((len(name) for name in baseline.keys() | current.keys()), default=10)
+    print(f"{'benchmark':<{width}}  {'baseline us':>12}  {'current us':>12}  {'change':>8}")
+    for name in sorted(baseline.keys() | current.keys()):
+        if name not in baseline or name not in current:
+            state = 'new' if name not in baseline else 'removed'
+            print(f"{name:<{width}}  {'-':>12}  {'-':>12}  {state:>8}")
+            continue
+        change = (current[name] - baseline[name]) / baseline[name] * 100
+        marker = '  REGRESSION' if change > args.threshold else ''
+        print(f"{name:<{width}}  {baseline[name] * 1e6:>12.2f}  {current[name] * 1e6:>12.2f}  {change:>+7.1f}%{marker}")
+        if change > args.threshold:
+            regressions.append(name)
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold}% ({args.stat})")
+        return 1
+    print(f"\nNo regressions above {args.threshold}% ({args.stat})")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Microbenchmarks for the ingest hot path (pytest-benchmark).
+
+Run from backend/:
+
+    python -m pytest benchmarks/hotpath --benchmark-json=benchmarks/hotpath/baseline.json
+    # ... change code ...
+    python -m pytest benchmarks/hotpath --benchmark-json=/tmp/current.json
+    python benchmarks/hotpath/compare.py benchmarks/hotpath/baseline.json /tmp/current.json --threshold 15
+
+compare.py exits non-zero when any benchmark's median got slower than the
+threshold (percent). The committed baseline.json was recorded on one
+development machine; numbers from different hosts are not comparable, so
+re-record it locally (first command) before comparing a change.
+"""
+import json
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+# Aynı uç tekrar tekrar çağrılır; IP başı limit ölçümü bozmasın
+os.environ.setdefault('RATELIMIT_ENABLED', 'false')
+
+from app import create_app
+from app.extensions import db
+from app.models.user import User
+from app.models.facebook_token import FacebookToken
+from app.models.gtm_verification import GtmVerification
+from app.services import graph_transport, event_dedup
+from app.utils import logger as log_module
+from app.utils.log_stats import LogStats
+
+CONTAINER_ID = 'GTM-BENCH01'
+
+EVENT_DATA = {
+    'gtm_container_id': CONTAINER_ID,
+    'email': 'Customer@Example.com ',
+    'phone': '+90 (555) 111-22-33',
+    'fn': 'Ada',
+    'ln': 'Lovelace',
+    'ct': 'Istanbul',
+    'zp': '34000',
+    'country': 'TR',
+    'external_id': 'user-100045',
+    'client_ip': '203.0.113.7',
+    'user_agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15',
+    'fbp': 'fb.1.1718000000000.1234567890',
+    'fbc': 'fb.1.1718000000000.AbCdEfGhIjKlMnOp',
+    'event_time': 1718000000,
+    'value': 149.9,
+    'currency': 'TRY',
+    'content_ids': ['sku-1', 'sku-2'],
+    'contents': [{'id': 'sku-1', 'quantity': 1}, {'id': 'sku-2', 'quantity': 2}],
+    'order_id': 'ORDER-100045'
+}
+
+class StubGraphResponse:
+    status_code = 200
+    text = '{"events_received": 1, "fbtrace_id": "bench"}'
+
+    def json(self):
+        return json.loads(self.text)
+
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    # Ham ölçümler dosyayı on MB'larca büyütür; compare.py yalnızca özet istatistikleri okur
+    for bench in output_json['benchmarks']:
+        bench['stats'].pop('data', None)
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        user = User(email='bench@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        token = FacebookToken(
+            user_id=user.id,
+            dataset_id='123456789',
+            access_token='EAAB' + 'x' * 180,
+            token_name='Token_bench',
+            gtm_container_id=CONTAINER_ID,
+            is_active=True
+        )
+        verification = GtmVerification(
+            user_id=user.id,
+            gtm_container_id=CONTAINER_ID,
+            domain_name='shop.example.com',
+            verification_token='CAPIFY_VERIFY_bench',
+            is_verified=True
+        )
+        db.session.add_all([token, verification])
+        db.session.commit()
+        app.config['BENCH_USER_ID'] = user.id
+        app.config['BENCH_TOKEN_ID'] = token.id
+        yield app
+
+@pytest.fixture
+def stub_graph(monkeypatch):
+    """HTTP layer replaced by a canned 200 response"""
+    monkeypatch.setattr(graph_transport, 'post', lambda url, **kwargs: StubGraphResponse())
+    # Aynı event tekrar tekrar gönderilecek; tekrar filtresi kapalı
+    monkeypatch.setattr(event_dedup, 'dedup_store', None)
+
+@pytest.fixture(autouse=True)
+def gtm_log_dir(tmp_path, monkeypatch):
+    """GTM event log ve sayaçlar geçici dizine yazılır; backend/logs/ büyümesin"""
+    handler = log_module.make_gtm_file_handler(tmp_path / 'gtm_events.log', async_write=False)
+    stats = LogStats(tmp_path / 'gtm_events.stats.json', flush_interval=60)
+    monkeypatch.setattr(log_module.gtm_logger, 'handlers', [handler])
+    monkeypatch.setattr(log_module, 'gtm_log_stats', stats)
+    yield tmp_path
+    handler.close()
+    stats.stop()
+
+@pytest.fixture(params=['sync', 'async'])
+def log_file(request, tmp_path, gtm_log_dir):
+    """GTM log'u senkron ya da arka plan yazıcılı handler ile geçici dosyaya yaz"""
+    handler = log_module.make_gtm_file_handler(tmp_path / 'gtm_events.log', async_write=request.param == 'async')
+    log_module.gtm_logger.handlers = [handler]
+    yield tmp_path / 'gtm_events.log'
+    handler.close()
@@ -0,0 +1,200 @@
+"""
+Load generator for the ingest endpoints. Drives /api/facebook/events/<slug>
+(or /api/facebook/events/batch with --batch-size) with a storefront-like
+event mix and reports sustained events/s and latency percentiles.
+
+Typical run against the Graph API stub:
+
+    python benchmarks/graph_stub.py --port 8088 &
+    FACEBOOK_GRAPH_URL=http://127.0.0.1:8088 EVENT_INGEST_MODE=sync RATELIMIT_ENABLED=false \
+        gunicorn wsgi:app --workers 4 --bind 127.0.0.1:5050 &
+    python benchmarks/loadgen.py --url http://127.0.0.1:5050 \
+        --container GTM-XXXXXXX --concurrency 64 --duration 60 \
+        --label "sync, 4 sync workers" --output results.jsonl
+
+Run it once per worker configuration (gunicorn workers/threads,
+EVENT_INGEST_MODE, PAGE_VIEW_BATCHING, dispatcher) with a different
+--label; each run appends one JSON line to --output for comparison.
+The containers must have an active token in the target database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.event_registry import get_event_spec
+
+# slug -> ağırlık; tipik bir mağaza trafiği
+EVENT_MIX = {
+    'page-view': 55,
+    'view-content': 20,
+    'add-to-cart': 8,
+    'search': 6,
+    'initiate-checkout': 4,
+    'add-payment-info': 2,
+    'purchase': 2,
+    'lead': 1,
+    'complete-registration': 1,
+    'contact': 1,
+}
+
+USER_AGENTS = [
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36',
+    'Mozilla/5.0 (Linux; Android 14) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Mobile Safari/537.36',
+]
+
+def make_event(container, slug, rng, duplicate_of=None):
+    if duplicate_of is not None:
+        return dict(duplicate_of)
+    shopper = rng.randrange(50000)
+    event = {
+        'gtm_container_id': container,
+        'event_id': str(uuid.uuid4()),
+        'event_time': int(time.time()),
+        'client_ip': f'203.0.{shopper % 256}.{shopper // 256 % 256}',
+        'user_agent': rng.choice(USER_AGENTS),
+        'fbp': f'fb.1.{int(time.time() * 1000)}.{shopper}',
+    }
+    # Giriş yapmış alışverişçilerin bir kısmı PII gönderir
+    if shopper % 3 == 0:
+        event['email'] = f'shopper{shopper}@example.com'
+        event['phone'] = f'+90555{shopper:07d}'
+        event['external_id'] = f'user-{shopper}'
+    if slug in ('view-content', 'add-to-cart', 'initiate-checkout', 'add-payment-info', 'purchase'):
+        items = [{'id': f'sku-{rng.randrange(5000)}', 'quantity': rng.randint(1, 3), 'item_price': round(rng.uniform(5, 250), 2)}
+                 for _ in range(rng.randint(1, 4))]
+        event.update({
+            'value': round(sum(item['quantity'] * item['item_price'] for item in items), 2),
+            'currency': 'TRY',
+            'content_ids': [item['id'] for item in items],
+            'contents': items,
+        })
+    if slug == 'purchase':
+        event['order_id'] = f'order-{uuid.uuid4().hex[:10]}'
+    if slug == 'search':
+        event['search_string'] = rng.choice(['sneakers', 'rain jacket', 'usb-c cable', 'coffee beans'])
+    if slug == 'lead':
+        event.update({'form_id': 'newsletter', 'lead_type': 'footer'})
+    return event
+
+class Recorder:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.events = 0
+        self.errors = 0
+
+    def record(self, status, latency, events):
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if 200 <= status < 300:
+            self.events += events
+        else:
+            self.errors += 1
+
+def percentile(sorted_values, share):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(share * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+async def worker(session, args, recorder, deadline, rng):
+    slugs = list(EVENT_MIX)
+    weights = list(EVENT_MIX.values())
+    last_event = None
+    while time.monotonic() < deadline:
+        batch = []
+        for _ in range(args.batch_size or 1):
+            slug = rng.choices(slugs, weights)[0]
+            duplicate = last_event if last_event and rng.random() < args.duplicate_rate else None
+            event = make_event(rng.choice(args.container), slug, rng, duplicate)
+            last_event = event
+            batch.append((slug, event))
+
+        if args.batch_size:
+            url = f"{args.url}/api/facebook/events/batch"
+            body = {'events': [{'event_name': get_event_spec(slug).event_name, **event} for slug, event in batch]}
+        else:
+            slug, body = batch[0]
+            url = f"{args.url}/api/facebook/events/{slug}"
+
+        started = time.perf_counter()
+        try:
+            async with session.post(url, json=body) as response:
+                await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            status = 0
+        recorder.record(status, time.perf_counter() - started, len(batch))
+
+        if args.rate:
+            # Açık döngü yerine worker başına hedef hız
+            await asyncio.sleep(max(0.0, args.concurrency / args.rate - (time.perf_counter() - started)))
+
+async def run(args):
+    recorder = Recorder()
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        if args.warmup:
+            warmup = Recorder()
+            deadline = time.monotonic() + args.warmup
+            await asyncio.gather(*[worker(session, args, warmup, deadline, random.Random(i)) for i in range(args.concurrency)])
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            worker(session, args, recorder, deadline, random.Random(args.seed + i)) for i in range(args.concurrency)
+        ])
+        elapsed = time.monotonic() - started
+    return recorder, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5050')
+    parser.add_argument('--container', action='append', required=True, help='GTM container id (repeatable)')
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent connections')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds before the run')
+    parser.add_argument('--rate', type=float, help='target requests/s across all connections (default: as fast as possible)')
+    parser.add_argument('--batch-size', type=int, default=0, help='send N events per /events/batch request')
+    parser.add_argument('--duplicate-rate', type=float, default=0.0, help='share of events re-sent with a previous event_id')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--label', default='', help='worker configuration being measured')
+    parser.add_argument('--output', help='append the result as one JSON line to this file')
+    args = parser.parse_args()
+    args.url = args.url.rstrip('/')
+
+    recorder, elapsed = asyncio.run(run(args))
+    latencies = sorted(recorder.latencies)
+    result = {
+        'label': args.label,
+        'concurrency': args.concurrency,
+        'batch_size': args.batch_size or 1,
+        'duration_s': round(elapsed, 2),
+        'requests': len(latencies),
+        'events_per_s': round(recorder.events / elapsed, 1) if elapsed else 0,
+        'error_rate': round(recorder.errors / len(latencies), 4) if latencies else 0,
+        'latency_ms': {name: round(percentile(latencies, share) * 1000, 1)
+                       for name, share in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))},
+        'statuses': {str(status): count for status, count in sorted(recorder.statuses.items())},
+    }
+
+    print(f"{args.label or 'run'}: {result['events_per_s']} events/s over {result['duration_s']}s, "
+          f"{result['requests']} requests, error rate {result['error_rate']:.2%}")
+    print('latency ms  ' + '  '.join(f'{name} {value}' for name, value in result['latency_ms'].items()))
+    print('statuses    ' + '  '.join(f'{status}: {count}' for status, count in result['statuses'].items()))
+    if args.output:
+        with open(args.output, 'a') as output:
+            output.write(json.dumps(result) + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,6 @@
 import os
+import shutil
+import tempfile
 import multiprocessing
 
 # Server socket
@@ -10,6 +12,7 @@ workers = multiprocessing.cpu_count() * 2 + 1
 worker_class = 'sync'
 worker_connections = 1000
 timeout = 30
+graceful_timeout = 30
 keepalive = 2
 
 # Restart workers after this many requests, to help prevent memory leaks
@@ -44,20 +47,47 @@ limit_request_field_size = 8190
 # Preload app for better performance
 preload_app = True
 
+# Prometheus multiprocess modu: /metrics tüm worker'ların toplamını döner.
+# prometheus_client import edilmeden (preload) önce ayarlanmalı; eski worker dosyaları her başlangıçta silinir
+prometheus_multiproc_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'capify-prometheus')
+)
+shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+
 def when_ready(server):
     server.log.info("Server is ready. Spawning workers")
 
 def worker_int(worker):
     worker.log.info("worker received INT or QUIT signal")
+    from app.services.event_batcher import page_view_batcher
+    page_view_batcher.stop(timeout=graceful_timeout)
 
 def pre_fork(server, worker):
     server.log.info("Worker spawned (pid: %s)", worker.pid)
 
 def post_fork(server, worker):
     server.log.info("Worker spawned (pid: %s)", worker.pid)
+    # Batcher thread'i master'da değil, her worker'da başlatılmalı
+    from app.services.event_batcher import page_view_batcher
+    app = server.app.wsgi()
+    if app.config.get('PAGE_VIEW_BATCHING'):
+        page_view_batcher.start(app)
+    from app.utils.monitoring import gauge_refresher
+    gauge_refresher.start()
 
 def post_worker_init(worker):
     worker.log.info("Worker initialized (pid: %s)", worker.pid)
 
+def worker_exit(server, worker):
+    # SIGTERM ve max_requests ile yeniden başlatmada kuyruktaki event'leri gönder
+    from app.services.event_batcher import page_view_batcher
+    page_view_batcher.stop(timeout=graceful_timeout)
+
+def child_exit(server, worker):
+    # Ölen worker'ın live* gauge'ları toplamdan çıkarılır
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
 def worker_abort(worker):
     worker.log.info("Worker aborted (pid: %s)", worker.pid) 
\ No newline at end of file
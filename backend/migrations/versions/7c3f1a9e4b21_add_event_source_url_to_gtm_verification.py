@@ -0,0 +1,52 @@
+"""add_event_source_url_to_gtm_verification
+
+Revision ID: 7c3f1a9e4b21
+Revises: d5bec2d7e680
+Create Date: 2026-10-18 10:12:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3f1a9e4b21'
+down_revision = 'd5bec2d7e680'
+branch_labels = None
+depends_on = None
+
+
+def build_event_source_url(domain_name):
+    # GtmVerification.build_event_source_url ile aynı kural; migration modele bağımlı olmasın
+    domain = domain_name
+    if not domain.startswith('http'):
+        domain = 'https://' + domain
+    if 'www.' not in domain:
+        domain = domain.replace('https://', 'https://www.')
+    return domain
+
+
+def upgrade():
+    with op.batch_alter_table('gtm_verification', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('event_source_url', sa.String(length=512), nullable=True))
+
+    # Mevcut kayıtları doldur
+    gtm_verification = sa.table(
+        'gtm_verification',
+        sa.column('id', sa.Integer),
+        sa.column('domain_name', sa.String),
+        sa.column('event_source_url', sa.String)
+    )
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(gtm_verification.c.id, gtm_verification.c.domain_name)).fetchall()
+    for row in rows:
+        connection.execute(
+            gtm_verification.update()
+            .where(gtm_verification.c.id == row.id)
+            .values(event_source_url=build_event_source_url(row.domain_name))
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('gtm_verification', schema=None) as batch_op:
+        batch_op.drop_column('event_source_url')
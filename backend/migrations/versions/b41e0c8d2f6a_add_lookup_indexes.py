@@ -0,0 +1,45 @@
+"""add_lookup_indexes
+
+Revision ID: b41e0c8d2f6a
+Revises: 7c3f1a9e4b21
+Create Date: 2026-10-18 11:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41e0c8d2f6a'
+down_revision = '7c3f1a9e4b21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Unique index mevcut tekrarlı kayıtlarda başarısız olur; önce açık bir hata ver
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT user_id, gtm_container_id, COUNT(*) FROM facebook_token '
+        'GROUP BY user_id, gtm_container_id HAVING COUNT(*) > 1'
+    )).fetchall()
+    if duplicates:
+        raise RuntimeError(
+            'facebook_token has more than one token per (user_id, gtm_container_id); '
+            f'remove the duplicates before upgrading: {[tuple(row) for row in duplicates]}'
+        )
+
+    op.create_index('uq_facebook_token_user_container', 'facebook_token', ['user_id', 'gtm_container_id'], unique=True)
+    op.create_index('ix_facebook_token_container_active', 'facebook_token', ['gtm_container_id', 'is_active'])
+    op.create_index('ix_gtm_verification_user_domain', 'gtm_verification', ['user_id', 'domain_name'])
+    op.create_index(
+        'ix_gtm_verification_verified_container', 'gtm_verification', ['gtm_container_id'],
+        postgresql_where=sa.text('is_verified'),
+        sqlite_where=sa.text('is_verified = 1')
+    )
+
+
+def downgrade():
+    op.drop_index('ix_gtm_verification_verified_container', table_name='gtm_verification')
+    op.drop_index('ix_gtm_verification_user_domain', table_name='gtm_verification')
+    op.drop_index('ix_facebook_token_container_active', table_name='facebook_token')
+    op.drop_index('uq_facebook_token_user_container', table_name='facebook_token')
@@ -0,0 +1,40 @@
+"""add_dead_letter_event_table
+
+Revision ID: e8a2d4c61f07
+Revises: b41e0c8d2f6a
+Create Date: 2026-10-18 13:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a2d4c61f07'
+down_revision = 'b41e0c8d2f6a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('dead_letter_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('gtm_container_id', sa.String(length=255), nullable=True),
+    sa.Column('event_name', sa.String(length=100), nullable=False),
+    sa.Column('event_id', sa.String(length=255), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('retryable', sa.Boolean(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_attempt_at', sa.DateTime(), nullable=True),
+    sa.Column('replayed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_dead_letter_event_container_status', 'dead_letter_event', ['gtm_container_id', 'status'])
+
+
+def downgrade():
+    op.drop_index('ix_dead_letter_event_container_status', table_name='dead_letter_event')
+    op.drop_table('dead_letter_event')
@@ -0,0 +1,30 @@
+"""add_circuit_state_to_facebook_token
+
+Revision ID: f3c9b7e15a48
+Revises: e8a2d4c61f07
+Create Date: 2026-10-18 14:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c9b7e15a48'
+down_revision = 'e8a2d4c61f07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('facebook_token', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('circuit_state', sa.String(length=20), nullable=True, server_default='closed'))
+        batch_op.add_column(sa.Column('circuit_opened_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('circuit_last_error', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('facebook_token', schema=None) as batch_op:
+        batch_op.drop_column('circuit_last_error')
+        batch_op.drop_column('circuit_opened_at')
+        batch_op.drop_column('circuit_state')
@@ -0,0 +1,136 @@
+import json
+import pytest
+from app import create_app
+from app.extensions import db
+from app.models.user import User
+from app.models.facebook_token import FacebookToken
+from app.models.gtm_verification import GtmVerification
+from app.routes import logs
+from app.services import graph_transport
+from app.utils import logger as log_module
+from app.utils.log_stats import LogStats
+from app.services.token_cache import token_cache
+from app.services.source_url_cache import source_url_cache
+from app.services.circuit_breaker import graph_circuit_breaker
+from app.services.event_dedup import dedup_store
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Önbellekler modül seviyesinde; testler birbirinin verisini görmesin
+    token_cache.clear()
+    source_url_cache.clear()
+    graph_circuit_breaker.reset()
+    if dedup_store is not None:
+        dedup_store.clear()
+    yield
+    token_cache.clear()
+    source_url_cache.clear()
+    graph_circuit_breaker.reset()
+    if dedup_store is not None:
+        dedup_store.clear()
+
+@pytest.fixture(autouse=True)
+def gtm_log_dir(tmp_path, monkeypatch):
+    """GTM event log ve sayaçlar geçici dizine yazılır; backend/logs/ test verisiyle dolmasın"""
+    log_dir = tmp_path / 'logs'
+    log_dir.mkdir()
+    log_path = log_dir / 'gtm_events.log'
+    handler = log_module.make_gtm_file_handler(log_path, async_write=False)
+    stats = LogStats(log_dir / 'gtm_events.stats.json', flush_interval=60)
+    monkeypatch.setattr(log_module.gtm_logger, 'handlers', [handler])
+    monkeypatch.setattr(log_module, 'gtm_log_stats', stats)
+    monkeypatch.setattr(logs, 'gtm_log_stats', stats)
+    monkeypatch.setattr(logs, 'gtm_log_path', lambda: str(log_path))
+    yield log_dir
+    handler.close()
+    stats.stop()
+
+@pytest.fixture
+def seeded_app():
+    """
+    ``seeded_app(container, dataset)`` -> testing app with the tables created
+    and one user (password123) owning an active FacebookToken for
+    ``container`` (access token ``token-<dataset>`` unless given). ``domain``
+    adds a verified GtmVerification; ``dataset=None`` seeds only that. Later
+    calls add containers to the same app. Ids are kept in ``app.config``
+    (TEST_USER_ID, TEST_TOKEN_ID, TEST_VERIFICATION_ID).
+    """
+    contexts = []
+
+    def seed(container, dataset=None, access_token=None, domain=None):
+        if not contexts:
+            app = create_app('testing')
+            contexts.append(app.app_context())
+            contexts[0].push()
+            db.create_all()
+            user = User(email='test@example.com')
+            user.set_password('password123')
+            db.session.add(user)
+            db.session.commit()
+            app.config['TEST_USER_ID'] = user.id
+        app = contexts[0].app
+        user_id = app.config['TEST_USER_ID']
+        if dataset:
+            token = FacebookToken(
+                user_id=user_id,
+                dataset_id=dataset,
+                access_token=access_token or f'token-{dataset}',
+                token_name=f'Token_{dataset}',
+                gtm_container_id=container,
+                is_active=True
+            )
+            db.session.add(token)
+            db.session.commit()
+            app.config['TEST_TOKEN_ID'] = token.id
+        if domain:
+            verification = GtmVerification(
+                user_id=user_id,
+                gtm_container_id=container,
+                domain_name=domain,
+                verification_token=f'CAPIFY_VERIFY_{container}',
+                is_verified=True
+            )
+            verification.refresh_event_source_url()
+            db.session.add(verification)
+            db.session.commit()
+            app.config['TEST_VERIFICATION_ID'] = verification.id
+        return app
+
+    yield seed
+    if contexts:
+        db.drop_all()
+        contexts[0].pop()
+
+class GraphResponse:
+    """Canned Graph API response for ``graph_stub``"""
+
+    def __init__(self, status_code=200, body=None, text=None):
+        self.status_code = status_code
+        self.text = text if text is not None else json.dumps(body)
+
+    def json(self):
+        return json.loads(self.text)
+
+class GraphStub:
+    """
+    ``graph_transport.post`` stand-in. Each call is recorded as
+    ``(url, body)``; queued ``responses`` are used in order and the last one
+    repeats. With nothing queued every request succeeds.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.responses = []
+
+    def post(self, url, data=None, **kwargs):
+        body = json.loads(data) if data else None
+        self.calls.append((url, body))
+        if self.responses:
+            return self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        return GraphResponse(200, {'events_received': len(body['data']) if body else 1, 'fbtrace_id': 'trace'})
+
+@pytest.fixture
+def graph_stub(monkeypatch):
+    stub = GraphStub()
+    monkeypatch.setattr(graph_transport, 'post', stub.post)
+    return stub
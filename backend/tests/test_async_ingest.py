@@ -0,0 +1,68 @@
+import pytest
+from app import create_app
+from app import tasks
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    app.config['EVENT_INGEST_MODE'] = 'async'
+    yield app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    calls = []
+
+    def fake_apply_async(args=None, task_id=None, **kwargs):
+        calls.append({'args': args, 'task_id': task_id})
+
+    monkeypatch.setattr(tasks.send_facebook_event, 'apply_async', fake_apply_async)
+    return calls
+
+def test_event_is_accepted_and_enqueued(client, enqueued):
+    res = client.post('/api/facebook/events/purchase', json={
+        'gtm_container_id': 'GTM-ASYNC1',
+        'value': 10,
+        'currency': 'TRY'
+    }, headers={'User-Agent': 'pytest-agent'})
+
+    assert res.status_code == 202
+    body = res.get_json()
+    assert body['status'] == 'queued'
+    assert len(enqueued) == 1
+    event_name, data, custom_data = enqueued[0]['args']
+    assert event_name == 'Purchase'
+    assert data['event_id'] == body['event_id'] == enqueued[0]['task_id']
+    assert data['user_agent'] == 'pytest-agent'
+    assert custom_data['value'] == 10
+
+def test_client_event_id_is_kept(client, enqueued):
+    res = client.post('/api/facebook/events/lead', json={
+        'gtm_container_id': 'GTM-ASYNC1',
+        'event_id': 'lead-42'
+    })
+
+    assert res.status_code == 202
+    assert res.get_json()['event_id'] == 'lead-42'
+
+def test_missing_container_is_rejected_before_enqueue(client, enqueued):
+    res = client.post('/api/facebook/events/lead', json={'form_id': 'f1'})
+
+    assert res.status_code == 400
+    assert enqueued == []
+
+def test_queue_mode_pushes_to_dispatcher_queue(app, client, enqueued, monkeypatch):
+    from app.routes import facebook
+    pushed = []
+    monkeypatch.setattr(facebook, 'push_events', pushed.extend)
+    app.config['EVENT_INGEST_MODE'] = 'queue'
+
+    res = client.post('/api/facebook/events/purchase', json={'gtm_container_id': 'GTM-ASYNC1', 'value': 3})
+
+    assert res.status_code == 202
+    assert enqueued == []
+    assert pushed[0]['event_name'] == 'Purchase'
+    assert pushed[0]['data']['event_id'] == res.get_json()['event_id']
@@ -0,0 +1,72 @@
+import logging
+import threading
+import pytest
+from prometheus_client import REGISTRY
+from app.utils.async_log import AsyncFileHandler
+
+def make_logger(handler):
+    log = logging.getLogger(f'test_async_log.{id(handler)}')
+    log.propagate = False
+    log.handlers = [handler]
+    log.setLevel(logging.INFO)
+    return log
+
+def sample(name, handler):
+    return REGISTRY.get_sample_value(name, {'handler': handler}) or 0
+
+def test_lines_reach_the_file_in_batches(tmp_path, monkeypatch):
+    path = tmp_path / 'events.log'
+    handler = AsyncFileHandler(path, name='test_batches', fsync_interval=0)
+    log = make_logger(handler)
+
+    # Yazıcı başlamadan kuyruğu doldur; ilk write() hepsini birden almalı
+    start = handler._start
+    monkeypatch.setattr(handler, '_start', lambda: None)
+    for i in range(10):
+        log.info(f'line {i}')
+    monkeypatch.setattr(handler, '_start', start)
+    writes_before = sample('log_write_batch_lines_count', 'test_batches')
+    log.info('line 10')
+    handler.flush()
+    handler.close()
+
+    assert path.read_text().splitlines() == [f'line {i}' for i in range(11)]
+    assert sample('log_write_batch_lines_count', 'test_batches') - writes_before <= 2
+
+@pytest.mark.parametrize('policy', ['drop', 'block'])
+def test_full_queue_drops_and_counts(tmp_path, monkeypatch, policy):
+    name = f'test_full_{policy}'
+    handler = AsyncFileHandler(tmp_path / 'events.log', name=name, max_queue_size=2, policy=policy, block_timeout=0.01)
+    monkeypatch.setattr(handler, '_start', lambda: None)
+    log = make_logger(handler)
+    before = sample('log_records_dropped_total', name)
+
+    for i in range(5):
+        log.info(f'line {i}')
+
+    assert handler.qsize() == 2
+    assert sample('log_records_dropped_total', name) - before == 3
+    assert sample('log_queue_depth', name) == 2
+    handler.close()
+
+def test_unknown_policy_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        AsyncFileHandler(tmp_path / 'events.log', policy='spill')
+
+def test_records_are_formatted_on_the_writer_thread(tmp_path):
+    path = tmp_path / 'events.log'
+    handler = AsyncFileHandler(path, name='test_format_thread', fsync_interval=0)
+    log = make_logger(handler)
+    threads = []
+
+    class Payload:
+        def __str__(self):
+            threads.append(threading.current_thread().name)
+            return 'payload'
+
+    log.info('data: %s', Payload())
+    handler.flush()
+    handler.close()
+
+    assert path.read_text() == 'data: payload\n'
+    assert threads == ['test_format_thread-log-writer']
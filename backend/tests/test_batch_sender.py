@@ -0,0 +1,32 @@
+import pytest
+from app.services.batch_sender import send_event_batch
+
+@pytest.fixture
+def app(seeded_app):
+    return seeded_app('GTM-BATCH1', '111', domain='shop.example.com')
+
+def page_view(container_id, index):
+    return {
+        'event_name': 'PageView',
+        'data': {'gtm_container_id': container_id, 'client_ip': '10.0.0.1', 'user_agent': 'pytest', 'external_id': str(index)},
+        'custom_data': {}
+    }
+
+def test_events_are_posted_in_chunks(app, graph_stub):
+    events = [page_view('GTM-BATCH1', i) for i in range(2500)]
+
+    results = send_event_batch(events)
+
+    assert [len(body['data']) for _, body in graph_stub.calls] == [1000, 1000, 500]
+    assert all(url.endswith('/111/events') for url, _ in graph_stub.calls)
+    assert all(status == 200 for _, status in results)
+    assert results[1500][0]['meta_response']['batch_index'] == 500
+    assert graph_stub.calls[0][1]['data'][0]['event_source_url'] == 'https://www.shop.example.com'
+
+def test_unknown_container_does_not_block_batch(app, graph_stub):
+    events = [page_view('GTM-BATCH1', 0), page_view('GTM-NOPE01', 1), page_view('', 2)]
+
+    results = send_event_batch(events)
+
+    assert len(graph_stub.calls) == 1
+    assert [status for _, status in results] == [200, 404, 400]
@@ -0,0 +1,111 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.models.facebook_token import FacebookToken
+from app.models.dead_letter_event import DeadLetterEvent
+from app.services import circuit_breaker
+from app.services.circuit_breaker import graph_circuit_breaker, OPEN, HALF_OPEN, CLOSED
+from app.services.facebook_event_sender import send_event_to_meta
+from app.routes.facebook import dispatch_event
+from conftest import GraphResponse
+
+AUTH_ERROR = GraphResponse(400, {'error': {'code': 190, 'message': 'Error validating access token'}})
+TRANSIENT_ERROR = GraphResponse(500, {'error': {'code': 2, 'message': 'Service temporarily unavailable'}})
+OK = GraphResponse(200, {'events_received': 1})
+
+@pytest.fixture
+def app(seeded_app):
+    return seeded_app('GTM-CIRC01', '777', access_token='token-circuit')
+
+def send():
+    return send_event_to_meta('Lead', {'gtm_container_id': 'GTM-CIRC01'}, {})
+
+def test_auth_failures_open_the_circuit(app, graph_stub):
+    graph_stub.responses.append(AUTH_ERROR)
+    threshold = app.config['CIRCUIT_FAILURE_THRESHOLD']
+
+    for _ in range(threshold):
+        assert send()[1] == 500
+    body, status_code = send()
+
+    assert len(graph_stub.calls) == threshold
+    assert (status_code, body['held']) == (503, True)
+    assert graph_circuit_breaker.state('777', 'token-circuit') == OPEN
+    token = FacebookToken.query.one()
+    assert token.circuit_state == OPEN
+    assert 'Error validating access token' in token.circuit_last_error
+
+def test_transient_failures_do_not_open_the_circuit(app, graph_stub):
+    graph_stub.responses.append(TRANSIENT_ERROR)
+
+    for _ in range(app.config['CIRCUIT_FAILURE_THRESHOLD'] + 1):
+        assert send()[1] == 500
+
+    assert graph_circuit_breaker.state('777', 'token-circuit') == CLOSED
+
+def test_held_events_are_dead_lettered_for_replay(app, graph_stub):
+    graph_stub.responses.append(AUTH_ERROR)
+    for _ in range(app.config['CIRCUIT_FAILURE_THRESHOLD']):
+        send()
+    DeadLetterEvent.query.delete()
+
+    body, status_code = dispatch_event('Purchase', {'gtm_container_id': 'GTM-CIRC01', 'event_id': 'held-1'}, {'value': 5})
+
+    assert status_code == 503
+    row = DeadLetterEvent.query.one()
+    assert (row.event_id, row.status) == ('held-1', 'held')
+
+def test_half_open_probe_closes_the_circuit(app, graph_stub, monkeypatch):
+    graph_stub.responses.append(AUTH_ERROR)
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: now[0])
+    for _ in range(app.config['CIRCUIT_FAILURE_THRESHOLD']):
+        send()
+    assert send()[1] == 503
+
+    now[0] += app.config['CIRCUIT_RESET_TIMEOUT']
+    graph_stub.responses[:] = [OK]
+    assert graph_circuit_breaker.allow('777', 'token-circuit')
+    assert graph_circuit_breaker.state('777', 'token-circuit') == HALF_OPEN
+    # Deneme sürerken diğer istekler hâlâ bekletilir
+    assert not graph_circuit_breaker.allow('777', 'token-circuit')
+    graph_circuit_breaker.record_success('777', 'token-circuit')
+
+    assert send()[1] == 200
+    assert graph_circuit_breaker.state('777', 'token-circuit') == CLOSED
+    assert FacebookToken.query.one().circuit_state == CLOSED
+
+def test_failed_probe_reopens_the_circuit(app, graph_stub, monkeypatch):
+    graph_stub.responses.append(AUTH_ERROR)
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: now[0])
+    for _ in range(app.config['CIRCUIT_FAILURE_THRESHOLD']):
+        send()
+
+    now[0] += app.config['CIRCUIT_RESET_TIMEOUT']
+    assert send()[1] == 500
+
+    assert graph_circuit_breaker.state('777', 'token-circuit') == OPEN
+    assert send()[1] == 503
+
+def test_circuit_state_is_listed_with_tokens(app, graph_stub):
+    graph_stub.responses.append(AUTH_ERROR)
+    for _ in range(app.config['CIRCUIT_FAILURE_THRESHOLD']):
+        send()
+    headers = {'Authorization': f"Bearer {create_access_token(identity=str(app.config['TEST_USER_ID']))}"}
+
+    res = app.test_client().get('/api/user/facebook-tokens', headers=headers)
+
+    token = res.get_json()['tokens'][0]
+    assert token['circuit_state'] == OPEN
+    assert token['circuit_opened_at']
+
+def test_success_closes_a_row_left_open_by_another_worker(app, graph_stub):
+    graph_stub.responses.append(OK)
+    # Devreyi açan worker yeniden başladı; bu süreçte devre kaydı yok
+    FacebookToken.query.filter_by(dataset_id='777').update({'circuit_state': OPEN, 'circuit_last_error': 'revoked'})
+    db.session.commit()
+
+    assert send()[1] == 200
+    token = FacebookToken.query.filter_by(dataset_id='777').one()
+    assert (token.circuit_state, token.circuit_last_error) == (CLOSED, None)
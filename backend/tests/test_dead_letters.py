@@ -0,0 +1,171 @@
+import json
+import time
+from datetime import datetime, timedelta
+import pytest
+from flask_jwt_extended import create_access_token
+from app import tasks
+from app.extensions import db
+from app.models.dead_letter_event import DeadLetterEvent
+from prometheus_client import REGISTRY
+from app.services import facebook_event_sender, dead_letters
+from app.services.dead_letters import retry_delay, retry_scheduler
+from app.routes import facebook
+from app.services.graph_errors import classify_response
+from conftest import GraphResponse
+
+def graph_error(code):
+    return json.dumps({'error': {'code': code, 'message': f'error {code}'}})
+
+@pytest.mark.parametrize('status_code, text, retryable', [
+    (500, 'Internal Server Error', True),
+    (429, '', True),
+    (400, graph_error(613), True),
+    (400, graph_error(100), False),
+    (400, graph_error(190), False),
+])
+def test_graph_failures_are_classified(status_code, text, retryable):
+    assert classify_response(status_code, text).retryable is retryable
+
+def test_auth_failures_are_flagged():
+    assert classify_response(400, graph_error(190)).auth_failure
+    assert classify_response(403, graph_error(200)).auth_failure
+    assert not classify_response(503, 'unavailable').auth_failure
+
+def test_retry_delay_grows_with_jitter(app):
+    for attempt in (1, 3, 6):
+        window = min(app.config['DELIVERY_RETRY_MAX_DELAY'], app.config['DELIVERY_RETRY_BASE_DELAY'] * 2 ** (attempt - 1))
+        assert window / 2 <= retry_delay(attempt) <= window
+
+@pytest.fixture
+def app(seeded_app):
+    return seeded_app('GTM-DLQ001', '555')
+
+def failing_send(retryable, calls):
+    def send(event_name, data, custom_data=None):
+        calls.append(event_name)
+        return {'msg': 'Meta event error', 'error': 'boom', 'retryable': retryable}, 500
+    return send
+
+def test_transient_failures_are_retried_then_dead_lettered(app, monkeypatch):
+    calls = []
+    monkeypatch.setattr(tasks, 'send_event_to_meta', failing_send(True, calls))
+
+    tasks.send_facebook_event.apply(args=['Purchase', {'gtm_container_id': 'GTM-DLQ001', 'event_id': 'e1'}, {'value': 1}])
+
+    assert len(calls) == app.config['DELIVERY_MAX_ATTEMPTS']
+    row = DeadLetterEvent.query.one()
+    assert (row.event_id, row.attempts, row.retryable, row.status) == ('e1', len(calls), True, 'pending')
+
+def test_permanent_failures_are_not_retried(app, monkeypatch):
+    calls = []
+    monkeypatch.setattr(tasks, 'send_event_to_meta', failing_send(False, calls))
+
+    tasks.send_facebook_event.apply(args=['Lead', {'gtm_container_id': 'GTM-DLQ001'}, {}])
+
+    assert len(calls) == 1
+    assert DeadLetterEvent.query.one().attempts == 1
+
+def test_replay_api_redrives_pending_rows(app, monkeypatch):
+    monkeypatch.setattr(tasks, 'send_event_to_meta', failing_send(False, []))
+    tasks.send_facebook_event.apply(args=['Lead', {'gtm_container_id': 'GTM-DLQ001'}, {'form_id': 'f'}])
+    replayed = []
+    monkeypatch.setattr(facebook_event_sender, 'send_event_to_meta',
+                        lambda event_name, data, custom_data=None: replayed.append(custom_data) or ({'msg': 'Event sent to Meta'}, 200))
+    headers = {'Authorization': f"Bearer {create_access_token(identity=str(app.config['TEST_USER_ID']))}"}
+    client = app.test_client()
+
+    assert client.get('/api/facebook/dead-letters', headers=headers).get_json()['total'] == 1
+    res = client.post('/api/facebook/dead-letters/replay', json={'gtm_container_id': 'GTM-DLQ001'}, headers=headers)
+
+    assert res.get_json()['replayed'] == 1
+    assert replayed == [{'form_id': 'f'}]
+    row = DeadLetterEvent.query.one()
+    assert (row.status, row.attempts) == ('replayed', 2)
+
+def test_replay_stops_at_the_budget_and_reports_the_rest(app, monkeypatch):
+    monkeypatch.setattr(tasks, 'send_event_to_meta', failing_send(False, []))
+    for index in range(3):
+        tasks.send_facebook_event.apply(args=['Lead', {'gtm_container_id': 'GTM-DLQ001'}, {'index': index}])
+    monkeypatch.setattr(facebook_event_sender, 'send_event_to_meta',
+                        lambda event_name, data, custom_data=None: ({'msg': 'Event sent to Meta'}, 200))
+    app.config.update(DEAD_LETTER_REPLAY_RATE=10, DEAD_LETTER_REPLAY_BUDGET=0.15)
+    headers = {'Authorization': f"Bearer {create_access_token(identity=str(app.config['TEST_USER_ID']))}"}
+
+    summary = app.test_client().post('/api/facebook/dead-letters/replay', json={}, headers=headers).get_json()
+
+    # 0.1 sn aralıkla bütçeye yalnızca iki gönderim sığar
+    assert (summary['replayed'], summary['remaining']) == (2, 1)
+    assert DeadLetterEvent.query.filter_by(status='pending').count() == 1
+
+def test_purge_drops_replayed_and_expired_rows(app):
+    for status, age in (('replayed', 0), ('pending', 0), ('pending', 40), ('held', 40)):
+        dead_letters.record_dead_letter('Lead', {'gtm_container_id': 'GTM-DLQ001', 'em': 'user@example.com'}, {},
+                                        {'error': 'unavailable', 'retryable': True})
+        row = DeadLetterEvent.query.order_by(DeadLetterEvent.id.desc()).first()
+        row.status, row.created_at = status, datetime.utcnow() - timedelta(days=age)
+    db.session.commit()
+
+    assert dead_letters.purge_dead_letters(0) == {'replayed': 1, 'expired': 0}
+    result = app.test_cli_runner().invoke(args=['dead-letters', 'purge', '--older-than', '30'])
+    assert 'older than 30 days: 2' in result.output
+    assert [(row.status, row.created_at > datetime.utcnow() - timedelta(days=1)) for row in DeadLetterEvent.query] == \
+        [('pending', True)]
+
+    # Varsayılan: celery beat DEAD_LETTER_RETENTION_DAYS ile aynı temizliği yapar
+    assert app.celery.conf.beat_schedule['purge-dead-letters']['task'] == 'app.tasks.purge_dead_letter_events'
+    app.config['DEAD_LETTER_RETENTION_DAYS'] = 0.0
+    assert tasks.purge_dead_letter_events.apply().get() == {'replayed': 0, 'expired': 0}
+    assert DeadLetterEvent.query.count() == 1
+
+def test_async_mode_hands_the_replay_to_celery(app, monkeypatch):
+    monkeypatch.setattr(tasks, 'send_event_to_meta', failing_send(False, []))
+    tasks.send_facebook_event.apply(args=['Lead', {'gtm_container_id': 'GTM-DLQ001'}, {}])
+    queued = []
+    monkeypatch.setattr(tasks.replay_dead_letter_events, 'apply_async',
+                        lambda args, kwargs: queued.append(args[0]) or tasks.replay_dead_letter_events.apply(args, kwargs))
+    monkeypatch.setattr(facebook_event_sender, 'send_event_to_meta',
+                        lambda event_name, data, custom_data=None: ({'msg': 'Event sent to Meta'}, 200))
+    app.config['EVENT_INGEST_MODE'] = 'async'
+    headers = {'Authorization': f"Bearer {create_access_token(identity=str(app.config['TEST_USER_ID']))}"}
+
+    res = app.test_client().post('/api/facebook/dead-letters/replay', json={}, headers=headers)
+
+    assert res.status_code == 202 and res.get_json()['queued'] == 1
+    assert queued == [[DeadLetterEvent.query.one().id]]
+    assert DeadLetterEvent.query.one().status == 'replayed'
+
+def test_sync_mode_retries_transient_failures_in_the_background(app, monkeypatch):
+    results = [({'msg': 'Meta event error', 'error': 'boom', 'retryable': True}, 500)] * 2 + [({'msg': 'Event sent to Meta'}, 200)]
+    monkeypatch.setattr(facebook, 'send_event_to_meta', lambda *args: results.pop(0))
+    monkeypatch.setattr(facebook_event_sender, 'send_event_to_meta', lambda *args: results.pop(0))
+    monkeypatch.setattr(dead_letters, 'retry_delay', lambda attempt: 0.01)
+
+    with app.test_request_context():
+        assert facebook.dispatch_event('Lead', {'gtm_container_id': 'GTM-DLQ001'}, {})[1] == 500
+
+    deadline = time.time() + 5
+    while time.time() < deadline and DeadLetterEvent.query.one().status != 'replayed':
+        db.session.remove()
+        time.sleep(0.02)
+    retry_scheduler.stop()
+    row = DeadLetterEvent.query.one()
+    assert (row.status, row.attempts) == ('replayed', 3)
+
+def test_sync_batch_retries_a_transient_failure_instead_of_dead_lettering(app, graph_stub, monkeypatch):
+    graph_stub.responses[:] = [GraphResponse(503, text='Service Unavailable'), GraphResponse(200, {'events_received': 1})]
+    monkeypatch.setattr(dead_letters, 'retry_delay', lambda attempt: 0.01)
+    exhausted = REGISTRY.get_sample_value('dead_letters_total', {'reason': 'exhausted'}) or 0
+
+    events = [{'event_name': 'Lead', 'gtm_container_id': 'GTM-DLQ001', 'event_id': f'batch-{i}'} for i in range(2)]
+    body = app.test_client().post('/api/facebook/events/batch', json={'events': events}).get_json()
+    assert [result['status'] for result in body['results']] == [500, 500]
+
+    deadline = time.time() + 5
+    while time.time() < deadline and {row.status for row in DeadLetterEvent.query.all()} != {'replayed'}:
+        db.session.remove()
+        time.sleep(0.02)
+    retry_scheduler.stop()
+    assert sorted((row.event_id, row.status, row.attempts) for row in DeadLetterEvent.query.all()) == [
+        ('batch-0', 'replayed', 2), ('batch-1', 'replayed', 2)
+    ]
+    assert (REGISTRY.get_sample_value('dead_letters_total', {'reason': 'exhausted'}) or 0) == exhausted
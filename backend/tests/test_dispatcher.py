@@ -0,0 +1,133 @@
+import asyncio
+import time
+import pytest
+from aiohttp import web
+from app.dispatcher import Dispatcher
+from app.services import event_dedup
+
+class ListSource:
+    def __init__(self, events):
+        self.events = list(events)
+        self.requeued = []
+
+    async def get(self):
+        if self.events:
+            return self.events.pop(0)
+        await asyncio.sleep(0.01)
+        return None
+
+    async def requeue(self, event):
+        self.requeued.append(event)
+
+    async def close(self):
+        pass
+
+class StubGraph:
+    """Local Graph API stand-in that records concurrency per dataset"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.received = []
+        self.in_flight = {}
+        self.max_in_flight = {}
+        self.max_total = 0
+
+    async def handle(self, request):
+        dataset_id = request.match_info['dataset_id']
+        self.in_flight[dataset_id] = self.in_flight.get(dataset_id, 0) + 1
+        self.max_in_flight[dataset_id] = max(self.max_in_flight.get(dataset_id, 0), self.in_flight[dataset_id])
+        self.max_total = max(self.max_total, sum(self.in_flight.values()))
+        try:
+            body = await request.json()
+            await asyncio.sleep(self.delay)
+            self.received.append((dataset_id, body))
+            return web.json_response({'events_received': len(body['data']), 'fbtrace_id': 'stub'})
+        finally:
+            self.in_flight[dataset_id] -= 1
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/v18.0/{dataset_id}/events', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f'http://127.0.0.1:{port}'
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+@pytest.fixture
+def app(seeded_app):
+    seeded_app('GTM-DISP01', '501')
+    return seeded_app('GTM-DISP02', '502')
+
+def queued_event(container, index):
+    return {
+        'event_name': 'Purchase',
+        'data': {'gtm_container_id': container, 'event_id': f'{container}-{index}', 'client_ip': '10.0.0.1', 'user_agent': 'pytest'},
+        'custom_data': {'value': index, 'currency': 'TRY'}
+    }
+
+def run_dispatcher(app, source, stub, until, **kwargs):
+    async def scenario():
+        graph_url = await stub.start()
+        dispatcher = Dispatcher(app, source, graph_url=graph_url, **kwargs)
+        runner = asyncio.create_task(dispatcher.run())
+        try:
+            while not until():
+                await asyncio.sleep(0.01)
+            dispatcher.stop()
+            await asyncio.wait_for(runner, 10)
+        finally:
+            await stub.stop()
+
+    asyncio.run(scenario())
+
+def test_dispatcher_respects_concurrency_caps(app):
+    events = [queued_event('GTM-DISP01', i) for i in range(8)] + [queued_event('GTM-DISP02', i) for i in range(4)]
+    events.append(queued_event('GTM-UNKNWN', 0))
+    source = ListSource(events)
+    stub = StubGraph(delay=0.05)
+
+    run_dispatcher(app, source, stub, until=lambda: len(stub.received) == 12,
+                   max_in_flight=3, per_dataset_limit=2, shutdown_timeout=5)
+
+    assert sorted(dataset for dataset, _ in stub.received) == ['501'] * 8 + ['502'] * 4
+    assert max(stub.max_in_flight.values()) == 2
+    assert stub.max_total <= 3
+    _, body = stub.received[0]
+    assert body['access_token'] in ('token-501', 'token-502')
+    assert body['data'][0]['custom_data']['currency'] == 'TRY'
+    assert source.requeued == []
+
+def test_unfinished_events_are_requeued_on_shutdown(app):
+    source = ListSource([queued_event('GTM-DISP01', i) for i in range(3)])
+    stub = StubGraph(delay=5)
+
+    run_dispatcher(app, source, stub, until=lambda: sum(stub.in_flight.values()) == 3,
+                   max_in_flight=10, per_dataset_limit=10, shutdown_timeout=0.1)
+
+    assert sorted(event['data']['event_id'] for event in source.requeued) == ['GTM-DISP01-0', 'GTM-DISP01-1', 'GTM-DISP01-2']
+    # Claim bırakılır; tekrar teslimde event duplicate sayılmaz
+    assert event_dedup.dedup_store.claim('501:Purchase:GTM-DISP01-0')
+
+def test_blocking_work_runs_off_the_event_loop(app, monkeypatch):
+    import app.dispatcher as dispatcher_module
+    prepare_event = dispatcher_module.prepare_event
+
+    def slow_prepare(*args):
+        # Senkron DB sorgusu yerine; event loop'ta çalışsaydı teslimler sıraya girerdi
+        time.sleep(0.2)
+        return prepare_event(*args)
+
+    monkeypatch.setattr(dispatcher_module, 'prepare_event', slow_prepare)
+    source = ListSource([queued_event('GTM-DISP01', i) for i in range(6)])
+    stub = StubGraph(delay=0)
+    started = time.monotonic()
+
+    run_dispatcher(app, source, stub, until=lambda: len(stub.received) == 6,
+                   max_in_flight=10, per_dataset_limit=10, shutdown_timeout=5, blocking_threads=6)
+
+    assert time.monotonic() - started < 0.2 * 6
@@ -0,0 +1,62 @@
+import gzip
+import json
+import pytest
+from app import tasks
+
+@pytest.fixture
+def app(seeded_app):
+    return seeded_app('GTM-BULK01', '222')
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+EVENTS = [
+    {'event_name': 'AddToCart', 'gtm_container_id': 'GTM-BULK01', 'custom_data': {'value': 10, 'currency': 'TRY'}},
+    {'event_name': 'NotAnEvent', 'gtm_container_id': 'GTM-BULK01'},
+    {'event_name': 'Purchase', 'gtm_container_id': 'GTM-BULK01', 'email': 'a@b.com'},
+    {'event_name': 'PageView'},
+]
+
+def test_batch_validates_items_and_sends_one_request(client, graph_stub):
+    response = client.post('/api/facebook/events/batch', json={'events': EVENTS})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [result['status'] for result in body['results']] == [200, 400, 200, 400]
+    assert (body['accepted'], body['rejected']) == (2, 2)
+    assert len(graph_stub.calls) == 1
+    assert [event['event_name'] for event in graph_stub.calls[0][1]['data']] == ['AddToCart', 'Purchase']
+    assert graph_stub.calls[0][1]['data'][0]['custom_data'] == {'value': 10, 'currency': 'TRY'}
+
+def test_batch_accepts_gzip_body(client, graph_stub):
+    raw = gzip.compress(json.dumps(EVENTS[:1]).encode())
+
+    response = client.post(
+        '/api/facebook/events/batch',
+        data=raw,
+        headers={'Content-Encoding': 'gzip', 'Content-Type': 'application/json'}
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()['accepted'] == 1
+
+def test_batch_rejects_oversized_body(app, client, graph_stub):
+    app.config['EVENT_BATCH_MAX_BYTES'] = 64
+
+    response = client.post('/api/facebook/events/batch', json=EVENTS)
+
+    assert response.status_code == 413
+    assert graph_stub.calls == []
+
+def test_batch_async_mode_enqueues_once(app, client, monkeypatch):
+    app.config['EVENT_INGEST_MODE'] = 'async'
+    queued = []
+    monkeypatch.setattr(tasks.send_facebook_event_batch, 'apply_async', lambda args: queued.append(args[0]))
+
+    response = client.post('/api/facebook/events/batch', json=EVENTS)
+
+    body = response.get_json()
+    assert [result['status'] for result in body['results']] == [202, 400, 202, 400]
+    assert len(queued) == 1 and len(queued[0]) == 2
+    assert body['results'][0]['event_id'] == queued[0][0]['data']['event_id']
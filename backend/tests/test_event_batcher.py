@@ -0,0 +1,52 @@
+import time
+import pytest
+from flask import Flask
+from app.services import batch_sender
+from app.services.event_batcher import EventBatcher
+
+@pytest.fixture
+def flushed(monkeypatch):
+    batches = []
+
+    def fake_send_event_batch(events):
+        batches.append(list(events))
+        return [({'msg': 'Event sent to Meta'}, 200) for _ in events]
+
+    monkeypatch.setattr(batch_sender, 'send_event_batch', fake_send_event_batch)
+    return batches
+
+def make_batcher(**overrides):
+    options = dict(name='test', max_batch_size=3, max_batch_age=0.2, max_queue_size=100, enqueue_timeout=0.01)
+    options.update(overrides)
+    return EventBatcher(**options)
+
+def test_flushes_on_size_then_on_age(flushed):
+    batcher = make_batcher()
+    batcher.start(Flask(__name__))
+    for i in range(7):
+        assert batcher.submit({'event_name': 'PageView', 'data': {'n': i}})
+
+    deadline = time.time() + 3
+    while sum(len(batch) for batch in flushed) < 7 and time.time() < deadline:
+        time.sleep(0.05)
+    batcher.stop(timeout=2)
+
+    assert [len(batch) for batch in flushed] == [3, 3, 1]
+
+def test_full_queue_rejects_events(flushed):
+    batcher = make_batcher(max_queue_size=2)
+
+    assert batcher.submit({'n': 1})
+    assert batcher.submit({'n': 2})
+    assert not batcher.submit({'n': 3})
+
+def test_stop_drains_queued_events(flushed):
+    batcher = make_batcher(max_batch_size=1000, max_batch_age=60)
+    batcher.start(Flask(__name__))
+    for i in range(5):
+        batcher.submit({'n': i})
+
+    batcher.stop(timeout=2)
+
+    assert sum(len(batch) for batch in flushed) == 5
+    assert batcher.qsize() == 0
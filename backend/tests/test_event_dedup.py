@@ -0,0 +1,68 @@
+import pytest
+from app.services.batch_sender import send_event_batch
+from app.services.event_dedup import MemoryDedupStore, RedisDedupStore
+from app.utils import ttl_cache
+from app.services.facebook_event_sender import send_event_to_meta
+from app.utils.monitoring import DEDUP_DROPPED
+from conftest import GraphResponse
+
+@pytest.fixture
+def app(seeded_app):
+    return seeded_app('GTM-DEDUP1', '888')
+
+def dropped():
+    return DEDUP_DROPPED.labels(gtm_container_id='GTM-DEDUP1')._value.get()
+
+def test_repeated_event_id_is_sent_once(app, graph_stub):
+    before = dropped()
+    data = {'gtm_container_id': 'GTM-DEDUP1', 'event_id': 'order-1'}
+
+    first = send_event_to_meta('Purchase', dict(data), {'value': 10})
+    second = send_event_to_meta('Purchase', dict(data), {'value': 10})
+    other_event = send_event_to_meta('AddToCart', dict(data), {})
+
+    assert first[1] == 200 and other_event[1] == 200
+    assert second == ({'msg': 'Duplicate event dropped', 'duplicate': True, 'event_id': 'order-1'}, 200)
+    assert len(graph_stub.calls) == 2
+    assert dropped() - before == 1
+
+def test_failed_delivery_releases_the_claim(app, graph_stub):
+    graph_stub.responses[:] = [GraphResponse(500, {'error': {'code': 2, 'message': 'unavailable'}})]
+    data = {'gtm_container_id': 'GTM-DEDUP1', 'event_id': 'order-2'}
+
+    assert send_event_to_meta('Purchase', dict(data))[1] == 500
+    graph_stub.responses[:] = []
+
+    assert send_event_to_meta('Purchase', dict(data))[1] == 200
+    assert len(graph_stub.calls) == 2
+
+def test_events_without_event_id_are_not_deduplicated(app, graph_stub):
+    for _ in range(2):
+        send_event_to_meta('PageView', {'gtm_container_id': 'GTM-DEDUP1'})
+    assert len(graph_stub.calls) == 2
+
+def test_batch_drops_duplicates_within_and_across_batches(app, graph_stub):
+    event = {'event_name': 'Lead', 'data': {'gtm_container_id': 'GTM-DEDUP1', 'event_id': 'lead-1'}, 'custom_data': {}}
+
+    results = send_event_batch([event, event])
+    again = send_event_batch([event])
+
+    assert [status for _, status in results] == [200, 200]
+    assert results[1][0]['duplicate'] and again[0][0]['duplicate']
+    assert len(graph_stub.calls) == 1 and len(graph_stub.calls[0][1]['data']) == 1
+
+def test_unconfirmed_claim_expires_before_the_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, 'monotonic', lambda: now[0])
+    store = MemoryDedupStore(100, window=900, claim_ttl=60)
+    assert store.claim('888:Purchase:lost') and store.claim('888:Purchase:sent')
+    store.extend('888:Purchase:sent', store.window)
+
+    # Gönderirken ölen worker'ın claim'i kısa sürede düşer; gönderilen pencere boyunca kalır
+    now[0] += 61
+    assert store.claim('888:Purchase:lost') is True
+    assert store.claim('888:Purchase:sent') is False
+
+def test_redis_store_fails_open():
+    store = RedisDedupStore('redis://127.0.0.1:1/0', window=60, claim_ttl=30)
+    assert store.claim('888:Purchase:x') is True
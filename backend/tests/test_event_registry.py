@@ -0,0 +1,41 @@
+import pytest
+from app import create_app
+from app import tasks
+from app.services.event_registry import EVENT_SPECS, get_event_spec, get_event_spec_by_name
+
+def test_custom_data_is_built_from_declared_fields():
+    spec = get_event_spec('purchase')
+
+    custom_data = spec.build_custom_data({'value': 5, 'currency': 'TRY', 'email': 'a@b.com', 'test_event_code': 'TEST1'})
+
+    assert spec.event_name == 'Purchase'
+    assert custom_data == {
+        'value': 5, 'currency': 'TRY', 'content_ids': None, 'order_id': None,
+        'contents': [], 'test_event_code': 'TEST1'
+    }
+
+def test_slugs_and_names_are_unique():
+    assert len({spec.slug for spec in EVENT_SPECS}) == len(EVENT_SPECS)
+    assert get_event_spec_by_name('Schedule').slug == 'schedule'
+
+@pytest.fixture
+def client(monkeypatch):
+    app = create_app('testing')
+    app.config['EVENT_INGEST_MODE'] = 'async'
+    return app.test_client()
+
+def test_registered_slug_is_routed(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(tasks.send_facebook_event, 'apply_async', lambda args=None, task_id=None: calls.append(args))
+
+    res = client.post('/api/facebook/events/start-trial', json={'gtm_container_id': 'GTM-REG001', 'predicted_ltv': 99})
+
+    assert res.status_code == 202
+    event_name, _, custom_data = calls[0]
+    assert event_name == 'StartTrial'
+    assert custom_data['predicted_ltv'] == 99
+
+def test_unknown_slug_is_404(client):
+    res = client.post('/api/facebook/events/not-an-event', json={'gtm_container_id': 'GTM-REG001'})
+
+    assert res.status_code == 404
@@ -0,0 +1,63 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.services import graph_transport
+from app.utils.monitoring import GRAPH_POOL_HITS, GRAPH_HANDSHAKES
+
+class GraphStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        body = json.dumps({'events_received': 1}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def graph_stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), GraphStubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    graph_transport.reset_session()
+    yield f'http://127.0.0.1:{server.server_port}'
+    graph_transport.reset_session()
+    server.shutdown()
+
+def counter_value(counter):
+    return counter._value.get()
+
+def test_connections_are_reused(graph_stub):
+    handshakes_before = counter_value(GRAPH_HANDSHAKES)
+    hits_before = counter_value(GRAPH_POOL_HITS)
+
+    for _ in range(3):
+        response = graph_transport.post(f'{graph_stub}/123/events', json={'data': []})
+        assert response.status_code == 200
+        assert response.json() == {'events_received': 1}
+
+    assert counter_value(GRAPH_HANDSHAKES) - handshakes_before == 1
+    assert counter_value(GRAPH_POOL_HITS) - hits_before == 2
+
+def test_session_is_shared_within_process():
+    assert graph_transport.get_session() is graph_transport.get_session()
+
+def test_senders_post_to_configured_graph_url(graph_stub):
+    from app import create_app
+    from app.services.facebook_capi import FacebookCAPI
+
+    app = create_app('testing')
+    app.config.update(FACEBOOK_GRAPH_URL=f'{graph_stub}/', FACEBOOK_API_VERSION='v99.0')
+    with app.app_context():
+        capi = FacebookCAPI()
+        response = capi.send_events('token', '123', [{'event_name': 'PageView', 'event_time': 1}])
+
+    assert capi.base_url == f'{graph_stub}/v99.0'
+    assert response['success']
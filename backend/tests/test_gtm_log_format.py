@@ -0,0 +1,54 @@
+import io
+import json
+import logging
+import pytest
+from app.utils import logger as log_module
+from app.utils.logger import GtmEventLogger, GTM_LOG_KEYS, gtm_logger
+from app.routes.logs import parse_gtm_log_line
+
+@pytest.fixture
+def jsonl_log(monkeypatch):
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    monkeypatch.setattr(log_module, 'GTM_LOG_JSONL', True)
+    monkeypatch.setattr(gtm_logger, 'handlers', [handler])
+    monkeypatch.setattr(gtm_logger, 'propagate', False)
+    return stream
+
+def test_each_record_is_one_json_line(jsonl_log):
+    GtmEventLogger.log_gtm_event_received('Purchase', 'GTM-JSONL1', {'value': 10, 'nested': {'a': [1, 2]}}, source_ip='203.0.113.7')
+    GtmEventLogger.log_meta_request_sent('Purchase', 'GTM-JSONL1', {'event_name': 'Purchase'}, access_token='EAAB' + 'x' * 30, pixel_id='123')
+    GtmEventLogger.log_meta_response_received('Purchase', 'GTM-JSONL1', {'error': 'x'}, success=False, error_message='Facebook API error: 400')
+    GtmEventLogger.log_gtm_event_complete('Purchase', 'GTM-JSONL1', 91, success=False)
+
+    lines = jsonl_log.getvalue().splitlines()
+    records = [json.loads(line) for line in lines]
+
+    assert len(lines) == 4
+    assert all(tuple(record) == GTM_LOG_KEYS for record in records)
+    assert [record['type'] for record in records] == [
+        'GTM_EVENT_RECEIVED', 'META_REQUEST_SENT', 'META_RESPONSE_RECEIVED', 'GTM_EVENT_COMPLETE'
+    ]
+    assert records[1]['pixel'] == '123'
+    assert records[1]['payload']['access_token'].startswith('EAABxxxxxx...')
+    assert records[2]['level'] == 'ERROR'
+    assert records[3]['duration_ms'] == 91
+    assert records[0]['ts'].endswith('Z')
+
+def test_reader_parses_jsonl_records(jsonl_log):
+    GtmEventLogger.log_gtm_event_received('Lead', 'GTM-JSONL1', {'form_id': 'footer'})
+    GtmEventLogger.log_meta_response_received('Lead', 'GTM-JSONL1', {'error': 'x'}, success=False, error_message='boom')
+    GtmEventLogger.log_gtm_event_complete('Lead', 'GTM-JSONL1', 12)
+
+    received, error, complete = [parse_gtm_log_line(line) for line in jsonl_log.getvalue().splitlines()]
+
+    assert received['status'] == 'RECEIVED' and received['data'] == {'form_id': 'footer'}
+    assert received['event'] == 'Lead' and received['container'] == 'GTM-JSONL1'
+    assert error['status'] == 'ERROR' and error['error'] == 'boom' and error['level'] == 'ERROR'
+    assert complete['status'] == 'COMPLETE' and complete['final_status'] == 'SUCCESS' and complete['duration'] == 12
+    assert 'pixel_id' not in complete
+
+def test_reader_still_parses_text_lines():
+    entry = parse_gtm_log_line('2024-06-10 12:00:00,091 - INFO - GTM Event Complete: Lead | Container: GTM-JSONL1 | Status: SUCCESS | Duration: 91ms')
+    assert entry['status'] == 'COMPLETE' and entry['duration'] == 91
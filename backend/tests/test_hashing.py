@@ -0,0 +1,113 @@
+import hashlib
+import time
+import pytest
+from prometheus_client import REGISTRY
+from app.utils import hashing
+from app.utils.hashing import (
+    configure_hash_memo, hash_memo_stats, hash_user_fields,
+    hash_email, hash_phone, hash_name, hash_zipcode, hash_external_id
+)
+
+def sha256(value):
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+@pytest.fixture
+def memo():
+    memo = configure_hash_memo(True, maxsize=3, ttl=60)
+    yield memo
+    configure_hash_memo(False)
+
+def test_memo_returns_the_same_digests(memo):
+    for _ in range(3):
+        assert hash_email(' Customer@Example.com ') == sha256('customer@example.com')
+        assert hash_phone('+90 (555) 111-22-33') == sha256('905551112233')
+
+    assert hash_memo_stats() == {'size': 2, 'hits': 4, 'misses': 2, 'hit_rate': 4 / 6}
+
+def test_memo_is_bounded_by_size_and_ttl(memo, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(hashing.time, 'monotonic', lambda: now[0])
+    for name in ('ada', 'grace', 'alan', 'edsger'):
+        hash_name(name)
+
+    # En eski değer atılır, ham değerler en fazla maxsize kadar tutulur
+    assert len(memo) == 3 and 'ada' not in memo._data
+
+    now[0] += 61
+    hash_name('grace')
+    assert hash_memo_stats()['hits'] == 0
+
+def test_expired_values_are_dropped_on_the_next_insert(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(hashing.time, 'monotonic', lambda: now[0])
+    memo = hashing.DigestMemo(100, 0.1)
+    memo.digest('alice@example.com')
+    memo.digest('bob@example.com')
+    now[0] += 0.3
+    memo.digest('carol@example.com')
+    assert list(memo._data) == ['carol@example.com']
+    memo.stop()
+
+def test_hits_keep_an_entry_from_being_evicted():
+    memo = hashing.DigestMemo(2, 60)
+    memo.digest('hot@example.com')
+    memo.digest('cold@example.com')
+    for _ in range(5):
+        memo.digest('hot@example.com')
+    memo.digest('new@example.com')
+
+    assert list(memo._data) == ['hot@example.com', 'new@example.com']
+    memo.stop()
+
+def test_idle_memo_drops_expired_values():
+    memo = hashing.DigestMemo(100, 0.2)
+    memo.digest('alice@example.com')
+    memo.digest('bob@example.com')
+    time.sleep(0.3)
+
+    # Arama olmasa da ham değerler ttl'den fazla tutulmaz
+    assert len(memo._data) == 0 and len(memo._expiry) == 0
+    memo.stop()
+
+def test_hits_reach_the_counter_without_a_miss():
+    memo = hashing.DigestMemo(100, 60)
+    memo.digest('alice@example.com')
+    before = REGISTRY.get_sample_value('cache_hits_total', {'cache': 'pii_hash'})
+    for _ in range(3):
+        memo.digest('alice@example.com')
+    time.sleep(1.2)
+
+    assert REGISTRY.get_sample_value('cache_hits_total', {'cache': 'pii_hash'}) - before == 3
+    memo.stop()
+
+def test_memo_is_off_by_default():
+    assert hash_memo_stats() is None
+    assert hash_zipcode(34000) == sha256('34000')
+
+def test_hash_user_fields_hashes_all_present_fields():
+    data = {'email': 'a@b.com', 'phone': '555', 'fn': 'Ada', 'zp': '34000', 'external_id': 42, 'ct': '', 'fbp': 'fb.1'}
+
+    assert hash_user_fields(data) == {
+        'em': [hash_email('a@b.com')],
+        'ph': [hash_phone('555')],
+        'fn': [hash_name('Ada')],
+        'zp': [hash_zipcode('34000')],
+        'external_id': [hash_external_id(42)]
+    }
+
+def test_prehashed_values_pass_through_and_are_counted():
+    from app.utils.monitoring import USER_DATA_FIELDS_SEEN, USER_DATA_PREHASHED
+    from app.services.facebook_capi import FacebookCAPI
+    digest = sha256('customer@example.com')
+    seen = USER_DATA_FIELDS_SEEN.labels(gtm_container_id='GTM-HASH01')
+    prehashed = USER_DATA_PREHASHED.labels(gtm_container_id='GTM-HASH01')
+    seen_before, prehashed_before = seen._value.get(), prehashed._value.get()
+
+    hashed = hash_user_fields({'gtm_container_id': 'GTM-HASH01', 'email': digest, 'phone': digest.upper(), 'fn': 'Ada'})
+    prepared = FacebookCAPI()._prepare_user_data({'email': digest, 'fbp': 'fb.1'}, 'GTM-HASH01')
+
+    assert hashed['em'] == [digest]
+    # Büyük harfli hex Meta formatı değil; normal telefon gibi hash'lenir
+    assert hashed['ph'] == [hash_phone(digest.upper())]
+    assert prepared == {'em': digest, 'fbp': 'fb.1'}
+    assert (seen._value.get() - seen_before, prehashed._value.get() - prehashed_before) == (4, 2)
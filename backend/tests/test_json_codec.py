@@ -0,0 +1,40 @@
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from flask import jsonify
+from app import create_app
+from app.utils import json_codec
+
+PAYLOAD = {
+    'event_name': 'Purchase',
+    'event_time': 1718000000,
+    'user_data': {'em': ['a' * 64], 'client_user_agent': 'Mozilla/5.0 (Türkçe)'},
+    'custom_data': {'value': 149.9, 'currency': 'TRY', 'contents': [{'id': 'sku-1', 'quantity': 2}]},
+    'big_id': 2 ** 70
+}
+
+@pytest.fixture(params=['stdlib', 'orjson'])
+def codec(request):
+    if request.param == 'orjson' and json_codec.orjson is None:
+        pytest.skip('orjson is not installed')
+    yield json_codec.set_codec(request.param)
+    json_codec.set_codec('auto')
+
+def test_codecs_round_trip_the_same_objects(codec):
+    assert codec.name in ('stdlib', 'orjson')
+    assert json_codec.loads(json_codec.dumps_bytes(PAYLOAD)) == PAYLOAD
+    assert json_codec.loads(json_codec.dumps(PAYLOAD)) == PAYLOAD
+    assert json_codec.loads(json_codec.dumps_pretty(PAYLOAD)) == PAYLOAD
+
+def test_pretty_output_keeps_the_log_layout(codec):
+    assert json_codec.dumps_pretty({'a': 1}) == '{\n  "a": 1\n}'
+
+def test_flask_provider_uses_codec_and_flask_defaults(codec):
+    app = create_app('testing')
+    with app.test_request_context('/', method='POST', data=json_codec.dumps_bytes(PAYLOAD), content_type='application/json'):
+        from flask import request
+        assert request.get_json() == PAYLOAD
+        body = jsonify({'when': datetime(2024, 6, 1, 12, 0), 'amount': Decimal('1.50')}).get_json()
+
+    # Flask'ın tarih ve Decimal biçimi korunur
+    assert body == {'when': 'Sat, 01 Jun 2024 12:00:00 GMT', 'amount': '1.50'}
@@ -0,0 +1,133 @@
+import logging
+import os
+import time
+import pytest
+from app.utils import log_index
+from app.utils.async_log import AsyncFileHandler
+from app.utils.log_index import SidecarIndex, line_time
+from app.utils.log_reader import read_lines_reverse
+
+def log_line(minute, container, i):
+    return (f'2024-06-10 12:{minute:02d}:00,000 - INFO - GTM Event Complete: Lead | Container: {container} | '
+            f'Status: SUCCESS | Duration: {i}ms')
+
+def write_log(path, lines):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+def read_ranges(path, ranges):
+    # None: index düz tarama istiyor (get_gtm_events gibi)
+    if ranges is None:
+        ranges = [(0, None)]
+    return [line for start, end in ranges for _, line in read_lines_reverse(path, end=end, start=start)]
+
+@pytest.fixture
+def log(tmp_path):
+    path = tmp_path / 'gtm_events.log'
+    # GTM-RARE yalnızca 10. dakikada görünür
+    lines = [log_line(i // 20, 'GTM-RARE' if i // 20 == 10 else f'GTM-C{i % 5}', i) for i in range(400)]
+    write_log(path, lines)
+    return path, lines
+
+def test_rebuild_narrows_container_and_time_queries(log):
+    path, lines = log
+    index = SidecarIndex(path, bucket_seconds=60, segment_bytes=1024)
+    ranges = index.candidate_ranges(container='GTM-RARE')
+
+    assert os.path.exists(index.path)
+    assert sum(end - start for start, end in ranges) < os.path.getsize(path) / 5
+    assert [line for line in read_ranges(path, ranges) if 'GTM-RARE' in line] == \
+        [line for line in reversed(lines) if 'GTM-RARE' in line]
+
+    since = line_time(log_line(5, 'x', 0))
+    until = line_time(log_line(6, 'x', 0))
+    in_window = [line for line in read_ranges(path, index.candidate_ranges(since=since, until=until))
+                 if since <= line_time(line) <= until]
+    assert in_window == [line for line in reversed(lines) if since <= line_time(line) <= until]
+
+def test_writer_entries_are_used_and_rotation_rebuilds(log):
+    path, lines = log
+    index = SidecarIndex(path, bucket_seconds=60, segment_bytes=1 << 20)
+    index.candidate_ranges()
+    handler = AsyncFileHandler(path, name='test_index', fsync_interval=0, index=index)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger = logging.getLogger('test_log_index')
+    logger.propagate = False
+    logger.handlers = [handler]
+    logger.info(log_line(30, 'GTM-LATE', 1))
+    handler.close()
+
+    ranges = index.candidate_ranges(container='GTM-LATE')
+    assert len(open(index.path).readlines()) >= 3  # başlık + rebuild + yazıcı kaydı
+    assert read_ranges(path, ranges)[0].endswith('Duration: 1ms')
+    assert ranges[0][1] == os.path.getsize(path)
+
+    # Rotasyon: dosya taşınır, yenisi başlar; index eski dosyayı göstermemeli
+    os.rename(path, f'{path}.1')
+    write_log(path, [log_line(40, 'GTM-NEW', 2)])
+    assert read_ranges(path, index.candidate_ranges(container='GTM-LATE')) == []
+    assert read_ranges(path, index.candidate_ranges(container='GTM-NEW')) == [log_line(40, 'GTM-NEW', 2)]
+
+def test_truncated_log_rebuilds_the_index(log):
+    path, _ = log
+    index = SidecarIndex(path, segment_bytes=1024)
+    index.candidate_ranges(container='GTM-RARE')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(log_line(1, 'GTM-RARE', 7) + '\n')
+    assert read_ranges(path, index.candidate_ranges(container='GTM-RARE')) == [log_line(1, 'GTM-RARE', 7)]
+
+def test_non_blocking_query_rebuilds_in_background(log):
+    path, _ = log
+    index = SidecarIndex(path, segment_bytes=1024)
+    assert index.candidate_ranges(container='GTM-RARE', block=False) is None
+    deadline = time.time() + 5
+    while index._rebuilding is not None and time.time() < deadline:
+        time.sleep(0.01)
+    assert index.candidate_ranges(container='GTM-RARE', block=False)
+
+def test_open_bucket_of_another_writer_is_read(log, monkeypatch):
+    path, _ = log
+    reader = SidecarIndex(path, bucket_seconds=60, segment_bytes=1 << 20)
+    reader.candidate_ranges()
+    writer_a = SidecarIndex(path, bucket_seconds=60, segment_bytes=1 << 20)
+    writer_b = SidecarIndex(path, bucket_seconds=60, segment_bytes=1 << 20)
+
+    # A'nın satırları arasına B'nin satırı düşer; A bucket'ını kapatır, B açık kalır
+    for writer, container in ((writer_a, 'GTM-AAAAAA'), (writer_b, 'GTM-BBBBBB'), (writer_a, 'GTM-AAAAAA')):
+        line = log_line(30, container, 1)
+        start = os.path.getsize(path)
+        write_log(path, [line])
+        writer.record_batch(os.stat(path).st_ino, start, os.path.getsize(path), [line_time(line)], [line])
+    writer_a.flush()
+
+    expected = [log_line(30, 'GTM-BBBBBB', 1)]
+    ranges = reader.candidate_ranges(container='GTM-BBBBBB')
+    assert [line for line in read_ranges(path, ranges) if 'GTM-BBBBBB' in line] == expected
+
+    # B kapatmadan ölürse işareti bayatlar; yeniden kurulum satırı kapsar
+    monkeypatch.setattr(log_index, 'STALE_WRITER_SLACK', -120)
+    ranges = reader.candidate_ranges(container='GTM-BBBBBB')
+    assert [line for line in read_ranges(path, ranges) if 'GTM-BBBBBB' in line] == expected
+    assert not any('"open"' in line for line in open(reader.path))
+
+def test_busy_container_falls_back_to_a_plain_scan(log):
+    path, _ = log
+    index = SidecarIndex(path, bucket_seconds=60, segment_bytes=1024)
+
+    # GTM-C0 her bucket'ta var; aralıklar dosyanın tamamını kaplar
+    assert index.candidate_ranges(container='GTM-C0') is None
+    assert index.candidate_ranges() is None
+    assert index.candidate_ranges(container='GTM-RARE') is not None
+
+def test_nearby_ranges_are_read_in_one_pass(tmp_path):
+    path = tmp_path / 'gtm_events.log'
+    # GTM-NEAR yalnızca 17. ve 19. dakikada; aradaki ~1 KiB'lık kayıt yalnızca GTM-OTHER içerir
+    lines = [log_line(minute, 'GTM-NEAR' if i == 0 and minute in (17, 19) else 'GTM-OTHER', i)
+             for minute in range(20) for i in range(10)]
+    write_log(path, lines)
+    index = SidecarIndex(path, bucket_seconds=60, segment_bytes=1 << 20)
+
+    ranges = index.candidate_ranges(container='GTM-NEAR')
+    assert len(ranges) == 1
+    assert [line for line in read_ranges(path, ranges) if 'GTM-NEAR' in line] == \
+        [line for line in reversed(lines) if 'GTM-NEAR' in line]
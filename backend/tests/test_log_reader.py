@@ -0,0 +1,53 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.routes import logs
+from app.utils.log_reader import read_lines_reverse
+
+LINES = [f'2024-06-10 12:00:{i:02d},000 - INFO - GTM Event Complete: {"Lead" if i % 3 else "Purchase"} | '
+         f'Container: GTM-LOGS{i % 2} | Status: SUCCESS | Duration: {i}ms' for i in range(20)]
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = tmp_path / 'gtm_events.log'
+    path.write_text('\n'.join(LINES) + '\n', encoding='utf-8')
+    return path
+
+@pytest.mark.parametrize('block_size', [7, 64, 1 << 16])
+def test_reads_newest_first_across_block_boundaries(log_path, block_size):
+    lines = [line for _, line in read_lines_reverse(log_path, block_size=block_size)]
+    assert lines == LINES[::-1]
+
+def test_offset_resumes_before_the_line(log_path):
+    offsets = {}
+    for offset, line in read_lines_reverse(log_path, block_size=16):
+        offsets[line] = offset
+    resumed = [line for _, line in read_lines_reverse(log_path, end=offsets[LINES[5]], block_size=16)]
+    assert resumed == LINES[:5][::-1]
+
+def test_missing_trailing_newline_and_utf8(tmp_path):
+    path = tmp_path / 'gtm_events.log'
+    path.write_bytes('first\n\nİstanbul şehri\nlast'.encode('utf-8'))
+    assert [line for _, line in read_lines_reverse(path, block_size=3)] == ['last', 'İstanbul şehri', 'first']
+
+def test_endpoint_filters_and_pages_with_cursor(log_path, monkeypatch):
+    monkeypatch.setattr(logs, 'gtm_log_path', lambda: str(log_path))
+    app = create_app('testing')
+    client = app.test_client()
+    with app.app_context():
+        headers = {'Authorization': f'Bearer {create_access_token(identity="1")}'}
+
+    seen = []
+    cursor = None
+    while True:
+        query = {'container': 'gtm-logs1', 'event': 'lead', 'limit': 3}
+        if cursor is not None:
+            query['cursor'] = cursor
+        body = client.get('/api/logs/gtm-events', query_string=query, headers=headers).get_json()
+        seen.extend(entry['duration'] for entry in body['logs'])
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == [i for i in reversed(range(20)) if i % 2 == 1 and i % 3]
+    assert client.get('/api/logs/gtm-events', query_string={'limit': 0}, headers=headers).status_code == 400
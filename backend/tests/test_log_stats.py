@@ -0,0 +1,87 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.routes import logs
+from app.utils.log_stats import LogStats, stats_key, split_key
+
+TEXT_LOG = [
+    '2024-06-10 12:00:00,000 - INFO - GTM Event Received: Lead | Container: GTM-STATS1 | Data: {',
+    '  "value": 10',
+    '}',
+    '2024-06-10 12:00:01,000 - ERROR - Meta Response Error: Lead | Container: GTM-STATS1 | Error: bad token | Response: {}',
+    '2024-06-10 12:00:02,000 - INFO - GTM Event Complete: Lead | Container: GTM-STATS1 | Status: FAILED | Duration: 80ms',
+    '2024-06-10 12:00:03,000 - WARNING - Token Info Request Failed: GTM-STATS2 | Error: Token not found',
+]
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    log_path = tmp_path / 'gtm_events.log'
+    log_path.write_text('\n'.join(TEXT_LOG) + '\n', encoding='utf-8')
+    stats = LogStats(tmp_path / 'gtm_events.stats.json', flush_interval=60)
+    monkeypatch.setattr(logs, 'gtm_log_path', lambda: str(log_path))
+    monkeypatch.setattr(logs, 'gtm_log_stats', stats)
+    app = create_app('testing')
+    with app.app_context():
+        headers = {'Authorization': f'Bearer {create_access_token(identity="1")}'}
+    return app.test_client(), headers, stats
+
+def test_workers_share_flushed_counters(tmp_path):
+    path = tmp_path / 'gtm_events.stats.json'
+    first, second = LogStats(path, flush_interval=60), LogStats(path, flush_interval=60)
+    first.record('INFO', 'GTM_EVENT_RECEIVED', 'Lead', 'GTM-A', 'RECEIVED')
+    first.record('INFO', 'GTM_EVENT_RECEIVED', 'Lead', 'GTM-A', 'RECEIVED')
+    second.record('ERROR', 'META_RESPONSE_RECEIVED', 'Lead', 'GTM-A', 'ERROR')
+
+    # Yazılmamış sayaçlar yalnızca kendi sürecinde görünür
+    assert first.snapshot()['counters'] == {stats_key('GTM-A', 'Lead', 'GTM_EVENT_RECEIVED', 'INFO', 'RECEIVED'): 2}
+    first.flush()
+    second.flush()
+
+    snapshot = LogStats(path).snapshot()
+    assert snapshot['counters'] == {
+        stats_key('GTM-A', 'Lead', 'GTM_EVENT_RECEIVED', 'INFO', 'RECEIVED'): 2,
+        stats_key('GTM-A', 'Lead', 'META_RESPONSE_RECEIVED', 'ERROR', 'ERROR'): 1
+    }
+    assert len(snapshot['recent']) == 3
+    first.stop()
+    second.stop()
+
+def test_malformed_client_ids_share_one_key(tmp_path):
+    stats = LogStats(tmp_path / 'gtm_events.stats.json', flush_interval=60)
+    stats.record('INFO', 'GTM_EVENT_RECEIVED', 'Lead|x', 'GTM-A|B|C', 'RECEIVED')
+    stats.record('INFO', 'GTM_EVENT_RECEIVED', 'Lead', 'junk-123', 'RECEIVED')
+
+    counters = stats.snapshot()['counters']
+    assert [split_key(key) for key in counters] == [
+        {'container': 'unknown', 'event': 'unknown', 'type': 'GTM_EVENT_RECEIVED', 'level': 'INFO', 'outcome': 'RECEIVED'},
+        {'container': 'unknown', 'event': 'Lead', 'type': 'GTM_EVENT_RECEIVED', 'level': 'INFO', 'outcome': 'RECEIVED'}
+    ]
+    stats.stop()
+
+def test_legacy_stats_file_is_recounted(tmp_path):
+    path = tmp_path / 'gtm_events.stats.json'
+    path.write_text('{"seeded": true, "counters": {"GTM-A|Lead|GTM_EVENT_RECEIVED|INFO|RECEIVED": 3}, "recent": []}')
+    assert LogStats(path).snapshot() is None
+
+def test_endpoint_seeds_from_log_once_then_counts(client):
+    client, headers, stats = client
+    body = client.get('/api/logs/gtm-events/stats', headers=headers).get_json()
+
+    # Çok satırlı Data bloğu tek kayıt sayılır
+    assert body['total_events'] == 4
+    assert (body['info_count'], body['error_count'], body['warning_count'], body['success_count']) == (2, 1, 1, 0)
+    assert body['events_by_type'] == {'Lead': 1}
+    assert body['by_container'] == {'GTM-STATS1': 3, 'GTM-STATS2': 1}
+    assert body['by_outcome']['GTM_EVENT_COMPLETE:FAILED'] == 1
+    assert body['recent_activity'][0]['level'] == 'WARNING'
+
+    stats.record('INFO', 'GTM_EVENT_COMPLETE', 'Lead', 'GTM-STATS1', 'SUCCESS')
+    body = client.get('/api/logs/gtm-events/stats', headers=headers).get_json()
+    assert body['total_events'] == 5
+    assert body['success_count'] == 1
+
+    assert client.post('/api/logs/gtm-events/clear', headers=headers).status_code == 200
+    body = client.get('/api/logs/gtm-events/stats', headers=headers).get_json()
+    assert body['total_events'] == 0
+    assert body['recent_activity'] == []
+    stats.stop()
@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_metrics_sum_over_workers(tmp_path):
+    # Multiprocess modu import anında seçilir; ayrı bir yorumlayıcıda çalıştırılır
+    script = textwrap.dedent("""
+        import os
+        from prometheus_client import Gauge, multiprocess
+        from app.utils.monitoring import DISPATCHER_EVENTS, get_metrics, gauge_refresher, track_gauge
+
+        depth = Gauge('test_queue_depth', 'Test queue depth', multiprocess_mode='livesum')
+        track_gauge(depth, lambda: 3)
+        for _ in range(2):
+            pid = os.fork()
+            if pid == 0:
+                DISPATCHER_EVENTS.labels(result='sent').inc()
+                gauge_refresher.refresh()
+                os._exit(0)
+            os.waitpid(pid, 0)
+            # gunicorn.conf.py child_exit ile aynı
+            multiprocess.mark_process_dead(pid)
+        print(get_metrics().decode())
+    """)
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    output = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+
+    assert 'dispatcher_events_total{result="sent"} 2.0' in output
+    # Sayaçlar ölen worker'lardan da toplanır; live* gauge'lar yalnızca canlı süreçten
+    assert 'test_queue_depth 3.0' in output
@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import event
+from app.extensions import db
+from app.services.routing import resolve_route
+
+@pytest.fixture
+def app(seeded_app):
+    return seeded_app('GTM-ROUTE1', '444', access_token='token-route', domain='route.example.com')
+
+@pytest.fixture
+def queries(app):
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', count)
+
+def test_cold_lookup_is_one_query_then_cached(queries):
+    token, event_source_url = resolve_route('GTM-ROUTE1')
+
+    assert (token.dataset_id, token.access_token, token.is_active) == ('444', 'token-route', True)
+    assert event_source_url == 'https://www.route.example.com'
+    assert len(queries) == 1
+
+    assert resolve_route('GTM-ROUTE1')[1] == 'https://www.route.example.com'
+    assert len(queries) == 1
+
+def test_unknown_container_is_negative_cached(queries):
+    assert resolve_route('GTM-NOROUTE')[0] is None
+    assert resolve_route('GTM-NOROUTE')[0] is None
+    assert len(queries) == 1
@@ -0,0 +1,37 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.models.gtm_verification import GtmVerification
+from app.services.event_builder import get_domain_by_gtm_container_id
+
+@pytest.mark.parametrize('domain, expected', [
+    ('shop.example.com', 'https://www.shop.example.com'),
+    ('www.shop.example.com', 'https://www.shop.example.com'),
+    ('https://shop.example.com', 'https://www.shop.example.com'),
+])
+def test_build_event_source_url(domain, expected):
+    assert GtmVerification.build_event_source_url(domain) == expected
+
+@pytest.fixture
+def app(seeded_app):
+    return seeded_app('GTM-SOURCE1', domain='old.example.com')
+
+def test_source_url_is_served_from_map(app):
+    assert get_domain_by_gtm_container_id('GTM-SOURCE1') == 'https://www.old.example.com'
+    assert get_domain_by_gtm_container_id('GTM-NOSITE1') == 'https://www.example.com'
+
+    GtmVerification.query.update({'event_source_url': 'https://www.changed.example.com'})
+    db.session.commit()
+
+    assert get_domain_by_gtm_container_id('GTM-SOURCE1') == 'https://www.old.example.com'
+
+def test_update_route_refreshes_map(app):
+    assert get_domain_by_gtm_container_id('GTM-SOURCE1') == 'https://www.old.example.com'
+    headers = {'Authorization': f"Bearer {create_access_token(identity=str(app.config['TEST_USER_ID']))}"}
+
+    res = app.test_client().put(f"/api/user/gtm-verifications/{app.config['TEST_VERIFICATION_ID']}",
+                                json={'domain_name': 'new.example.com'}, headers=headers)
+
+    assert res.status_code == 200
+    assert res.get_json()['event_source_url'] == 'https://www.new.example.com'
+    assert get_domain_by_gtm_container_id('GTM-SOURCE1') == 'https://www.new.example.com'
@@ -0,0 +1,32 @@
+import pytest
+from prometheus_client import REGISTRY
+from app.services.facebook_event_sender import send_event_to_meta
+
+@pytest.fixture
+def app(seeded_app, graph_stub):
+    return seeded_app('GTM-STAGE1', '777')
+
+def observations(stage, event_name, outcome):
+    return REGISTRY.get_sample_value('event_stage_duration_seconds_count', {
+        'stage': stage, 'event_name': event_name, 'outcome': outcome
+    }) or 0
+
+def test_sent_event_records_every_stage(app):
+    stages = ('token_lookup', 'hashing', 'payload_build', 'logging', 'graph_api')
+    before = {stage: observations(stage, 'Lead', 'sent') for stage in stages}
+
+    _, status = send_event_to_meta('Lead', {'gtm_container_id': 'GTM-STAGE1', 'email': 'a@example.com'})
+
+    assert status == 200
+    for stage in stages:
+        assert observations(stage, 'Lead', 'sent') - before[stage] == 1
+
+def test_rejected_event_stops_after_token_lookup(app):
+    before_lookup = observations('token_lookup', 'Lead', 'rejected')
+    before_graph = observations('graph_api', 'Lead', 'rejected')
+
+    _, status = send_event_to_meta('Lead', {'gtm_container_id': 'GTM-UNKNOWN'})
+
+    assert status == 404
+    assert observations('token_lookup', 'Lead', 'rejected') - before_lookup == 1
+    assert observations('graph_api', 'Lead', 'rejected') == before_graph
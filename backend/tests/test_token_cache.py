@@ -0,0 +1,57 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.models.facebook_token import FacebookToken
+from app.services.token_cache import get_token, token_cache
+from app.utils import ttl_cache
+from app.utils.ttl_cache import TTLCache, MISSING
+
+def test_ttl_cache_expires_and_evicts(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, 'monotonic', lambda: now[0])
+    cache = TTLCache('test', maxsize=2, ttl=10, negative_ttl=1)
+
+    cache.set('a', 1)
+    cache.set('missing', None)
+    assert cache.get('a') == 1
+    assert cache.get('missing') is None
+
+    now[0] += 2
+    assert cache.get('missing') is MISSING
+    assert cache.get('a') == 1
+
+    cache.set('b', 2)
+    cache.set('c', 3)
+    assert cache.get('a') is MISSING  # en eski kullanılan atıldı
+    assert len(cache) == 2
+
+@pytest.fixture
+def app(seeded_app):
+    return seeded_app('GTM-CACHE1', '333', access_token='token-old')
+
+def test_lookup_is_cached_including_unknown_containers(app):
+    first = get_token('GTM-CACHE1')
+    assert get_token('GTM-UNKNWN') is None
+
+    FacebookToken.query.filter_by(gtm_container_id='GTM-CACHE1').update({'access_token': 'changed-behind-cache'})
+    db.session.commit()
+    db.session.add(FacebookToken(user_id=app.config['TEST_USER_ID'], dataset_id='9', access_token='x',
+                                 token_name='late', gtm_container_id='GTM-UNKNWN'))
+    db.session.commit()
+
+    assert get_token('GTM-CACHE1') is first
+    assert get_token('GTM-UNKNWN') is None
+    assert len(token_cache) == 2
+
+def test_token_update_route_invalidates(app):
+    client = app.test_client()
+    headers = {'Authorization': f"Bearer {create_access_token(identity=str(app.config['TEST_USER_ID']))}"}
+    assert get_token('GTM-CACHE1').access_token == 'token-old'
+
+    res = client.put(f"/api/user/facebook-tokens/{app.config['TEST_TOKEN_ID']}",
+                     json={'access_token': 'token-new', 'is_active': False}, headers=headers)
+
+    assert res.status_code == 200
+    token = get_token('GTM-CACHE1')
+    assert token.access_token == 'token-new'
+    assert token.is_active is False